@@ -0,0 +1,105 @@
+"""API 共用依賴"""
+
+from typing import Any
+
+from anyio import CapacityLimiter
+from fastapi import Request
+from sj_trading import ResultHandles, ScanStore
+
+from app.feed import LiveFeed
+from app.http_cache import EtagCache
+
+
+def get_scan_components(request: Request) -> dict[str, Any]:
+    """
+    取得應用程式啟動時建立的掃描元件，可直接展開傳入 execute_scan
+
+    Returns:
+        包含 pool（連線池）、cache（結果快取）、flight（請求合併器）、
+        quota（配額追蹤）、policy（流量降級策略）、store（歷史儲存）、
+        calendar（交易日曆）、guard（上游逾時、重試與斷路器）的字典，
+        尚未建立的元件為 None
+    """
+    return scan_components(request.app.state)
+
+
+def scan_components(state: Any) -> dict[str, Any]:
+    """
+    由 app.state 取得掃描元件（非請求情境使用，例如背景輪詢）
+
+    Args:
+        state: FastAPI app.state
+
+    Returns:
+        與 get_scan_components 相同的字典
+    """
+    return {
+        "pool": getattr(state, "session_pool", None),
+        "cache": getattr(state, "scan_cache", None),
+        "flight": getattr(state, "scan_flight", None),
+        "quota": getattr(state, "quota_tracker", None),
+        "policy": getattr(state, "degradation_policy", None),
+        "store": getattr(state, "scan_store", None),
+        "calendar": getattr(state, "trading_calendar", None),
+        "guard": getattr(state, "upstream_guard", None),
+    }
+
+
+def get_caller(request: Request) -> str:
+    """
+    取得呼叫者識別，用於上游速率限制佇列中依呼叫者輪流
+
+    Returns:
+        用戶端位址，無法取得時為空字串
+    """
+    return request.client.host if request.client is not None else ""
+
+
+def get_scan_store(request: Request) -> ScanStore | None:
+    """
+    取得掃描歷史儲存
+
+    Returns:
+        ScanStore，未啟用時為 None
+    """
+    return getattr(request.app.state, "scan_store", None)
+
+
+def get_scan_limiter(request: Request) -> CapacityLimiter | None:
+    """
+    取得限制同時執行掃描數量的 CapacityLimiter
+
+    Returns:
+        CapacityLimiter，尚未建立時為 None（使用 anyio 預設執行緒池上限）
+    """
+    return getattr(request.app.state, "scan_limiter", None)
+
+
+def get_result_handles(request: Request) -> ResultHandles | None:
+    """
+    取得掃描結果代碼登錄表
+
+    Returns:
+        ResultHandles，尚未建立時為 None
+    """
+    return getattr(request.app.state, "result_handles", None)
+
+
+def get_etag_cache(request: Request) -> EtagCache | None:
+    """
+    取得掃描回應的 ETag 快取
+
+    Returns:
+        EtagCache，尚未建立時為 None（不產生 ETag）
+    """
+    return getattr(request.app.state, "etag_cache", None)
+
+
+def get_live_feed(request: Request) -> LiveFeed | None:
+    """
+    取得即時掃描訂閱管理
+
+    Returns:
+        LiveFeed，尚未建立時為 None
+    """
+    return getattr(request.app.state, "live_feed", None)
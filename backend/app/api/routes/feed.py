@@ -0,0 +1,70 @@
+"""即時掃描訂閱 API 路由（Server-Sent Events）"""
+
+import logging
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_live_feed
+from app.encoding import encode_json
+from app.feed import EVENT_PING, LiveFeed
+from app.models import ScanRequest
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def iter_events(feed: LiveFeed, request: ScanRequest) -> AsyncIterator[bytes]:
+    """
+    將訂閱事件轉為 SSE 格式
+
+    Args:
+        feed: 即時掃描訂閱管理
+        request: 掃描條件
+
+    Yields:
+        SSE 訊息位元組
+    """
+    async with aclosing(feed.subscribe(request)) as events:
+        async for name, data in events:
+            if name == EVENT_PING:
+                yield b": ping\n\n"
+                continue
+            version = data.get("version")
+            head = f"event: {name}\n" + (f"id: {version}\n" if version else "")
+            yield head.encode("utf-8") + b"data: " + encode_json(data) + b"\n\n"
+
+
+@router.get("/feed")
+async def subscribe_scan(
+    request: Annotated[ScanRequest, Query()],
+    feed: Annotated[LiveFeed | None, Depends(get_live_feed)],
+):
+    """
+    訂閱掃描結果的即時變化（text/event-stream）
+
+    相同條件的訂閱者共用同一個伺服器端輪詢。事件：
+
+    - snapshot：完整結果（訂閱時，以及連線太慢而丟棄事件後）
+    - delta：upsert（新增或內容有變的資料列）、remove（退出的代號）、
+      order（排名順序有變時的完整代號列表）
+    - error：該次輪詢失敗，之後仍會繼續輪詢
+
+    Args:
+        request: 掃描條件（查詢參數）
+        feed: 即時掃描訂閱管理
+
+    Returns:
+        SSE 串流
+    """
+    if feed is None:
+        raise HTTPException(status_code=503, detail="即時掃描訂閱尚未啟動")
+    logger.info(f"新訂閱: {request.key()}")
+    return StreamingResponse(
+        iter_events(feed, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,243 @@
+"""掃描歷史 API 路由"""
+
+import logging
+from dataclasses import asdict
+from datetime import datetime
+from typing import Annotated
+
+from anyio import to_thread
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from sj_trading import ScanStore, StoredSnapshot, rank_delta
+
+from app.api.deps import get_scan_store
+from app.encoding import encode_json
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+DateParam = Annotated[str, Query(pattern=r"^\d{4}-\d{2}-\d{2}$")]
+OptionalDateParam = Annotated[str | None, Query(pattern=r"^\d{4}-\d{2}-\d{2}$")]
+
+
+def require_store(
+    store: Annotated[ScanStore | None, Depends(get_scan_store)],
+) -> ScanStore:
+    """
+    取得歷史儲存，未啟用時回應 503
+
+    Returns:
+        ScanStore
+    """
+    if store is None:
+        raise HTTPException(status_code=503, detail="掃描歷史儲存未啟用")
+    return store
+
+
+@router.get("/history")
+async def get_history(
+    store: Annotated[ScanStore, Depends(require_store)],
+    start_date: DateParam,
+    end_date: DateParam,
+    scanner_type: str | None = None,
+    ascending: bool | None = None,
+    simulation: bool | None = None,
+    code: str | None = None,
+    latest_only: bool = True,
+    limit: Annotated[int, Query(ge=1, le=100000)] = 10000,
+):
+    """
+    查詢日期區間內保存的掃描排名
+
+    Args:
+        store: 歷史儲存
+        start_date: 起始日期（含）
+        end_date: 結束日期（含）
+        scanner_type: 掃描器類型
+        ascending: 是否升序
+        simulation: 是否模擬模式
+        code: 股票代號，提供時只回傳該股票的排名
+        latest_only: 每個日期與掃描條件只取最新一次快照
+        limit: 最多回傳筆數
+
+    Returns:
+        歷史排名列表
+    """
+    rows = await to_thread.run_sync(
+        lambda: store.query(
+            start_date,
+            end_date,
+            scanner_type=scanner_type,
+            ascending=ascending,
+            simulation=simulation,
+            code=code,
+            latest_only=latest_only,
+            limit=limit,
+        )
+    )
+    content = encode_json({"status": "success", "data": rows, "total_count": len(rows)})
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/history/snapshots")
+async def get_history_snapshots(
+    store: Annotated[ScanStore, Depends(require_store)],
+    start_date: DateParam,
+    end_date: DateParam,
+    scanner_type: str | None = None,
+    ascending: bool | None = None,
+    simulation: bool | None = None,
+):
+    """
+    列出日期區間內保存的掃描快照
+
+    Args:
+        store: 歷史儲存
+        start_date: 起始日期（含）
+        end_date: 結束日期（含）
+        scanner_type: 掃描器類型
+        ascending: 是否升序
+        simulation: 是否模擬模式
+
+    Returns:
+        快照列表
+    """
+    snapshots = await to_thread.run_sync(
+        lambda: store.snapshots(
+            start_date,
+            end_date,
+            scanner_type=scanner_type,
+            ascending=ascending,
+            simulation=simulation,
+        )
+    )
+    return {
+        "status": "success",
+        "data": [asdict(snapshot) for snapshot in snapshots],
+        "total_count": len(snapshots),
+    }
+
+
+def _resolve_delta(
+    store: ScanStore,
+    scanner_type: str | None,
+    date: str | None,
+    ascending: bool,
+    simulation: bool,
+    from_id: int | None,
+    to_id: int | None,
+    from_date: str | None,
+    from_at: datetime | None,
+    to_at: datetime | None,
+) -> tuple[StoredSnapshot, StoredSnapshot]:
+    """
+    找出要比較的兩個快照
+
+    Returns:
+        (較早的快照, 較晚的快照)
+
+    Raises:
+        HTTPException: 參數不足（400）或找不到快照（404）時
+    """
+
+    def latest(day: str | None, at: datetime | None) -> StoredSnapshot | None:
+        if scanner_type is None or day is None:
+            raise HTTPException(
+                status_code=400, detail="未指定快照編號時需提供 scanner_type 與 date"
+            )
+        return store.latest(
+            scanner_type,
+            day,
+            1,
+            ascending,
+            simulation,
+            at=at.timestamp() if at is not None else None,
+        )
+
+    after = store.get(to_id) if to_id is not None else latest(date, to_at)
+    if after is None:
+        raise HTTPException(status_code=404, detail="找不到較晚的快照")
+
+    if from_id is not None:
+        before = store.get(from_id)
+    elif from_date is not None or from_at is not None:
+        before = latest(from_date or after.date, from_at)
+    else:
+        before = store.previous(after)
+    if before is None:
+        raise HTTPException(status_code=404, detail="找不到較早的快照")
+
+    if (before.scanner_type, before.ascending) != (after.scanner_type, after.ascending):
+        raise HTTPException(status_code=400, detail="兩個快照的掃描條件不同")
+    return before, after
+
+
+@router.get("/history/delta")
+async def get_rank_delta(
+    store: Annotated[ScanStore, Depends(require_store)],
+    scanner_type: str | None = None,
+    date: OptionalDateParam = None,
+    ascending: bool = False,
+    simulation: bool = True,
+    from_id: int | None = None,
+    to_id: int | None = None,
+    from_date: OptionalDateParam = None,
+    from_at: datetime | None = None,
+    to_at: datetime | None = None,
+    count: Annotated[int | None, Query(ge=1, le=200)] = None,
+    value_field: str = "rank_value",
+):
+    """
+    比較兩次保存的掃描結果：新進榜、退出榜與排名變動
+
+    較晚的快照為 to_id，或 date 當天（to_at 以前）最新的一次；較早的快照為
+    from_id、from_date / from_at 當時最新的一次，都未提供時為同一天的前一次掃描。
+
+    Args:
+        store: 歷史儲存
+        scanner_type: 掃描器類型
+        date: 較晚快照的日期
+        ascending: 是否升序
+        simulation: 是否模擬模式
+        from_id: 較早快照的編號
+        to_id: 較晚快照的編號
+        from_date: 較早快照的日期，預設與較晚快照相同
+        from_at: 較早快照的時間上限
+        to_at: 較晚快照的時間上限
+        count: 只比較前 count 名，預設為兩個快照筆數的較小值
+        value_field: 計算數值變化的欄位
+
+    Returns:
+        兩個快照的資訊與 entered、left、moved、unchanged
+
+    Raises:
+        HTTPException: 參數不足或找不到快照時
+    """
+
+    def compute() -> dict:
+        before, after = _resolve_delta(
+            store,
+            scanner_type,
+            date,
+            ascending,
+            simulation,
+            from_id,
+            to_id,
+            from_date,
+            from_at,
+            to_at,
+        )
+        limit = min(before.row_count, after.row_count, count or after.row_count)
+        delta = rank_delta(
+            store.load(before.id, limit), store.load(after.id, limit), value_field
+        )
+        return {
+            "status": "success",
+            "from": asdict(before),
+            "to": asdict(after),
+            "compared": limit,
+            **delta,
+        }
+
+    content = encode_json(await to_thread.run_sync(compute))
+    return Response(content=content, media_type="application/json")
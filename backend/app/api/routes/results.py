@@ -0,0 +1,87 @@
+"""掃描結果代碼 API 路由（伺服器端篩選、排序與分頁）"""
+
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from sj_trading import Filter, ResultHandles
+from sj_trading.resultset import decode_cursor, encode_cursor, parse_sort
+
+from app.api.deps import get_result_handles
+from app.encoding import encode_json
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/results/{handle}")
+async def get_results(
+    handle: str,
+    handles: Annotated[ResultHandles | None, Depends(get_result_handles)],
+    filters: Annotated[
+        list[str],
+        Query(
+            alias="filter",
+            description="篩選條件，可重複，例如 close>=10、volume>1000",
+        ),
+    ] = [],  # noqa: B006 - FastAPI 的查詢參數預設值
+    sort: Annotated[
+        str | None, Query(description="排序欄位，以逗號分隔，- 表示遞減")
+    ] = None,
+    fields: Annotated[str | None, Query(description="只輸出的欄位，以逗號分隔")] = None,
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+    cursor: str | None = None,
+):
+    """
+    篩選、排序並分頁取得 /api/scan 回傳的結果
+
+    於伺服器保留的欄式資料上運算，不重新掃描；相同條件的查詢會重複使用
+    排序結果。代碼逾時或被淘汰時回應 404，需重新呼叫 /api/scan。
+
+    Args:
+        handle: /api/scan 回應中的 handle
+        handles: 結果代碼登錄表
+        filters: 篩選條件（全部符合）
+        sort: 排序欄位
+        fields: 只輸出的欄位
+        limit: 每頁筆數
+        cursor: 上一頁回應的 next_cursor
+
+    Returns:
+        一頁資料、符合條件的總筆數與下一頁游標
+
+    Raises:
+        HTTPException: 代碼不存在（404）或條件無效（400）時
+    """
+    result_set = handles.get(handle) if handles is not None else None
+    if result_set is None:
+        raise HTTPException(status_code=404, detail="結果代碼不存在或已逾時")
+
+    try:
+        conditions = [Filter.parse(expression) for expression in filters]
+        keys = parse_sort(sort)
+        columns = [name.strip() for name in fields.split(",")] if fields else None
+        query = f"{conditions!r}|{keys!r}"
+        offset = decode_cursor(cursor, query) if cursor else 0
+        indices = result_set.select(conditions, keys)
+        data = result_set.page(indices, offset, limit, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    end = offset + len(data)
+    return Response(
+        content=encode_json(
+            {
+                "status": "success",
+                "handle": handle,
+                "data": data,
+                "count": len(data),
+                "total_count": len(indices),
+                "next_cursor": encode_cursor(end, query)
+                if end < len(indices)
+                else None,
+            }
+        ),
+        media_type="application/json",
+    )
@@ -1,10 +1,49 @@
 """股票掃描器 API 路由"""
 
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response, JSONResponse
-from app.models import ScanRequest, ScanResponse, StockData
-from sj_trading import execute_scan, generate_csv
+import math
+import time
+from typing import Annotated, Any, Literal
+
+from anyio import CapacityLimiter, to_thread
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from sj_trading import (
+    CircuitOpenError,
+    QuotaExceededError,
+    ResultHandles,
+    ScanResult,
+    iter_csv,
+    iter_ndjson,
+    join_rankings,
+    to_arrow_ipc_bytes,
+    to_parquet_bytes,
+)
+from sj_trading.quota import QUOTA_CRITICAL, QUOTA_EXHAUSTED
+from sj_trading.ratelimit import (
+    PRIORITY_BACKGROUND,
+)
+
+from app.api.deps import (
+    get_caller,
+    get_etag_cache,
+    get_result_handles,
+    get_scan_components,
+    get_scan_limiter,
+)
+from app.encoding import encode_json, encode_scan_response, normalize_rows
+from app.http_cache import NO_CACHE, EtagCache, cache_control, etag_matches
+from app.models import (
+    BatchScanRequest,
+    BatchScanResponse,
+    JoinScanRequest,
+    ScanRequest,
+    ScanResponse,
+)
+from app.scan_service import SCAN_ERRORS, run_scan
+from app.settings import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,16 +55,114 @@ logging.basicConfig(
 )
 
 
+def upstream_unavailable(e: CircuitOpenError) -> HTTPException:
+    """
+    斷路器開啟且沒有舊資料時的 503 回應
+
+    Args:
+        e: CircuitOpenError
+
+    Returns:
+        附 Retry-After 標頭的 HTTPException
+    """
+    logger.warning(f"上游斷路器開啟: {e}")
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+    )
+
+
+def json_response(
+    content: bytes,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    以已序列化的 JSON 建立回應，略過 FastAPI 的 response_model 驗證
+
+    Args:
+        content: JSON 位元組
+        status_code: HTTP 狀態碼
+        headers: 附加的回應標頭
+
+    Returns:
+        JSON 回應
+    """
+    return Response(
+        content=content,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def cache_headers(
+    key: str,
+    request: ScanRequest,
+    result: ScanResult,
+    etags: EtagCache | None,
+    max_age: float | None = None,
+) -> dict[str, str]:
+    """
+    產生掃描結果的 Cache-Control 與 ETag 標頭
+
+    Args:
+        key: 回應的識別字串（相同請求、不同表示法或不同結果代碼時需不同）
+        request: 掃描請求參數
+        result: 掃描結果
+        etags: ETag 快取，None 時不產生 ETag
+        max_age: 回應內容的有效秒數上限，None 表示沒有上限
+
+    Returns:
+        回應標頭
+    """
+    headers = {
+        "Cache-Control": cache_control(
+            request.date,
+            result.stale,
+            result.data_age,
+            settings.cache_today_ttl,
+            max_age,
+        )
+    }
+    if etags is not None:
+        headers["ETag"] = etags.etag(key, result.results)
+    return headers
+
+
+def not_modified(headers: dict[str, str], if_none_match: str | None) -> bool:
+    """If-None-Match 是否符合回應的 ETag（應回應 304）"""
+    return "ETag" in headers and etag_matches(if_none_match, headers["ETag"])
+
+
 @router.post("/scan", response_model=ScanResponse)
-async def scan_stocks(request: ScanRequest):
+async def scan_stocks(
+    request: ScanRequest,
+    components: Annotated[dict[str, Any], Depends(get_scan_components)],
+    limiter: Annotated[CapacityLimiter | None, Depends(get_scan_limiter)],
+    caller: Annotated[str, Depends(get_caller)],
+    handles: Annotated[ResultHandles | None, Depends(get_result_handles)],
+    etags: Annotated[EtagCache | None, Depends(get_etag_cache)],
+    if_none_match: Annotated[str | None, Header()] = None,
+):
     """
     執行股票掃描
 
+    回應帶有 ETag 與 Cache-Control（歷史日期為 immutable，當日資料為剩餘的
+    快取秒數）；If-None-Match 符合時回應 304，不重送資料。
+
     Args:
         request: 掃描請求參數
+        components: 連線池、快取等掃描元件
+        limiter: 同時掃描數量限制
+        caller: 呼叫者識別
+        handles: 結果代碼登錄表
+        etags: ETag 快取
+        if_none_match: If-None-Match 標頭
 
     Returns:
-        掃描結果
+        掃描結果，handle 可用於 /api/results/{handle} 篩選、排序與分頁
 
     Raises:
         HTTPException: 當掃描失敗時
@@ -37,51 +174,66 @@ async def scan_stocks(request: ScanRequest):
         )
 
         # 執行掃描
-        results, execution_time, usage_data = execute_scan(
-            scanner_type=request.scanner_type,
-            date=request.date,
-            count=request.count,
-            ascending=request.ascending,
-            simulation=request.simulation,
-            config_file="config.txt",
-        )
+        result = await run_scan(request, components, limiter, caller=caller)
+        usage_data = result.usage_data
+        meta: dict[str, Any] = {
+            "data_age": round(result.data_age, 3),
+            "stale": result.stale,
+        }
+        if handles is not None:
+            meta["handle"] = handles.register(request.key(), result.results)
 
-        # 轉換為 Pydantic 模型
-        stock_data = [StockData(**item) for item in results]
+        # 流量不足或已達上限時回傳 206 Partial Content（帶警告和資料）
+        if usage_data and result.quota_level in (QUOTA_CRITICAL, QUOTA_EXHAUSTED):
+            if usage_data["is_over_limit"]:
+                warning = f"{usage_data['warning']}，回傳快取資料"
+            else:
+                warning = (
+                    f"警告：流量即將用盡，剩餘 {usage_data['remaining_percent']:.2f}%"
+                )
+            return json_response(
+                encode_scan_response(
+                    result.results, result.execution_time, warning=warning, **meta
+                ),
+                status_code=206,
+                headers={"Cache-Control": NO_CACHE},
+            )
+
+        # 回應包含會過期的結果代碼時，快取時間不超過代碼的存活時間，ETag
+        # 也隨代碼改變，避免重新驗證後沿用已失效的代碼
+        if handles is not None:
+            headers = cache_headers(
+                f"{request.key()}:{meta['handle']}",
+                request,
+                result,
+                etags,
+                max_age=handles.ttl,
+            )
+        else:
+            headers = cache_headers(request.key(), request, result, etags)
+        if not_modified(headers, if_none_match):
+            return Response(status_code=304, headers=headers)
 
-        response_data = ScanResponse(
-            status="success",
-            data=stock_data,
-            total_count=len(stock_data),
-            execution_time=execution_time,
+        # 直接序列化原始資料，不逐筆建立 StockData 模型
+        return json_response(
+            encode_scan_response(result.results, result.execution_time, **meta),
+            headers=headers,
         )
 
-        # 檢查流量狀況並設定適當的 status code
-        if usage_data:
-            if usage_data["is_over_limit"]:
-                # 流量已超限，回傳 429 Too Many Requests
-                return JSONResponse(
-                    status_code=429,
-                    content={
-                        "detail": usage_data["warning"],
-                        "bytes_used": usage_data["bytes_used"],
-                        "limit_bytes": usage_data["limit_bytes"],
-                    },
-                )
-            elif usage_data["remaining_percent"] < 10:
-                # 流量剩餘不足 10%，回傳 206 Partial Content（帶警告和完整資料）
-                return JSONResponse(
-                    status_code=206,
-                    content={
-                        "status": "success",
-                        "data": [item.dict() for item in stock_data],
-                        "total_count": len(stock_data),
-                        "execution_time": execution_time,
-                        "warning": f"警告：流量即將用盡，剩餘 {usage_data['remaining_percent']:.2f}%",
-                    },
-                )
+    except QuotaExceededError as e:
+        # 流量已超限且沒有快取，回傳 429 Too Many Requests
+        logger.warning(f"流量已達上限: {e}")
+        return JSONResponse(
+            status_code=429,
+            content={
+                "detail": str(e),
+                "bytes_used": e.usage_data["bytes_used"],
+                "limit_bytes": e.usage_data["limit_bytes"],
+            },
+        )
 
-        return response_data
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e) from e
 
     except FileNotFoundError as e:
         logger.error(f"配置檔案錯誤: {e}")
@@ -100,45 +252,343 @@ async def scan_stocks(request: ScanRequest):
         raise HTTPException(status_code=500, detail=f"掃描失敗: {str(e)}")
 
 
+@router.get("/scan", response_model=ScanResponse)
+async def scan_stocks_query(
+    request: Annotated[ScanRequest, Query()],
+    components: Annotated[dict[str, Any], Depends(get_scan_components)],
+    limiter: Annotated[CapacityLimiter | None, Depends(get_scan_limiter)],
+    caller: Annotated[str, Depends(get_caller)],
+    handles: Annotated[ResultHandles | None, Depends(get_result_handles)],
+    etags: Annotated[EtagCache | None, Depends(get_etag_cache)],
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    """
+    以查詢參數執行股票掃描（與 POST /scan 相同）
+
+    瀏覽器與 HTTP 快取會依 Cache-Control 保留回應，並自動以 If-None-Match
+    重新驗證。
+    """
+    return await scan_stocks(
+        request, components, limiter, caller, handles, etags, if_none_match
+    )
+
+
+def batch_error_item(
+    request: dict[str, Any], error: str, elapsed_time: float
+) -> dict[str, Any]:
+    """
+    批次掃描中失敗項目的結果
+
+    Args:
+        request: 請求內容
+        error: 錯誤訊息
+        elapsed_time: 經過時間（秒）
+
+    Returns:
+        BatchScanItem 格式的字典
+    """
+    return {
+        "request": request,
+        "status": "error",
+        "data": [],
+        "total_count": 0,
+        "execution_time": 0.0,
+        "elapsed_time": elapsed_time,
+        "data_age": 0.0,
+        "stale": False,
+        "error": error,
+    }
+
+
+def validation_message(error: ValidationError) -> str:
+    """將欄位驗證錯誤轉為單行訊息"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+@router.post("/scan/batch", response_model=BatchScanResponse)
+async def scan_batch(
+    batch: BatchScanRequest,
+    components: Annotated[dict[str, Any], Depends(get_scan_components)],
+    limiter: Annotated[CapacityLimiter | None, Depends(get_scan_limiter)],
+    caller: Annotated[str, Depends(get_caller)],
+):
+    """
+    批次執行多個掃描
+
+    各掃描共用連線池與快取並行執行，單一掃描失敗不影響其他結果。等待上游
+    速率限制額度時以 background 優先順序排隊，排在單一掃描請求之後。
+
+    Args:
+        batch: 批次掃描請求
+        components: 連線池、快取等掃描元件
+        limiter: 同時掃描數量限制
+        caller: 呼叫者識別
+
+    Returns:
+        以請求識別字串為鍵的掃描結果
+    """
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(batch.concurrency or settings.batch_concurrency)
+
+    # 個別驗證，欄位錯誤只影響該項目；相同參數的請求只執行一次
+    unique: dict[str, ScanRequest] = {}
+    invalid: dict[str, dict[str, Any]] = {}
+    for index, raw in enumerate(batch.scans):
+        try:
+            scan = ScanRequest.model_validate(raw)
+        except ValidationError as e:
+            invalid[f"invalid:{index}"] = batch_error_item(
+                raw, validation_message(e), 0.0
+            )
+            continue
+        unique[scan.key()] = scan
+    logger.info(f"開始批次掃描: {len(unique)} 個請求，{len(invalid)} 個欄位錯誤")
+
+    async def run_one(scan: ScanRequest) -> dict[str, Any]:
+        item_start = time.time()
+        async with semaphore:
+            try:
+                result = await run_scan(
+                    scan,
+                    components,
+                    limiter,
+                    priority=PRIORITY_BACKGROUND,
+                    caller=caller,
+                )
+            # 掃描錯誤個別回報；其他例外視為程式錯誤，讓整個批次請求失敗
+            except SCAN_ERRORS as e:
+                logger.error(f"批次掃描項目失敗 {scan.key()}: {e}")
+                return batch_error_item(
+                    scan.model_dump(),
+                    f"{type(e).__name__}: {e}",
+                    time.time() - item_start,
+                )
+
+        return {
+            "request": scan.model_dump(),
+            "status": "success",
+            "data": normalize_rows(result.results),
+            "total_count": len(result.results),
+            "execution_time": result.execution_time,
+            "elapsed_time": time.time() - item_start,
+            "data_age": round(result.data_age, 3),
+            "stale": result.stale,
+            "error": None,
+        }
+
+    items = await asyncio.gather(*(run_one(scan) for scan in unique.values()))
+    results = {**dict(zip(unique.keys(), items, strict=True)), **invalid}
+    error_count = sum(1 for item in results.values() if item["status"] == "error")
+
+    return json_response(
+        encode_json(
+            {
+                "status": "success" if error_count == 0 else "partial",
+                "results": results,
+                "success_count": len(results) - error_count,
+                "error_count": error_count,
+                "execution_time": time.time() - start_time,
+            }
+        )
+    )
+
+
+@router.post("/scan/join")
+async def scan_join(
+    request: JoinScanRequest,
+    components: Annotated[dict[str, Any], Depends(get_scan_components)],
+    limiter: Annotated[CapacityLimiter | None, Depends(get_scan_limiter)],
+    caller: Annotated[str, Depends(get_caller)],
+):
+    """
+    執行多個掃描器並依股票代號合併排名
+
+    各掃描共用連線池與快取並行執行，結果以 intersect、union 或 difference
+    合併，每個掃描器的名次與數值各為一欄（{scanner_type}_rank、
+    {scanner_type}_value）。
+
+    Args:
+        request: 合併請求參數
+        components: 連線池、快取等掃描元件
+        limiter: 同時掃描數量限制
+        caller: 呼叫者識別
+
+    Returns:
+        合併後的資料
+
+    Raises:
+        HTTPException: 當任一掃描失敗時
+    """
+    start_time = time.time()
+    logger.info(
+        f"開始合併掃描: types={request.scanner_types}, date={request.date}, "
+        f"how={request.how}"
+    )
+
+    try:
+        results = await asyncio.gather(
+            *(
+                run_scan(scan, components, limiter, caller=caller)
+                for scan in request.scans()
+            )
+        )
+    except QuotaExceededError as e:
+        logger.warning(f"流量已達上限: {e}")
+        raise HTTPException(status_code=429, detail=str(e)) from e
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e) from e
+    except Exception as e:
+        logger.error(f"合併掃描失敗: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"掃描失敗: {str(e)}") from e
+
+    rankings = {
+        scanner_type: result.results
+        for scanner_type, result in zip(request.scanner_types, results, strict=True)
+    }
+    data = join_rankings(rankings, request.how, request.value_field)
+    return json_response(
+        encode_json(
+            {
+                "status": "success",
+                "how": request.how,
+                "scanner_types": request.scanner_types,
+                "data": data,
+                "total_count": len(data),
+                "counts": {name: len(rows) for name, rows in rankings.items()},
+                "execution_time": time.time() - start_time,
+                "stale": any(result.stale for result in results),
+            }
+        )
+    )
+
+
+@router.get("/usage")
+async def get_usage(
+    components: Annotated[dict[str, Any], Depends(get_scan_components)],
+    simulation: bool = True,
+    refresh: bool = False,
+):
+    """
+    取得預估的 API 流量使用狀況
+
+    預設回傳本地預估值（上次 usage() 查詢結果加上之後掃描的估算用量），
+    不呼叫 Shioaji；refresh=true 或尚無資料時才實際查詢。
+
+    Args:
+        components: 連線池、快取等掃描元件
+        simulation: 是否模擬模式
+        refresh: 是否強制查詢實際用量
+
+    Returns:
+        流量使用資訊
+    """
+    quota = components["quota"]
+    if quota is None:
+        raise HTTPException(status_code=503, detail="配額追蹤尚未啟動")
+
+    usage_data = None if refresh else quota.usage(simulation)
+    if usage_data is None:
+        usage_data = await to_thread.run_sync(quota.refresh, simulation)
+    if usage_data is None:
+        raise HTTPException(status_code=502, detail="無法取得流量使用狀況")
+
+    return {
+        **usage_data,
+        "simulation": simulation,
+        "bytes_per_row": round(quota.bytes_per_row, 2),
+    }
+
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
 @router.post("/export")
-async def export_csv(request: ScanRequest):
+async def export_csv(
+    request: ScanRequest,
+    components: Annotated[dict[str, Any], Depends(get_scan_components)],
+    limiter: Annotated[CapacityLimiter | None, Depends(get_scan_limiter)],
+    caller: Annotated[str, Depends(get_caller)],
+    etags: Annotated[EtagCache | None, Depends(get_etag_cache)],
+    export_format: Annotated[
+        Literal["csv", "ndjson", "parquet", "arrow"],
+        Query(alias="format", description="匯出格式"),
+    ] = "csv",
+    if_none_match: Annotated[str | None, Header()] = None,
+):
     """
-    匯出 CSV 檔案
+    匯出掃描結果檔案（CSV、NDJSON、Parquet 或 Arrow IPC）
+
+    與 /scan 相同帶有 ETag 與 Cache-Control，If-None-Match 符合時回應 304。
 
     Args:
         request: 掃描請求參數
+        components: 連線池、快取等掃描元件
+        limiter: 同時掃描數量限制
+        caller: 呼叫者識別
+        etags: ETag 快取
+        export_format: 匯出格式
+        if_none_match: If-None-Match 標頭
 
     Returns:
-        CSV 檔案
+        匯出檔案
 
     Raises:
         HTTPException: 當匯出失敗時
     """
     try:
-        logger.info(f"開始匯出 CSV: date={request.date}, count={request.count}")
+        logger.info(
+            f"開始匯出 {export_format}: date={request.date}, count={request.count}"
+        )
 
         # 執行掃描
-        results, _, _ = execute_scan(
-            scanner_type=request.scanner_type,
-            date=request.date,
-            count=request.count,
-            ascending=request.ascending,
-            simulation=request.simulation,
-            config_file="config.txt",
+        result = await run_scan(request, components, limiter, caller=caller)
+        results = result.results
+
+        headers = cache_headers(
+            f"{request.key()}:{export_format}", request, result, etags
+        )
+        if not_modified(headers, if_none_match):
+            return Response(status_code=304, headers=headers)
+        headers["Content-Disposition"] = (
+            f"attachment; filename=stock_scan_{request.date}.{export_format}"
         )
+        media_type = EXPORT_MEDIA_TYPES[export_format]
 
-        # 產生 CSV
-        csv_content = generate_csv(results)
+        if export_format == "csv":
+            # 逐段產生並串流 CSV，BOM 已包含在第一段
+            return StreamingResponse(
+                (chunk.encode("utf-8") for chunk in iter_csv(results)),
+                media_type=media_type,
+                headers=headers,
+            )
 
-        # 返回 CSV 檔案
-        return Response(
-            content=csv_content.encode("utf-8-sig"),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=stock_scan_{request.date}.csv"
-            },
-        )
+        if export_format == "ndjson":
+            return StreamingResponse(
+                (line.encode("utf-8") for line in iter_ndjson(results)),
+                media_type=media_type,
+                headers=headers,
+            )
+
+        # 欄式格式需完整建立後輸出，於工作執行緒中轉換
+        encode = to_parquet_bytes if export_format == "parquet" else to_arrow_ipc_bytes
+        content = await to_thread.run_sync(encode, results)
+        return Response(content=content, media_type=media_type, headers=headers)
+
+    except QuotaExceededError as e:
+        logger.warning(f"流量已達上限: {e}")
+        raise HTTPException(status_code=429, detail=str(e)) from e
+
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e) from e
 
     except Exception as e:
-        logger.error(f"CSV 匯出失敗: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"CSV 匯出失敗: {str(e)}")
+        logger.error(f"{export_format} 匯出失敗: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"匯出失敗: {str(e)}")
@@ -0,0 +1,189 @@
+"""回應壓縮中介層（gzip，安裝 brotli 時優先使用 br）"""
+
+import zlib
+from collections.abc import Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 為選用依賴
+    brotli = None  # type: ignore[assignment]
+
+# 會壓縮的回應類型；text/event-stream 等串流推送不壓縮，避免緩衝延遲
+COMPRESSIBLE_TYPES = frozenset(
+    {"application/json", "text/csv", "application/x-ndjson", "text/plain"}
+)
+
+
+def choose_encoding(accept_encoding: str, allow_brotli: bool = True) -> str | None:
+    """
+    依 Accept-Encoding 選擇壓縮方式
+
+    Args:
+        accept_encoding: Accept-Encoding 標頭值
+        allow_brotli: 是否可使用 br（需安裝 brotli）
+
+    Returns:
+        br、gzip 或 None（不壓縮）；權重相同時優先 br
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if token.strip():
+            weights[token.strip().lower()] = weight
+
+    candidates = ["br", "gzip"] if allow_brotli and brotli is not None else ["gzip"]
+    best, best_weight = None, 0.0
+    for encoding in candidates:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    壓縮 JSON、CSV、NDJSON 與純文字回應
+
+    完整回應小於 minimum_size 時不壓縮；串流回應（例如 CSV 匯出）逐段壓縮。
+    已設定 Content-Encoding 的回應與 304 不處理。可壓縮的類型一律加上
+    Vary: Accept-Encoding。
+
+    Attributes:
+        minimum_size: 壓縮的最小位元組數
+        gzip_level: gzip 壓縮等級（1-9）
+        brotli_quality: brotli 壓縮品質（0-11）
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    """單一請求的回應壓縮"""
+
+    def __init__(self, owner: CompressionMiddleware, encoding: str | None, send: Send):
+        self.owner = owner
+        self.encoding = encoding
+        self.send = send
+        self.start: Message | None = None
+        self.passthrough = False
+        self.compress: Callable[[bytes], bytes] | None = None
+        self.finish: Callable[[], bytes] | None = None
+
+    async def __call__(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._flush_start()
+            self.passthrough = True
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not self._compressible(start, headers):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is None or (
+                not more_body and len(body) < self.owner.minimum_size
+            ):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self._open()
+            assert self.compress is not None and self.finish is not None
+            headers["Content-Encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                # 壓縮後的位元組與原內容不同，強驗證碼改為弱驗證碼
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+                await self.send(start)
+                await self.send(
+                    {
+                        "type": "http.response.body",
+                        "body": self.compress(body),
+                        "more_body": True,
+                    }
+                )
+                return
+            compressed = self.compress(body) + self.finish()
+            headers["Content-Length"] = str(len(compressed))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        assert self.compress is not None and self.finish is not None
+        chunk = self.compress(body)
+        if not more_body:
+            chunk += self.finish()
+        await self.send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
+
+    def _compressible(self, start: Message, headers: MutableHeaders) -> bool:
+        """回應是否為可壓縮的類型"""
+        if start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").partition(";")[0].strip()
+        return media_type.lower() in COMPRESSIBLE_TYPES
+
+    def _open(self) -> None:
+        """建立串流壓縮器"""
+        if self.encoding == "br":
+            compressor = brotli.Compressor(quality=self.owner.brotli_quality)
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            # wbits=31 產生 gzip 格式（含標頭與檢查碼）
+            compressor = zlib.compressobj(self.owner.gzip_level, zlib.DEFLATED, 31)
+            self.compress, self.finish = compressor.compress, compressor.flush
+
+    async def _flush_start(self) -> None:
+        """送出尚未送出的回應開頭"""
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self.send(start)
@@ -0,0 +1,101 @@
+"""掃描回應的快速 JSON 序列化"""
+
+import json
+import math
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import date, datetime, time
+from typing import Any
+
+from app.models import StockData
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 為選用依賴
+    orjson = None  # type: ignore[assignment]
+
+# StockData 宣告的欄位，依宣告順序排在每筆資料最前面（與 Pydantic 輸出一致）
+_EMPTY_ROW: dict[str, Any] = dict.fromkeys(StockData.model_fields)
+
+
+def normalize_rows(results: Iterable[Mapping[str, Any]]) -> list[dict[str, Any]]:
+    """
+    將掃描結果整理為與 StockData 序列化相同的欄位結構
+
+    不逐筆建立 Pydantic 模型：宣告欄位在前（缺值為 None），其餘欄位依原順序附加。
+
+    Args:
+        results: 掃描結果
+
+    Returns:
+        字典列表
+    """
+    return [{**_EMPTY_ROW, **item} for item in results]
+
+
+def _default(value: Any) -> Any:
+    """後備序列化：日期時間為 ISO 8601（與 orjson 一致），其他物件轉為字串"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _finite(value: Any) -> Any:
+    """將 NaN 與無限大轉為 None（與 orjson 一致，且輸出為合法 JSON）"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def encode_json(content: Any) -> bytes:
+    """
+    序列化為 JSON 位元組，有安裝 orjson 時使用 orjson
+
+    未安裝時以標準函式庫產生相同的輸出：NaN 與無限大為 null，
+    日期時間為 ISO 8601 字串。
+
+    Args:
+        content: 可序列化的物件
+
+    Returns:
+        JSON 位元組
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=str)
+    return json.dumps(
+        _finite(content),
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=_default,
+        allow_nan=False,
+    ).encode("utf-8")
+
+
+def encode_scan_response(
+    results: Sequence[Mapping[str, Any]],
+    execution_time: float,
+    **extra: Any,
+) -> bytes:
+    """
+    直接由掃描結果產生 ScanResponse 格式的 JSON
+
+    Args:
+        results: 掃描結果
+        execution_time: 執行時間
+        extra: 附加的回應欄位（例如 warning）
+
+    Returns:
+        JSON 位元組
+    """
+    return encode_json(
+        {
+            "status": "success",
+            "data": normalize_rows(results),
+            "total_count": len(results),
+            "execution_time": execution_time,
+            **extra,
+        }
+    )
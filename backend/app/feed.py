@@ -0,0 +1,265 @@
+"""即時掃描訂閱：每個掃描條件只輪詢一次，將變化推送給所有訂閱者"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping, Sequence
+from typing import Any
+
+from sj_trading import ScanResult
+
+from app.encoding import normalize_rows
+from app.models import ScanRequest
+from app.scan_service import SCAN_ERRORS
+
+logger = logging.getLogger(__name__)
+
+EVENT_SNAPSHOT = "snapshot"
+EVENT_DELTA = "delta"
+EVENT_ERROR = "error"
+EVENT_PING = "ping"
+
+Event = tuple[str, dict[str, Any]]
+ScanFunction = Callable[[ScanRequest], Awaitable[ScanResult]]
+
+
+def diff_rows(
+    before: Sequence[Mapping[str, Any]], after: Sequence[Mapping[str, Any]]
+) -> dict[str, Any] | None:
+    """
+    計算兩次掃描結果的差異
+
+    Args:
+        before: 上次的資料列（已 normalize）
+        after: 本次的資料列（已 normalize）
+
+    Returns:
+        包含 upsert（新增或內容有變的資料列）、remove（退出的代號）與
+        order（排名順序有變時的完整代號列表，否則為 None）的字典；
+        沒有任何變化時為 None
+    """
+    old = {row["code"]: row for row in before}
+    codes = [row["code"] for row in after]
+    upsert = [row for row in after if old.get(row["code"]) != row]
+    current = set(codes)
+    remove = [code for code in old if code not in current]
+    order = codes if codes != [row["code"] for row in before] else None
+    if not upsert and not remove and order is None:
+        return None
+    return {"upsert": upsert, "remove": remove, "order": order}
+
+
+class Subscriber:
+    """
+    單一訂閱者
+
+    佇列已滿（消費太慢）時丟棄尚未送出的事件，改為下次送出完整快照，
+    記憶體用量不會隨落後程度增加。
+
+    Attributes:
+        queue: 待送出的事件
+        resyncs: 因佇列已滿而改送快照的次數
+    """
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(max_queue)
+        self.resyncs = 0
+
+    def push(self, event: Event, snapshot: Callable[[], Event]) -> None:
+        """
+        加入事件，佇列已滿時改為只保留一個完整快照
+
+        Args:
+            event: 事件
+            snapshot: 產生目前完整快照事件的函式
+        """
+        try:
+            self.queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            pass
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(snapshot())
+        self.resyncs += 1
+
+
+class _Poller:
+    """單一掃描條件的輪詢工作與其訂閱者"""
+
+    def __init__(self, request: ScanRequest):
+        self.request = request
+        self.subscribers: set[Subscriber] = set()
+        self.rows: list[dict[str, Any]] | None = None
+        self.version = 0
+        self.updated_at = 0.0
+        self.data_age = 0.0
+        self.polls = 0
+        self.task: asyncio.Task[None] | None = None
+
+    def snapshot(self) -> Event:
+        """目前完整結果的事件"""
+        return (
+            EVENT_SNAPSHOT,
+            {
+                "version": self.version,
+                "data": self.rows or [],
+                "total_count": len(self.rows or []),
+                "updated_at": self.updated_at,
+                "data_age": round(self.data_age, 3),
+            },
+        )
+
+    def publish(self, event: Event) -> None:
+        for subscriber in list(self.subscribers):
+            subscriber.push(event, self.snapshot)
+
+
+class LiveFeed:
+    """
+    即時掃描訂閱管理
+
+    相同掃描條件的訂閱者共用一個輪詢工作，每隔 interval 秒執行一次掃描
+    （經由一般的掃描流程，因此同樣使用快取、請求合併與配額控管），
+    有變化時才推送差異。最後一個訂閱者離開時停止輪詢，上游負載只與
+    不同掃描條件的數量有關，與觀看人數無關。
+
+    Attributes:
+        interval: 輪詢間隔（秒）
+        max_queue: 每個訂閱者最多暫存的事件數
+        heartbeat: 沒有事件時送出 ping 的間隔（秒）
+    """
+
+    def __init__(
+        self,
+        scan: ScanFunction,
+        interval: float = 5.0,
+        max_queue: int = 16,
+        heartbeat: float = 15.0,
+    ):
+        """
+        初始化
+
+        Args:
+            scan: 執行掃描的協程函式
+            interval: 輪詢間隔（秒）
+            max_queue: 每個訂閱者最多暫存的事件數
+            heartbeat: 沒有事件時送出 ping 的間隔（秒）
+        """
+        self.interval = interval
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self._scan = scan
+        self._pollers: dict[str, _Poller] = {}
+        self.resyncs = 0
+
+    async def subscribe(self, request: ScanRequest) -> AsyncIterator[Event]:
+        """
+        訂閱掃描條件，逐一產生事件
+
+        第一個事件為目前的完整快照（尚未有結果時等待第一次掃描），
+        之後為差異或錯誤事件；超過 heartbeat 秒沒有事件時產生 ping。
+        呼叫端停止迭代時自動取消訂閱。
+
+        Args:
+            request: 掃描條件
+
+        Yields:
+            (事件名稱, 資料)
+        """
+        key = request.key()
+        poller = self._pollers.get(key)
+        if poller is None:
+            poller = _Poller(request)
+            self._pollers[key] = poller
+            poller.task = asyncio.create_task(self._run(poller))
+            logger.info(f"開始輪詢 {key}")
+
+        subscriber = Subscriber(self.max_queue)
+        if poller.rows is not None:
+            subscriber.push(poller.snapshot(), poller.snapshot)
+        poller.subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except TimeoutError:
+                    yield EVENT_PING, {}
+        finally:
+            poller.subscribers.discard(subscriber)
+            self.resyncs += subscriber.resyncs
+            if not poller.subscribers and self._pollers.get(key) is poller:
+                del self._pollers[key]
+                if poller.task is not None:
+                    poller.task.cancel()
+                logger.info(f"停止輪詢 {key}")
+
+    async def close(self) -> None:
+        """停止所有輪詢工作"""
+        tasks = [p.task for p in self._pollers.values() if p.task is not None]
+        self._pollers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得統計
+
+        Returns:
+            輪詢中的掃描條件數、訂閱者數、輪詢次數與改送快照次數
+        """
+        pollers = list(self._pollers.values())
+        return {
+            "specs": len(pollers),
+            "subscribers": sum(len(p.subscribers) for p in pollers),
+            "polls": sum(p.polls for p in pollers),
+            "resyncs": self.resyncs
+            + sum(s.resyncs for p in pollers for s in p.subscribers),
+            "interval": self.interval,
+        }
+
+    async def _run(self, poller: _Poller) -> None:
+        """輪詢迴圈；掃描錯誤推送為 error 事件，其他例外視為程式錯誤而結束輪詢"""
+        while True:
+            started = time.monotonic()
+            try:
+                result = await self._scan(poller.request)
+            except SCAN_ERRORS as e:
+                logger.warning(f"即時掃描失敗 {poller.request.key()}: {e}")
+                poller.publish((EVENT_ERROR, {"detail": f"{type(e).__name__}: {e}"}))
+            else:
+                poller.polls += 1
+                self._update(poller, result)
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0.0, self.interval - elapsed))
+
+    @staticmethod
+    def _update(poller: _Poller, result: ScanResult) -> None:
+        """比較新結果並推送事件"""
+        rows = normalize_rows(result.results)
+        poller.data_age = result.data_age
+        if poller.rows is None:
+            poller.rows = rows
+            poller.version = 1
+            poller.updated_at = time.time()
+            poller.publish(poller.snapshot())
+            return
+
+        delta = diff_rows(poller.rows, rows)
+        if delta is None:
+            return
+        poller.rows = rows
+        poller.version += 1
+        poller.updated_at = time.time()
+        poller.publish(
+            (
+                EVENT_DELTA,
+                {
+                    "version": poller.version,
+                    "updated_at": poller.updated_at,
+                    "data_age": round(result.data_age, 3),
+                    **delta,
+                },
+            )
+        )
@@ -0,0 +1,126 @@
+"""掃描回應的 HTTP 快取驗證（ETag、Cache-Control、If-None-Match）"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from sj_trading import same_rows
+from sj_trading.trading_calendar import taipei_today
+
+from app.encoding import encode_json, normalize_rows
+
+# 歷史日期的資料不會再變動
+IMMUTABLE = "public, max-age=31536000, immutable"
+NO_CACHE = "no-cache"
+
+
+class EtagCache:
+    """
+    依掃描請求保留結果的 ETag
+
+    快取命中時掃描結果為相同的資料列物件，只需比對物件是否相同即可沿用
+    ETag，不必重新序列化計算雜湊。
+
+    Attributes:
+        max_entries: 最多保留的請求數
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        初始化
+
+        Args:
+            max_entries: 最多保留的請求數
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Sequence[Any], str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, key: str, results: Sequence[Mapping[str, Any]]) -> str:
+        """
+        取得掃描結果的 ETag
+
+        以請求識別字串與資料列內容計算，相同內容得到相同 ETag（重新啟動
+        後亦同）。回應中的 execution_time、data_age 等欄位每次不同，因此為
+        弱驗證碼（W/），也不因回應壓縮而改變。
+
+        Args:
+            key: 掃描請求的識別字串
+            results: 掃描結果
+
+        Returns:
+            ETag 標頭值
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and same_rows(entry[0], results):
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # 序列化在鎖外進行，不阻擋其他請求
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16)
+        digest.update(encode_json(normalize_rows(results)))
+        etag = f'W/"{digest.hexdigest()}"'
+        with self._lock:
+            self._entries[key] = (results, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-Match 是否符合目前的 ETag（弱比較）
+
+    Args:
+        if_none_match: If-None-Match 標頭值，可為逗號分隔的多個 ETag 或 *
+        etag: 目前的 ETag
+
+    Returns:
+        是否符合（應回應 304）
+    """
+    if not if_none_match:
+        return False
+    target = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == target:
+            return True
+    return False
+
+
+def cache_control(
+    date: str,
+    stale: bool,
+    data_age: float,
+    today_ttl: float,
+    max_age: float | None = None,
+) -> str:
+    """
+    依資料日期決定 Cache-Control
+
+    Args:
+        date: 查詢日期
+        stale: 是否為過期的快取資料
+        data_age: 資料取得至今的秒數
+        today_ttl: 當日資料的快取存活時間（秒）
+        max_age: 回應內容本身的有效秒數上限（例如會過期的結果代碼），
+            None 表示沒有上限
+
+    Returns:
+        歷史日期為 immutable（有 max_age 時改為該秒數）；當日資料為剩餘的
+        快取秒數（不超過 max_age）；過期資料為 no-cache
+    """
+    if stale:
+        return NO_CACHE
+    if date < taipei_today().isoformat():
+        if max_age is None:
+            return IMMUTABLE
+        return f"public, max-age={int(max_age)}"
+    remaining = max(0, int(today_ttl - data_age))
+    if max_age is not None:
+        remaining = min(remaining, int(max_age))
+    return f"public, max-age={remaining}"
@@ -1,12 +1,216 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
+from functools import partial
+
+from anyio import CapacityLimiter, to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from sj_trading import (
+    DegradationPolicy,
+    QuotaTracker,
+    ResultHandles,
+    RetryPolicy,
+    ScanCache,
+    ScanResult,
+    ScanStore,
+    SessionPool,
+    SingleFlight,
+    TradingCalendar,
+    UpstreamGuard,
+    UpstreamLimiter,
+)
+from sj_trading.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from sj_trading.ratelimit import PRIORITY_BACKGROUND
+from sj_trading.replay import ReplayLog, ScanRecorder, recording_factory
+from sj_trading.trading_calendar import taipei_today
+
 from app import __version__
-from app.api.routes import scanner
+from app.api.deps import scan_components
+from app.api.routes import feed, history, results, scanner
+from app.compression import CompressionMiddleware
+from app.feed import LiveFeed
+from app.http_cache import EtagCache
+from app.metrics import collect_component_metrics
+from app.models import ScanRequest
+from app.scan_service import run_scan
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 精簡歷史儲存的間隔（秒）
+STORE_COMPACT_INTERVAL = 6 * 3600
+
+
+async def compact_store(store: ScanStore, calendar: TradingCalendar) -> None:
+    """
+    定期精簡超過保留天數的盤中快照
+
+    Args:
+        store: 歷史儲存
+        calendar: 交易日曆（決定收盤時間）
+    """
+    while True:
+        before = taipei_today() - timedelta(days=settings.store_retention_days)
+        try:
+            await to_thread.run_sync(
+                store.compact, before.isoformat(), calendar.is_final
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"精簡歷史儲存失敗: {e}")
+        await asyncio.sleep(STORE_COMPACT_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    應用程式生命週期：啟動時建立 Shioaji 連線池、快取、請求合併器、配額追蹤、
+    歷史儲存（含定期精簡）、交易日曆與即時掃描訂閱，關閉時停止背景工作、
+    登出並關閉資料庫
+    """
+    api_factory = None
+    offline_config = None
+    if settings.replay_file or settings.fake_upstream:
+        # 只在離線模式（重播或模擬後端）載入模擬後端，改用不需帳密的配置
+        from sj_trading.fake import FAKE_CONFIG, FakeConfig, FakeShioaji
+
+        offline_config = FAKE_CONFIG
+        if settings.replay_file:
+            api_factory = ReplayLog(settings.replay_file).factory(settings.replay_speed)
+        else:
+            api_factory = FakeShioaji.factory(
+                FakeConfig(
+                    latency=settings.fake_latency,
+                    failure_rate=settings.fake_failure_rate,
+                )
+            )
+    recorder = ScanRecorder(settings.record_file) if settings.record_file else None
+    if recorder is not None:
+        api_factory = recording_factory(recorder, api_factory)
+    upstream_limiter = (
+        UpstreamLimiter(settings.upstream_budgets)
+        if settings.upstream_budgets
+        else None
+    )
+    app.state.upstream_limiter = upstream_limiter
+    pool = SessionPool(
+        config_file=settings.config_file,
+        size=settings.session_pool_size,
+        health_check_interval=settings.session_health_check_interval,
+        max_session_age=settings.session_max_age,
+        acquire_timeout=settings.session_acquire_timeout,
+        api_factory=api_factory,
+        config=offline_config,
+        limiter=upstream_limiter,
+    )
+    app.state.session_pool = pool
+    guard = UpstreamGuard(
+        timeout=settings.upstream_timeout,
+        retry=RetryPolicy(
+            attempts=settings.upstream_retries + 1,
+            base_delay=settings.upstream_retry_base_delay,
+            max_delay=settings.upstream_retry_max_delay,
+        ),
+        failure_threshold=settings.circuit_failure_threshold,
+        reset_timeout=settings.circuit_reset_timeout,
+        hedge_after=settings.upstream_hedge_after or None,
+        hedge_workers=settings.scan_concurrency,
+    )
+    app.state.upstream_guard = guard
+    cache = ScanCache(
+        max_entries=settings.cache_max_entries,
+        today_ttl=settings.cache_today_ttl,
+    )
+    app.state.scan_cache = cache
+    app.state.scan_flight = SingleFlight()
+    app.state.scan_limiter = CapacityLimiter(settings.scan_concurrency)
+    app.state.result_handles = ResultHandles(
+        ttl=settings.result_handle_ttl,
+        max_entries=settings.result_handle_max_entries,
+    )
+    app.state.etag_cache = EtagCache(max_entries=settings.result_handle_max_entries)
+    quota = QuotaTracker(
+        pool,
+        refresh_interval=settings.quota_refresh_interval,
+        bytes_per_row=settings.quota_bytes_per_row,
+    )
+    app.state.quota_tracker = quota
+    app.state.degradation_policy = DegradationPolicy(
+        conserve_below=settings.quota_conserve_below,
+        critical_below=settings.quota_critical_below,
+        conserve_ttl_factor=settings.quota_conserve_ttl_factor,
+    )
+    store = ScanStore(settings.store_path) if settings.store_path else None
+    app.state.scan_store = store
+    calendar = TradingCalendar(
+        settings.calendar_file or None, close_time=settings.market_close
+    )
+    app.state.trading_calendar = calendar
+
+    # 收盤後確認查無資料的掃描條件不再向 Shioaji 查詢
+    if store is not None:
+        for scanner_type, date, ascending, simulation in store.empty_scans(
+            calendar.is_final
+        ):
+            cache.mark_empty(scanner_type, date, ascending, simulation, final=True)
+    compactor = (
+        asyncio.create_task(compact_store(store, calendar))
+        if store is not None and settings.store_retention_days > 0
+        else None
+    )
+
+    async def poll(request: ScanRequest) -> ScanResult:
+        return await run_scan(
+            request,
+            scan_components(app.state),
+            app.state.scan_limiter,
+            priority=PRIORITY_BACKGROUND,
+            caller="feed",
+        )
+
+    live_feed = LiveFeed(
+        poll,
+        interval=settings.feed_interval,
+        max_queue=settings.feed_queue_size,
+        heartbeat=settings.feed_heartbeat,
+    )
+    app.state.live_feed = live_feed
+
+    collector = partial(collect_component_metrics, app.state)
+    REGISTRY.add_collector(collector)
+
+    # 於背景預熱，避免登入耗時拖慢啟動
+    modes = [mode == "simulation" for mode in settings.session_pool_warmup]
+    threading.Thread(target=pool.warm_up, args=(modes,), daemon=True).start()
+    quota.start(modes)
+
+    yield
+
+    REGISTRY.remove_collector(collector)
+    if compactor is not None:
+        compactor.cancel()
+        with suppress(asyncio.CancelledError):
+            await compactor
+    await live_feed.close()
+    quota.stop()
+    guard.close()
+    pool.close()
+    if store is not None:
+        store.close()
+    if recorder is not None:
+        recorder.close()
+
 
 app = FastAPI(
     title="Stock Scanner API",
     description="永豐金證券股票掃描 API",
     version=__version__,
+    lifespan=lifespan,
 )
 
 # 配置 CORS
@@ -16,10 +220,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+if settings.compression:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+
 # 註冊路由
 app.include_router(scanner.router, prefix="/api", tags=["scanner"])
+app.include_router(history.router, prefix="/api", tags=["history"])
+app.include_router(results.router, prefix="/api", tags=["results"])
+app.include_router(feed.router, prefix="/api", tags=["feed"])
 
 
 @app.get("/")
@@ -36,3 +252,37 @@ async def get_version():
     取得 API 版本資訊
     """
     return {"version": __version__}
+
+
+@app.get("/api/stats")
+async def get_stats():
+    """
+    取得連線池、上游速率限制與斷路器、掃描快取、請求合併、掃描工作執行緒、
+    結果代碼、即時訂閱與歷史儲存統計
+    """
+    store = app.state.scan_store
+    upstream_limiter = app.state.upstream_limiter
+    return {
+        "session_pool": app.state.session_pool.stats(),
+        "upstream_limiter": (
+            upstream_limiter.stats() if upstream_limiter is not None else None
+        ),
+        "upstream_guard": app.state.upstream_guard.stats(),
+        "cache": app.state.scan_cache.stats(),
+        "single_flight": app.state.scan_flight.stats(),
+        "scan_workers": {
+            "limit": app.state.scan_limiter.total_tokens,
+            "busy": app.state.scan_limiter.borrowed_tokens,
+        },
+        "result_handles": app.state.result_handles.stats(),
+        "live_feed": app.state.live_feed.stats(),
+        "store": store.stats() if store is not None else None,
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    以 Prometheus 文字格式輸出掃描流程各階段耗時、呼叫次數、錯誤與元件狀態
+    """
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
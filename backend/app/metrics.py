@@ -0,0 +1,108 @@
+"""應用程式元件的 Prometheus 指標"""
+
+from typing import Any
+
+from sj_trading.metrics import REGISTRY
+
+QUOTA_BYTES_USED = REGISTRY.gauge(
+    "sj_quota_bytes_used",
+    "預估已使用的 API 流量（bytes）",
+    ["mode"],
+)
+QUOTA_LIMIT_BYTES = REGISTRY.gauge(
+    "sj_quota_limit_bytes",
+    "API 流量上限（bytes）",
+    ["mode"],
+)
+POOL_SESSIONS = REGISTRY.gauge(
+    "sj_session_pool_sessions",
+    "連線池連線數，state 為 created 或 idle",
+    ["mode", "state"],
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    "sj_cache_entries",
+    "掃描快取項目數",
+)
+CACHE_EVENTS = REGISTRY.counter(
+    "sj_cache_events_total",
+    "掃描快取事件次數（hit、stale_hit、miss、eviction、empty_hit）",
+    ["event"],
+)
+SINGLE_FLIGHT = REGISTRY.counter(
+    "sj_single_flight_total",
+    "請求合併次數，result 為 executed 或 coalesced",
+    ["result"],
+)
+SCAN_WORKERS = REGISTRY.gauge(
+    "sj_scan_workers",
+    "掃描工作執行緒，state 為 limit 或 busy",
+    ["state"],
+)
+
+FEED_SPECS = REGISTRY.gauge(
+    "sj_feed_specs",
+    "即時掃描訂閱中正在輪詢的掃描條件數",
+)
+FEED_SUBSCRIBERS = REGISTRY.gauge(
+    "sj_feed_subscribers",
+    "即時掃描訂閱的連線數",
+)
+FEED_RESYNCS = REGISTRY.counter(
+    "sj_feed_resyncs_total",
+    "訂閱者消費太慢、丟棄事件改送完整快照的次數",
+)
+
+
+def collect_component_metrics(state: Any) -> None:
+    """
+    由 app.state 上的元件統計更新指標
+
+    Args:
+        state: FastAPI app.state
+    """
+    quota = getattr(state, "quota_tracker", None)
+    if quota is not None:
+        for simulation in (True, False):
+            usage_data = quota.usage(simulation)
+            if usage_data is None:
+                continue
+            mode = "simulation" if simulation else "production"
+            QUOTA_BYTES_USED.set(usage_data["bytes_used"], mode=mode)
+            QUOTA_LIMIT_BYTES.set(usage_data["limit_bytes"], mode=mode)
+
+    pool = getattr(state, "session_pool", None)
+    if pool is not None:
+        for mode, stats in pool.stats().items():
+            POOL_SESSIONS.set(stats["created"], mode=mode, state="created")
+            POOL_SESSIONS.set(stats["idle"], mode=mode, state="idle")
+
+    cache = getattr(state, "scan_cache", None)
+    if cache is not None:
+        stats = cache.stats()
+        CACHE_ENTRIES.set(stats["entries"])
+        for event, key in (
+            ("hit", "hits"),
+            ("stale_hit", "stale_hits"),
+            ("miss", "misses"),
+            ("eviction", "evictions"),
+            ("empty_hit", "empty_hits"),
+        ):
+            CACHE_EVENTS.set(stats[key], event=event)
+
+    flight = getattr(state, "scan_flight", None)
+    if flight is not None:
+        stats = flight.stats()
+        SINGLE_FLIGHT.set(stats["executions"], result="executed")
+        SINGLE_FLIGHT.set(stats["coalesced"], result="coalesced")
+
+    limiter = getattr(state, "scan_limiter", None)
+    if limiter is not None:
+        SCAN_WORKERS.set(limiter.total_tokens, state="limit")
+        SCAN_WORKERS.set(limiter.borrowed_tokens, state="busy")
+
+    feed = getattr(state, "live_feed", None)
+    if feed is not None:
+        stats = feed.stats()
+        FEED_SPECS.set(stats["specs"])
+        FEED_SUBSCRIBERS.set(stats["subscribers"])
+        FEED_RESYNCS.set(stats["resyncs"])
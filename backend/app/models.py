@@ -1,5 +1,32 @@
-from pydantic import BaseModel, Field
-from typing import Any
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Literal
+
+from sj_trading.trading_calendar import (
+    NON_TRADING_FUTURE,
+    NON_TRADING_INVALID,
+    check_date,
+)
+
+
+def validate_scan_date(value: str) -> str:
+    """
+    檢查掃描日期
+
+    Args:
+        value: 日期字串（YYYY-MM-DD）
+
+    Returns:
+        原日期字串
+
+    Raises:
+        ValueError: 無效日期或未來日期
+    """
+    error = check_date(value)
+    if error == NON_TRADING_INVALID:
+        raise ValueError(f"無效的日期: {value}")
+    if error == NON_TRADING_FUTURE:
+        raise ValueError(f"不可查詢未來日期: {value}")
+    return value
 
 
 class ScanRequest(BaseModel):
@@ -20,6 +47,23 @@ class ScanRequest(BaseModel):
     ascending: bool = Field(False, description="是否升序")
     simulation: bool = Field(True, description="模擬模式")
 
+    @field_validator("date")
+    @classmethod
+    def check_trading_date(cls, value: str) -> str:
+        """拒絕無效日期與未來日期"""
+        return validate_scan_date(value)
+
+    def key(self) -> str:
+        """
+        請求的識別字串
+
+        Returns:
+            格式為 scanner_type:date:count:asc|desc:sim|prod
+        """
+        order = "asc" if self.ascending else "desc"
+        mode = "sim" if self.simulation else "prod"
+        return f"{self.scanner_type}:{self.date}:{self.count}:{order}:{mode}"
+
 
 class StockData(BaseModel):
     """
@@ -60,3 +104,112 @@ class ScanResponse(BaseModel):
     data: list[StockData]
     total_count: int
     execution_time: float
+    data_age: float = Field(0.0, description="資料取得至今的秒數")
+    stale: bool = Field(False, description="是否為流量不足時提供的過期資料")
+    warning: str | None = Field(None, description="流量警告（206 時提供）")
+    handle: str | None = Field(
+        None, description="結果代碼，可用 /api/results/{handle} 篩選、排序與分頁"
+    )
+
+
+class BatchScanRequest(BaseModel):
+    """
+    批次掃描請求模型
+
+    Attributes:
+        scans: 掃描請求列表（欄位同 ScanRequest），相同參數的請求只會執行一次；
+            個別請求的欄位錯誤於該項目的結果中回報，不影響其他請求
+        concurrency: 同時執行的掃描數，未指定時使用伺服器預設值
+    """
+
+    scans: list[dict[str, Any]] = Field(..., min_length=1, max_length=100)
+    concurrency: int | None = Field(None, ge=1, le=16, description="並行數量")
+
+
+class BatchScanItem(BaseModel):
+    """
+    批次掃描中單一請求的結果
+
+    request 為驗證後的請求，欄位錯誤時為原始內容
+    """
+
+    request: dict[str, Any]
+    status: str = "success"
+    data: list[StockData] = []
+    total_count: int = 0
+    execution_time: float = 0.0
+    elapsed_time: float = 0.0
+    data_age: float = 0.0
+    stale: bool = False
+    error: str | None = None
+
+
+class BatchScanResponse(BaseModel):
+    """
+    批次掃描回應模型
+
+    results 以 ScanRequest.key() 為鍵，欄位錯誤的請求以 invalid:{索引} 為鍵
+    """
+
+    status: str = "success"
+    results: dict[str, BatchScanItem]
+    success_count: int
+    error_count: int
+    execution_time: float
+
+
+class JoinScanRequest(BaseModel):
+    """
+    多掃描器合併請求模型
+
+    Attributes:
+        scanner_types: 掃描器類型列表（不可重複），第一個為主排名
+        date: 查詢日期（格式：YYYY-MM-DD）
+        count: 每個掃描器的查詢數量（1-200）
+        ascending: 是否升序排列
+        simulation: 是否使用模擬模式
+        how: 合併方式（intersect、union、difference）
+        value_field: 各掃描器輸出的數值欄位
+    """
+
+    scanner_types: list[str] = Field(..., min_length=2, max_length=10)
+    date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="日期")
+    count: int = Field(200, ge=1, le=200, description="每個掃描器的查詢數量")
+    ascending: bool = Field(False, description="是否升序")
+    simulation: bool = Field(True, description="模擬模式")
+    how: Literal["intersect", "union", "difference"] = Field(
+        "intersect", description="合併方式"
+    )
+    value_field: str = Field("rank_value", description="各掃描器輸出的數值欄位")
+
+    @field_validator("date")
+    @classmethod
+    def check_trading_date(cls, value: str) -> str:
+        """拒絕無效日期與未來日期"""
+        return validate_scan_date(value)
+
+    @field_validator("scanner_types")
+    @classmethod
+    def check_unique(cls, value: list[str]) -> list[str]:
+        """拒絕重複的掃描器類型"""
+        if len(set(value)) != len(value):
+            raise ValueError("掃描器類型不可重複")
+        return value
+
+    def scans(self) -> list[ScanRequest]:
+        """
+        展開為各掃描器的掃描請求
+
+        Returns:
+            ScanRequest 列表，順序與 scanner_types 相同
+        """
+        return [
+            ScanRequest(
+                scanner_type=scanner_type,
+                date=self.date,
+                count=self.count,
+                ascending=self.ascending,
+                simulation=self.simulation,
+            )
+            for scanner_type in self.scanner_types
+        ]
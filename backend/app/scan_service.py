@@ -0,0 +1,59 @@
+"""掃描服務：在工作執行緒中執行掃描，供 API 路由與背景輪詢共用"""
+
+from functools import partial
+from typing import Any
+
+from anyio import CapacityLimiter, to_thread
+from sj_trading import ScanResult, execute_scan
+from sj_trading.ratelimit import PRIORITY_INTERACTIVE, upstream_priority
+
+from app.models import ScanRequest
+from app.settings import settings
+
+# 可預期的掃描錯誤：上游、流量與斷路器錯誤（RuntimeError）、逾時、參數與設定錯誤；
+# 其他例外視為程式錯誤
+SCAN_ERRORS: tuple[type[Exception], ...] = (
+    RuntimeError,
+    TimeoutError,
+    ValueError,
+    LookupError,
+    OSError,
+)
+
+
+async def run_scan(
+    request: ScanRequest,
+    components: dict[str, Any],
+    limiter: CapacityLimiter | None,
+    priority: str = PRIORITY_INTERACTIVE,
+    caller: str | None = None,
+) -> ScanResult:
+    """
+    於工作執行緒中執行同步的 execute_scan，避免阻塞事件迴圈
+
+    Args:
+        request: 掃描請求參數
+        components: 連線池、快取等掃描元件
+        limiter: 同時掃描數量限制
+        priority: 上游呼叫的優先順序（等待速率限制額度時）
+        caller: 呼叫者識別，同一優先順序內依呼叫者輪流
+
+    Returns:
+        ScanResult
+    """
+    scan = partial(
+        execute_scan,
+        scanner_type=request.scanner_type,
+        date=request.date,
+        count=request.count,
+        ascending=request.ascending,
+        simulation=request.simulation,
+        config_file=settings.config_file,
+        **components,
+    )
+
+    def work() -> ScanResult:
+        with upstream_priority(priority, caller):
+            return scan()
+
+    return await to_thread.run_sync(work, limiter=limiter)
@@ -0,0 +1,106 @@
+"""應用程式設定"""
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sj_trading.ratelimit import DEFAULT_BUDGETS
+from sj_trading.trading_calendar import MARKET_CLOSE
+
+
+class Settings(BaseSettings):
+    """
+    應用程式設定，可透過 SCANNER_ 前綴的環境變數覆寫
+
+    Attributes:
+        config_file: Shioaji 配置檔案路徑
+        session_pool_size: 每個模式的連線池大小
+        session_pool_warmup: 啟動時預熱的模式（simulation / production）
+        session_health_check_interval: 連線健康檢查間隔（秒）
+        session_max_age: 連線最長存活時間（秒），超過後重新登入
+        session_acquire_timeout: 等待可用連線的逾時時間（秒）
+        upstream_budgets: 各上游端點的 [每秒呼叫數, 可突發數]（所有連線共用），
+            超過時排隊等待，空物件表示不限制
+        upstream_timeout: 單次 scanners() 呼叫的逾時時間（秒）
+        upstream_retries: 暫時性錯誤的最多重試次數
+        upstream_retry_base_delay: 第一次重試前的退避上限（秒），之後每次加倍並隨機抖動
+        upstream_retry_max_delay: 單次重試退避上限（秒）
+        circuit_failure_threshold: 連續失敗幾次後開啟斷路器（改回傳舊資料或 503）
+        circuit_reset_timeout: 斷路器開啟後到允許試探呼叫的秒數
+        upstream_hedge_after: 掃描超過此秒數未完成時以另一個閒置連線送出相同請求，
+            0 表示不對沖（連線池大小需大於 1）
+        cache_max_entries: 掃描結果快取的最大項目數
+        cache_today_ttl: 當日掃描結果的快取存活時間（秒）
+        scan_concurrency: 同時在工作執行緒中執行的掃描數上限
+        batch_concurrency: 單一批次掃描請求預設的並行數
+        quota_refresh_interval: 背景查詢 usage() 的間隔（秒）
+        quota_bytes_per_row: 每筆掃描資料位元組的初始估算值
+        quota_conserve_below: 剩餘流量低於此百分比時延長當日快取有效時間
+        quota_critical_below: 剩餘流量低於此百分比時一律優先使用快取
+        quota_conserve_ttl_factor: 節流時當日快取有效時間的倍數
+        store_path: 掃描歷史資料庫路徑，空字串表示不保存歷史
+        store_retention_days: 保留盤中快照的天數，更早的日期每個掃描條件只保留
+            收盤後的快照，0 表示保留所有快照
+        calendar_file: 交易日曆檔路徑（休市日與補班交易日），空字串表示只排除週末
+        market_close: 收盤時間（HH:MM，台北時間），之前取得的結果不視為最終結果
+        fake_upstream: 使用本地模擬的 Shioaji 後端（效能量測與開發用）
+        fake_latency: 模擬後端 scanners() 的平均延遲（秒）
+        fake_failure_rate: 模擬後端 scanners() 的失敗機率
+        result_handle_ttl: 掃描結果代碼（/api/results）的存活時間（秒）
+        result_handle_max_entries: 最多保留的掃描結果代碼數（亦為保留 ETag 的請求數）
+        compression: 是否壓縮 JSON、CSV 與 NDJSON 回應（安裝 brotli 時優先使用 br）
+        compression_min_size: 回應小於此位元組數時不壓縮
+        compression_gzip_level: gzip 壓縮等級（1-9）
+        compression_brotli_quality: brotli 壓縮品質（0-11）
+        feed_interval: 即時掃描訂閱（/api/feed）的輪詢間隔（秒）
+        feed_queue_size: 每個訂閱者最多暫存的事件數，超過時改送完整快照
+        feed_heartbeat: 訂閱連線沒有事件時送出 ping 的間隔（秒）
+        record_file: 將 scanners() / usage() 呼叫與結果錄製到此檔案，空字串表示不錄製
+        replay_file: 改以此錄製檔回應上游呼叫，空字串表示不重播
+        replay_speed: 重播時間壓縮倍數（10 表示延遲為錄製時的十分之一，0 表示不延遲）
+    """
+
+    model_config = SettingsConfigDict(env_prefix="SCANNER_")
+
+    config_file: str = "config.txt"
+    session_pool_size: int = 1
+    session_pool_warmup: list[str] = ["simulation"]
+    session_health_check_interval: float = 60.0
+    session_max_age: float = 6 * 3600
+    session_acquire_timeout: float = 30.0
+    upstream_budgets: dict[str, tuple[float, float | None]] = dict(DEFAULT_BUDGETS)
+    upstream_timeout: float = 30.0
+    upstream_retries: int = 2
+    upstream_retry_base_delay: float = 0.2
+    upstream_retry_max_delay: float = 2.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    upstream_hedge_after: float = 0.0
+    cache_max_entries: int = 256
+    cache_today_ttl: float = 60.0
+    scan_concurrency: int = 8
+    batch_concurrency: int = 4
+    quota_refresh_interval: float = 300.0
+    quota_bytes_per_row: float = 300.0
+    quota_conserve_below: float = 30.0
+    quota_critical_below: float = 10.0
+    quota_conserve_ttl_factor: float = 5.0
+    store_path: str = "scan_history.sqlite3"
+    store_retention_days: int = 7
+    calendar_file: str = ""
+    market_close: str = MARKET_CLOSE
+    fake_upstream: bool = False
+    fake_latency: float = 0.05
+    fake_failure_rate: float = 0.0
+    result_handle_ttl: float = 600.0
+    result_handle_max_entries: int = 1024
+    compression: bool = True
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    feed_interval: float = 5.0
+    feed_queue_size: int = 16
+    feed_heartbeat: float = 15.0
+    record_file: str = ""
+    replay_file: str = ""
+    replay_speed: float = 1.0
+
+
+settings = Settings()
@@ -0,0 +1 @@
+"""效能量測腳本"""
@@ -0,0 +1,363 @@
+"""
+API 吞吐量與延遲量測（使用本地模擬的 Shioaji 後端）
+
+於同一個行程內以 httpx 的 ASGI transport 呼叫 FastAPI，不需要券商帳號。
+每個情境在不同的資料筆數與並行數下量測每秒請求數、p50/p99 延遲，
+並另以少量請求搭配 tracemalloc 量測記憶體峰值。結果存為 JSON，
+可用 --compare 與先前的結果比較。
+
+執行方式（於 backend 目錄）：
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --quick --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from sj_trading.trading_calendar import taipei_today
+
+# 必須在匯入 app 之前設定
+os.environ.setdefault("SCANNER_FAKE_UPSTREAM", "true")
+os.environ.setdefault("SCANNER_STORE_PATH", "")
+os.environ.setdefault("SCANNER_SESSION_POOL_SIZE", "8")
+os.environ.setdefault("SCANNER_SESSION_POOL_WARMUP", "[]")
+os.environ.setdefault("SCANNER_CACHE_MAX_ENTRIES", "100000")
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SCANNER_TYPES = (
+    "ChangePercentRank",
+    "ChangePriceRank",
+    "DayRangeRank",
+    "VolumeRank",
+    "AmountRank",
+)
+
+
+def unique_scans(count: int) -> Iterator[dict[str, Any]]:
+    """
+    產生不重複（快取不會命中）的掃描請求
+
+    Args:
+        count: 查詢數量
+
+    Yields:
+        ScanRequest 格式的字典
+    """
+    day = taipei_today() - timedelta(days=1)
+    while True:
+        if day.weekday() < 5:
+            for scanner_type in SCANNER_TYPES:
+                for ascending in (False, True):
+                    yield {
+                        "scanner_type": scanner_type,
+                        "date": day.isoformat(),
+                        "count": count,
+                        "ascending": ascending,
+                    }
+        day -= timedelta(days=1)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """
+    計算百分位數（最近排名法）
+
+    Args:
+        values: 已排序的數值
+        pct: 百分位（0-100）
+
+    Returns:
+        百分位數
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+async def run_requests(
+    client: Any,
+    method: str,
+    url: str,
+    bodies: list[dict[str, Any]],
+    concurrency: int,
+) -> tuple[float, list[float], int]:
+    """
+    以固定並行數送出請求
+
+    Returns:
+        (總秒數, 各請求延遲（秒，已排序）, 失敗數)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def send(body: dict[str, Any]) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(body) for body in bodies))
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+async def run_scenario(
+    client: Any,
+    name: str,
+    url: str,
+    make_bodies: Callable[[int], list[dict[str, Any]]],
+    count: int,
+    concurrency: int,
+    requests: int,
+    memory_requests: int,
+) -> dict[str, Any]:
+    """
+    執行單一情境：先量測吞吐量與延遲，再以 tracemalloc 量測記憶體峰值
+
+    Returns:
+        量測結果
+    """
+    elapsed, latencies, errors = await run_requests(
+        client, "POST", url, make_bodies(requests), concurrency
+    )
+
+    tracemalloc.start()
+    await run_requests(client, "POST", url, make_bodies(memory_requests), concurrency)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "scenario": name,
+        "count": count,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+    print(
+        f"{name:<16} {count:>5} {concurrency:>5} {result['rps']:>9.1f} "
+        f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+        f"{result['peak_kib']:>10.1f} {errors:>6}"
+    )
+    return result
+
+
+Scenario = tuple[str, str, Callable[[int], list[dict[str, Any]]]]
+
+
+def build_scenarios(count: int) -> tuple[dict[str, Any], list[Scenario]]:
+    """
+    建立指定資料筆數的量測情境
+
+    scan_upstream 每次都是新的請求（快取未命中，呼叫模擬後端）；
+    其餘情境重複同一個已快取的請求。
+
+    Args:
+        count: 查詢數量
+
+    Returns:
+        (已快取的請求, [(情境名稱, 路徑, 產生 n 個請求的函式)])
+    """
+    fresh = unique_scans(count)
+    cached = {"scanner_type": "VolumeRank", "date": "2026-01-02", "count": count}
+
+    def fresh_bodies(n: int) -> list[dict[str, Any]]:
+        return [next(fresh) for _ in range(n)]
+
+    def cached_bodies(n: int) -> list[dict[str, Any]]:
+        return [cached] * n
+
+    return cached, [
+        ("scan_upstream", "/api/scan", fresh_bodies),
+        ("scan_cached", "/api/scan", cached_bodies),
+        ("export_csv", "/api/export?format=csv", cached_bodies),
+        ("export_ndjson", "/api/export?format=ndjson", cached_bodies),
+        ("export_parquet", "/api/export?format=parquet", cached_bodies),
+    ]
+
+
+async def run_api_benchmarks(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """執行所有 API 情境"""
+    import httpx
+
+    from app.main import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(transport=transport, base_url="http://bench") as client,
+    ):
+        print(
+            f"{'scenario':<16} {'count':>5} {'conc':>5} {'req/s':>9} "
+            f"{'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>10} {'errors':>6}"
+        )
+        for count in args.counts:
+            cached, scenarios = build_scenarios(count)
+            await client.post("/api/scan", json=cached)
+
+            for concurrency in args.concurrency:
+                for name, url, make_bodies in scenarios:
+                    results.append(
+                        await run_scenario(
+                            client,
+                            name,
+                            url,
+                            make_bodies,
+                            count,
+                            concurrency,
+                            args.requests,
+                            args.memory_requests,
+                        )
+                    )
+    return results
+
+
+def run_serialization_benchmarks(counts: list[int]) -> list[dict[str, Any]]:
+    """量測序列化路徑（沿用 bench_serialization）"""
+    from benchmarks.bench_serialization import fast_path, make_rows, measure
+
+    results = []
+    for count in counts:
+        rows = make_rows(count)
+        per_row = measure(fast_path, rows) / count * 1e6
+        results.append({"count": count, "fast_us_per_row": round(per_row, 3)})
+    return results
+
+
+def git_revision() -> str | None:
+    """目前的 git commit，無法取得時為 None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    比較兩次量測結果
+
+    Args:
+        current: 本次結果
+        baseline: 基準結果
+        threshold: 視為退步的變化比例（0.1 表示 10%）
+
+    Returns:
+        退步項目的說明
+    """
+
+    def key(item: dict[str, Any]) -> tuple[Any, ...]:
+        return item["scenario"], item["count"], item["concurrency"]
+
+    base = {key(item): item for item in baseline.get("api", [])}
+    regressions = []
+    print(f"\n與 {baseline.get('meta', {}).get('revision')} 比較：")
+    for item in current["api"]:
+        old = base.get(key(item))
+        if old is None or not old["rps"] or not old["p99_ms"]:
+            continue
+        rps_change = item["rps"] / old["rps"] - 1
+        p99_change = item["p99_ms"] / old["p99_ms"] - 1
+        flag = ""
+        if rps_change < -threshold or p99_change > threshold:
+            flag = "  <-- 退步"
+            regressions.append(
+                f"{item['scenario']} count={item['count']} "
+                f"concurrency={item['concurrency']}"
+            )
+        print(
+            f"{item['scenario']:<16} {item['count']:>5} {item['concurrency']:>5} "
+            f"req/s {rps_change:+7.1%}  p99 {p99_change:+7.1%}{flag}"
+        )
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description="API 吞吐量與延遲量測")
+    parser.add_argument("--quick", action="store_true", help="較少的組合與請求數")
+    parser.add_argument("--counts", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="每個情境的請求數")
+    parser.add_argument("--memory-requests", type=int, default=20)
+    parser.add_argument("--output", type=Path, default=None, help="結果 JSON 路徑")
+    parser.add_argument("--compare", type=Path, default=None, help="基準結果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="退步門檻比例")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.counts = [100]
+        args.concurrency = [1, 16]
+        args.requests = 50
+        args.memory_requests = 10
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    """執行量測、儲存結果並與基準比較"""
+    args = parse_args(argv)
+    latency = os.environ.get("SCANNER_FAKE_LATENCY", "0.05")
+    print(f"模擬後端延遲 {latency} 秒\n")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "fake_latency": float(latency),
+            "args": {
+                "counts": args.counts,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+            },
+        },
+        "api": asyncio.run(run_api_benchmarks(args)),
+        "serialization": run_serialization_benchmarks(args.counts),
+    }
+
+    output = args.output or RESULTS_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    print(f"\n結果已儲存至 {output}")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 個情境退步超過 {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
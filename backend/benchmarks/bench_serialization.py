@@ -0,0 +1,125 @@
+"""
+掃描回應序列化效能量測
+
+比較原本的 Pydantic 路徑（逐筆建立 StockData、ScanResponse，再經
+jsonable_encoder 與 json.dumps）與 app.encoding 的快速路徑。
+
+執行方式（於 backend 目錄）：
+    python -m benchmarks.bench_serialization
+"""
+
+import json
+import time
+from collections.abc import Callable
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+
+from app.encoding import encode_scan_response, orjson
+from app.models import ScanResponse, StockData
+
+ROW_COUNTS = (200, 1000, 5000)
+
+
+def make_rows(count: int) -> list[dict[str, Any]]:
+    """
+    產生與 Shioaji ScannerItem 欄位相近的測試資料
+
+    Args:
+        count: 資料筆數
+
+    Returns:
+        字典列表
+    """
+    return [
+        {
+            "date": "2026-01-02",
+            "code": f"{1101 + i}",
+            "name": f"股票{i}",
+            "ts": 1767312000000000000 + i,
+            "open": 100.0 + i,
+            "high": 105.5 + i,
+            "low": 98.0 + i,
+            "close": 103.0 + i,
+            "price_range": 7.5,
+            "tick_type": 1,
+            "change_price": 3.0,
+            "change_type": 2,
+            "average_price": 101.2,
+            "volume": 10 + i,
+            "total_volume": 12000 + i,
+            "amount": 1030000 + i,
+            "total_amount": 1236000000 + i,
+            "yesterday_volume": 9000,
+            "volume_ratio": 1.33,
+            "buy_price": 102.5,
+            "buy_volume": 25,
+            "sell_price": 103.0,
+            "sell_volume": 31,
+            "bid_orders": 420,
+            "bid_volumes": 5100,
+            "ask_orders": 380,
+            "ask_volumes": 4700,
+            "rank_value": 3.0,
+        }
+        for i in range(count)
+    ]
+
+
+def pydantic_path(rows: list[dict[str, Any]]) -> bytes:
+    """原本的回應路徑"""
+    response = ScanResponse(
+        status="success",
+        data=[StockData(**item) for item in rows],
+        total_count=len(rows),
+        execution_time=0.0,
+    )
+    # FastAPI 依 response_model 再次驗證後轉為 JSON
+    validated = ScanResponse.model_validate(response.model_dump())
+    return json.dumps(
+        jsonable_encoder(validated),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def fast_path(rows: list[dict[str, Any]]) -> bytes:
+    """快速序列化路徑"""
+    return encode_scan_response(rows, 0.0)
+
+
+def measure(fn: Callable[[list[dict[str, Any]]], bytes], rows: list[Any]) -> float:
+    """
+    量測單次呼叫的平均時間
+
+    Returns:
+        每次呼叫的秒數（取多輪中的最小值）
+    """
+    repeat = max(1, 20000 // len(rows))
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(rows)
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def main() -> None:
+    """執行量測並輸出結果"""
+    encoder = "orjson" if orjson is not None else "json"
+    print(f"快速路徑編碼器：{encoder}")
+    print(f"{'rows':>6} {'pydantic µs/row':>16} {'fast µs/row':>12} {'speedup':>8}")
+
+    for count in ROW_COUNTS:
+        rows = make_rows(count)
+        assert json.loads(pydantic_path(rows)) == json.loads(fast_path(rows))
+
+        slow = measure(pydantic_path, rows) / count * 1e6
+        fast = measure(fast_path, rows) / count * 1e6
+        print(f"{count:>6} {slow:>16.2f} {fast:>12.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+依錄製檔重播一段時間的掃描流量
+
+以錄製檔作為上游（SCANNER_REPLAY_FILE），並依錄製時各次 scanners() 呼叫的
+時間點送出對應的 /api/scan 請求，時間間隔與上游延遲都除以 --speed。
+可用來以 10 倍速重現某個交易日早上的流量。
+
+錄製方式：啟動服務時設定 SCANNER_RECORD_FILE=morning.ndjson.gz
+
+執行方式（於 backend 目錄）：
+    python -m benchmarks.replay_traffic morning.ndjson.gz --speed 10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Any
+
+from benchmarks.bench_api import percentile
+
+
+async def replay(args: argparse.Namespace) -> int:
+    """
+    重播錄製檔中的請求
+
+    Returns:
+        失敗的請求數
+    """
+    import httpx
+    from sj_trading.replay import ReplayLog
+
+    from app.main import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    scans = ReplayLog(args.log).scans()
+    if args.production is not None:
+        scans = [entry for entry in scans if entry.simulation != args.production]
+    if not scans:
+        print("錄製檔中沒有 scanners() 呼叫")
+        return 0
+
+    first = scans[0].offset
+    latencies: list[float] = []
+    lags: list[float] = []
+    statuses: dict[int, int] = {}
+    transport = httpx.ASGITransport(app=app)
+
+    async def send(client: Any, due: float, body: dict[str, Any]) -> None:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        sent = time.perf_counter()
+        lags.append(sent - due)
+        response = await client.post("/api/scan", json=body)
+        latencies.append(time.perf_counter() - sent)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(transport=transport, base_url="http://replay") as client,
+    ):
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                send(
+                    client,
+                    start + (entry.offset - first) / args.speed,
+                    {**entry.args, "simulation": entry.simulation},
+                )
+                for entry in scans
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    lags.sort()
+    span = scans[-1].offset - first
+    print(
+        f"重播 {len(scans)} 個請求：錄製期間 {span:.1f} 秒，"
+        f"實際 {elapsed:.1f} 秒（{args.speed:g} 倍速）"
+    )
+    print(
+        f"延遲 p50 {percentile(latencies, 50) * 1000:.1f} ms，"
+        f"p99 {percentile(latencies, 99) * 1000:.1f} ms，"
+        f"最大 {latencies[-1] * 1000:.1f} ms"
+    )
+    print(f"排程落後 p99 {percentile(lags, 99) * 1000:.1f} ms")
+    print(
+        "狀態碼：" + "，".join(f"{code} x {n}" for code, n in sorted(statuses.items()))
+    )
+    return sum(n for code, n in statuses.items() if code >= 500)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description="依錄製檔重播掃描流量")
+    parser.add_argument("log", help="錄製檔路徑（SCANNER_RECORD_FILE 產生）")
+    parser.add_argument("--speed", type=float, default=1.0, help="時間壓縮倍數")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--simulation",
+        dest="production",
+        action="store_const",
+        const=False,
+        help="只重播模擬模式的請求",
+    )
+    mode.add_argument(
+        "--production",
+        dest="production",
+        action="store_const",
+        const=True,
+        help="只重播正式模式的請求",
+    )
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed 必須大於 0")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    """重播流量，有 5xx 回應時以非零狀態結束"""
+    args = parse_args(argv)
+    # 必須在匯入 app 之前設定
+    os.environ["SCANNER_REPLAY_FILE"] = args.log
+    os.environ["SCANNER_REPLAY_SPEED"] = str(args.speed)
+    os.environ.setdefault("SCANNER_STORE_PATH", "")
+    os.environ.setdefault("SCANNER_SESSION_POOL_WARMUP", "[]")
+
+    failures = asyncio.run(replay(args))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,96 @@
 """sj_trading 股票交易套件"""
 
 from sj_trading.api_client import ShioajiClient
+from sj_trading.async_client import AsyncShioajiClient
+from sj_trading.backfill import BackfillJob, BackfillReport, BackfillTask
+from sj_trading.cache import ScanCache
 from sj_trading.config import load_config
-from sj_trading.scanner import execute_scan, generate_csv, save_csv
+from sj_trading.delta import rank_delta
+from sj_trading.export import (
+    EXPORT_FORMATS,
+    iter_ndjson,
+    save_export,
+    to_arrow_ipc_bytes,
+    to_parquet_bytes,
+)
+from sj_trading.join import JOIN_METHODS, join_rankings
+from sj_trading.quota import DegradationPolicy, QuotaExceededError, QuotaTracker
+from sj_trading.ratelimit import (
+    RateLimitWaitTimeout,
+    TokenBucket,
+    UpstreamLimiter,
+    upstream_priority,
+)
+from sj_trading.record import RECORD_FIELDS, STOCK_FIELDS, ScanRecord
+from sj_trading.replay import ReplayApi, ReplayLog, ScanRecorder, recording_factory
+from sj_trading.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    UpstreamGuard,
+)
+from sj_trading.resultset import Filter, ResultHandles, ResultSet, same_rows
+from sj_trading.scanner import (
+    ScanResult,
+    execute_scan,
+    generate_csv,
+    iter_csv,
+    save_csv,
+)
+from sj_trading.session_pool import PoolExhaustedError, SessionPool
+from sj_trading.singleflight import SingleFlight
+from sj_trading.store import ScanStore, StoredSnapshot
+from sj_trading.trading_calendar import TradingCalendar
 
 __all__ = [
     "ShioajiClient",
     "load_config",
     "execute_scan",
     "generate_csv",
+    "iter_csv",
     "save_csv",
+    "EXPORT_FORMATS",
+    "iter_ndjson",
+    "save_export",
+    "to_arrow_ipc_bytes",
+    "to_parquet_bytes",
+    "SessionPool",
+    "PoolExhaustedError",
+    "ScanCache",
+    "SingleFlight",
+    "ScanRecord",
+    "QuotaTracker",
+    "DegradationPolicy",
+    "QuotaExceededError",
+    "ScanResult",
+    "RECORD_FIELDS",
+    "STOCK_FIELDS",
+    "AsyncShioajiClient",
+    "ScanStore",
+    "StoredSnapshot",
+    "TokenBucket",
+    "UpstreamLimiter",
+    "RateLimitWaitTimeout",
+    "upstream_priority",
+    "BackfillJob",
+    "BackfillReport",
+    "BackfillTask",
+    "TradingCalendar",
+    "ScanRecorder",
+    "ReplayLog",
+    "ReplayApi",
+    "recording_factory",
+    "rank_delta",
+    "JOIN_METHODS",
+    "join_rankings",
+    "Filter",
+    "ResultSet",
+    "ResultHandles",
+    "same_rows",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "UpstreamGuard",
 ]
 
 
@@ -1,9 +1,16 @@
 """Shioaji API 客戶端包裝類別"""
 
 import logging
+from collections.abc import Callable
 from typing import Any
 
-import shioaji as sj
+try:
+    import shioaji as sj
+except ImportError:  # pragma: no cover - 使用 api_factory（例如假後端）時不需要
+    sj = None  # type: ignore[assignment]
+
+from sj_trading.metrics import track_upstream
+from sj_trading.ratelimit import UpstreamLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -16,20 +23,56 @@ class ShioajiClient:
         api: Shioaji API 實例
         config: 配置字典
         is_logged_in: 是否已登入
+        limiter: 上游呼叫速率限制，None 表示不限制
     """
 
-    def __init__(self, config: dict[str, str], simulation: bool = True):
+    def __init__(
+        self,
+        config: dict[str, str],
+        simulation: bool = True,
+        api_factory: Callable[..., Any] | None = None,
+        limiter: UpstreamLimiter | None = None,
+    ):
         """
         初始化 Shioaji 客戶端
 
         Args:
             config: 配置字典，包含 API_KEY、SECRET_KEY、CA_PATH、CA_PASSWD
             simulation: 是否使用模擬模式
+            api_factory: 以 simulation 參數建立 API 實例的函式，預設為
+                shioaji.Shioaji（可改用 sj_trading.fake.FakeShioaji）
+            limiter: 上游呼叫速率限制（可由多個客戶端共用），None 表示不限制
         """
         self.config = config
         self.simulation = simulation
-        self.api = sj.Shioaji(simulation=simulation)
+        if api_factory is None:
+            if sj is None:
+                raise RuntimeError("未安裝 shioaji，請安裝或提供 api_factory")
+            api_factory = sj.Shioaji
+        self.api = api_factory(simulation=simulation)
         self.is_logged_in = False
+        self.limiter = limiter
+
+    def _throttle(self, endpoint: str, timeout: int) -> int:
+        """
+        等待上游呼叫額度，等待時間計入呼叫的逾時時間
+
+        Args:
+            endpoint: 端點名稱
+            timeout: 呼叫的逾時時間（毫秒），0 表示不限制等待時間
+
+        Returns:
+            扣除等待時間後剩餘的逾時時間（毫秒，至少 1），timeout 為 0 時為 0
+
+        Raises:
+            RateLimitWaitTimeout: 等待逾時
+        """
+        if self.limiter is None:
+            return timeout
+        waited = self.limiter.acquire(endpoint, timeout / 1000 if timeout > 0 else None)
+        if timeout <= 0:
+            return 0
+        return max(1, timeout - int(waited * 1000))
 
     def login(self) -> Any:
         """
@@ -48,7 +91,8 @@ class ShioajiClient:
             if not api_key or not secret_key:
                 raise ValueError("API_KEY 或 SECRET_KEY 未設定")
 
-            accounts = self.api.login(api_key, secret_key)
+            with track_upstream("login"):
+                accounts = self.api.login(api_key, secret_key)
             logger.info("Shioaji 登入成功")
             self.is_logged_in = True
             return accounts
@@ -70,28 +114,45 @@ class ShioajiClient:
             if not ca_path or not ca_passwd:
                 raise ValueError("CA_PATH 或 CA_PASSWD 未設定")
 
-            self.api.activate_ca(ca_path=ca_path, ca_passwd=ca_passwd)
+            with track_upstream("activate_ca"):
+                self.api.activate_ca(ca_path=ca_path, ca_passwd=ca_passwd)
             logger.info("憑證啟用成功")
         except Exception as e:
             logger.error(f"憑證啟用失敗: {e}")
             raise
 
-    def get_usage(self) -> Any | None:
+    def get_usage(
+        self,
+        timeout: int = 5000,
+        cb: Callable[[Any], None] | None = None,
+    ) -> Any | None:
         """
         取得 API 流量使用狀況
 
+        Args:
+            timeout: 逾時時間（毫秒）；搭配 cb 時僅限制等待速率限制額度的
+                時間（0 表示不限制），查詢本身以非阻塞方式送出
+            cb: 回呼函式，提供時結果改由回呼傳回
+
         Returns:
-            UsageStatus 物件，包含 bytes、limit_bytes 等屬性
+            UsageStatus 物件，包含 bytes、limit_bytes 等屬性；查詢失敗時為
+            None（搭配 cb 時回傳 None，結果由回呼傳回）
 
         Raises:
-            Exception: 查詢失敗時
+            Exception: 搭配 cb 送出查詢失敗時（包含等待額度逾時）
         """
         try:
-            usage_info = self.api.usage()
+            remaining = self._throttle("usage", timeout)
+            with track_upstream("usage", timed=cb is None):
+                usage_info = self.api.usage(
+                    timeout=remaining if cb is None else 0, cb=cb
+                )
             logger.debug(f"流量使用狀況: {usage_info}")
             return usage_info
         except Exception as e:
             logger.error(f"查詢流量使用狀況失敗: {e}")
+            if cb is not None:
+                raise
             return None
 
     def scanners(
@@ -101,6 +162,7 @@ class ShioajiClient:
         count: int = 100,
         ascending: bool = True,
         timeout: int = 30000,
+        cb: Callable[[list[Any]], None] | None = None,
     ) -> list[Any]:
         """
         執行股票掃描
@@ -110,7 +172,9 @@ class ShioajiClient:
             date: 查詢日期（格式：YYYY-MM-DD）
             count: 查詢數量（0-200）
             ascending: 是否升序排列
-            timeout: 逾時時間（毫秒）
+            timeout: 逾時時間（毫秒）；搭配 cb 時僅限制等待速率限制額度的
+                時間（0 表示不限制），查詢本身以非阻塞方式送出
+            cb: 回呼函式，提供時結果改由回呼傳回，本方法回傳空列表
 
         Returns:
             掃描結果列表
@@ -122,27 +186,70 @@ class ShioajiClient:
             raise RuntimeError("尚未登入，請先呼叫 login()")
 
         try:
-            results = self.api.scanners(
-                scanner_type=scanner_type,
-                ascending=ascending,
-                date=date,
-                count=count,
-                timeout=timeout,
-                cb=None,
-            )
+            remaining = self._throttle("scanners", timeout)
+            with track_upstream("scanners", timed=cb is None):
+                results = self.api.scanners(
+                    scanner_type=scanner_type,
+                    ascending=ascending,
+                    date=date,
+                    count=count,
+                    timeout=remaining if cb is None else 0,
+                    cb=cb,
+                )
+            if cb is not None:
+                logger.debug("已送出非同步掃描請求")
+                return []
             logger.info(f"掃描完成，共 {len(results) if results else 0} 筆結果")
             return results or []
         except Exception as e:
             logger.error(f"股票掃描失敗: {e}")
             raise
 
+    def snapshots(
+        self,
+        contracts: list[Any],
+        timeout: int = 30000,
+        cb: Callable[[list[Any]], None] | None = None,
+    ) -> list[Any]:
+        """
+        查詢商品快照
+
+        Args:
+            contracts: 商品合約列表
+            timeout: 逾時時間（毫秒）；搭配 cb 時僅限制等待速率限制額度的
+                時間（0 表示不限制），查詢本身以非阻塞方式送出
+            cb: 回呼函式，提供時結果改由回呼傳回，本方法回傳空列表
+
+        Returns:
+            快照列表
+
+        Raises:
+            Exception: 查詢失敗時
+        """
+        if not self.is_logged_in:
+            raise RuntimeError("尚未登入，請先呼叫 login()")
+
+        try:
+            remaining = self._throttle("snapshots", timeout)
+            with track_upstream("snapshots", timed=cb is None):
+                results = self.api.snapshots(
+                    contracts, timeout=remaining if cb is None else 0, cb=cb
+                )
+            if cb is not None:
+                return []
+            return results or []
+        except Exception as e:
+            logger.error(f"快照查詢失敗: {e}")
+            raise
+
     def logout(self) -> None:
         """
         登出 Shioaji API
         """
         try:
             if self.is_logged_in:
-                self.api.logout()
+                with track_upstream("logout"):
+                    self.api.logout()
                 self.is_logged_in = False
                 logger.info("Shioaji 登出成功")
         except Exception as e:
@@ -0,0 +1,198 @@
+"""Shioaji 非同步客戶端模組"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from sj_trading.api_client import ShioajiClient
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncShioajiClient:
+    """
+    以 Shioaji 回呼模式實作的非同步客戶端
+
+    查詢以回呼模式非阻塞送出，回呼結果轉交給 asyncio Future，因此單一
+    程序可同時發出多個查詢而不需為每個請求佔用一條執行緒；仍經過
+    ShioajiClient 的速率限制。登入、憑證等一次性操作則於執行緒中執行。
+
+    Attributes:
+        client: 底層的同步 ShioajiClient
+        default_timeout: 預設逾時時間（秒）
+    """
+
+    def __init__(self, client: ShioajiClient, default_timeout: float = 30.0):
+        """
+        初始化非同步客戶端
+
+        Args:
+            client: 同步 ShioajiClient（可為連線池借出的已登入客戶端）
+            default_timeout: 預設逾時時間（秒）
+        """
+        self.client = client
+        self.default_timeout = default_timeout
+
+    async def login(self) -> Any:
+        """
+        登入 Shioaji API
+
+        Returns:
+            帳戶資訊
+        """
+        return await asyncio.to_thread(self.client.login)
+
+    async def activate_ca(self) -> None:
+        """啟用憑證"""
+        await asyncio.to_thread(self.client.activate_ca)
+
+    async def logout(self) -> None:
+        """登出 Shioaji API"""
+        await asyncio.to_thread(self.client.logout)
+
+    async def scanners(
+        self,
+        scanner_type: str,
+        date: str,
+        count: int = 100,
+        ascending: bool = True,
+        timeout: float | None = None,
+    ) -> list[Any]:
+        """
+        執行股票掃描
+
+        Args:
+            scanner_type: 掃描器類型（例如：ChangePercentRank）
+            date: 查詢日期（格式：YYYY-MM-DD）
+            count: 查詢數量（0-200）
+            ascending: 是否升序排列
+            timeout: 逾時時間（秒），None 時使用 default_timeout
+
+        Returns:
+            掃描結果列表
+
+        Raises:
+            TimeoutError: 逾時（包含等待速率限制額度逾時）
+            asyncio.CancelledError: 呼叫被取消
+            Exception: 上游呼叫失敗時
+        """
+        results = await self._call(
+            lambda cb, wait_ms: self.client.scanners(
+                scanner_type=scanner_type,
+                date=date,
+                count=count,
+                ascending=ascending,
+                timeout=wait_ms,
+                cb=cb,
+            ),
+            timeout,
+            "scanners",
+        )
+        logger.info(f"掃描完成，共 {len(results) if results else 0} 筆結果")
+        return results or []
+
+    async def get_usage(self, timeout: float | None = None) -> Any | None:
+        """
+        取得 API 流量使用狀況
+
+        Args:
+            timeout: 逾時時間（秒），None 時使用 default_timeout
+
+        Returns:
+            UsageStatus 物件，查詢失敗或逾時時為 None
+        """
+        try:
+            return await self._call(
+                lambda cb, wait_ms: self.client.get_usage(timeout=wait_ms, cb=cb),
+                timeout,
+                "usage",
+            )
+        except Exception as e:
+            logger.error(f"查詢流量使用狀況失敗: {e}")
+            return None
+
+    async def snapshots(
+        self, contracts: list[Any], timeout: float | None = None
+    ) -> list[Any]:
+        """
+        查詢商品快照
+
+        Args:
+            contracts: 商品合約列表
+            timeout: 逾時時間（秒），None 時使用 default_timeout
+
+        Returns:
+            快照列表
+
+        Raises:
+            TimeoutError: 逾時（包含等待速率限制額度逾時）
+            Exception: 上游呼叫失敗時
+        """
+        results = await self._call(
+            lambda cb, wait_ms: self.client.snapshots(
+                contracts, timeout=wait_ms, cb=cb
+            ),
+            timeout,
+            "snapshots",
+        )
+        return results or []
+
+    async def _call(
+        self,
+        send: Callable[[Callable[[Any], None], int], Any],
+        timeout: float | None,
+        name: str,
+    ) -> Any:
+        """
+        送出回呼模式的查詢並等待結果
+
+        送出前經由 ShioajiClient 等待速率限制額度（可能阻塞，設有速率限制時
+        於工作執行緒中送出），等待時間計入逾時時間。送出時拋出的錯誤直接
+        傳給呼叫端；回呼傳回例外物件時設為 Future 的例外。回呼可能在
+        Shioaji 的執行緒中觸發，透過 call_soon_threadsafe 交回事件迴圈，
+        逾時或取消後才抵達的回呼會被忽略。
+
+        Args:
+            send: 以回呼函式與等待額度的逾時時間（毫秒）為參數、送出查詢的函式
+            timeout: 逾時時間（秒），None 時使用 default_timeout
+            name: 查詢名稱（用於錯誤訊息）
+
+        Returns:
+            回呼傳回的結果
+
+        Raises:
+            TimeoutError: 逾時
+            Exception: 送出查詢失敗或回呼傳回的錯誤
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+
+        def settle(result: Any) -> None:
+            if future.done():
+                return
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        def callback(result: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(settle, result)
+            except RuntimeError:
+                # 事件迴圈已關閉，呼叫端早已放棄等待
+                logger.debug(f"{name} 回呼抵達時事件迴圈已關閉")
+
+        wait_timeout = self.default_timeout if timeout is None else timeout
+        deadline = loop.time() + wait_timeout
+        wait_ms = max(1, int(wait_timeout * 1000))
+        if self.client.limiter is None:
+            send(callback, wait_ms)
+        else:
+            await asyncio.to_thread(send, callback, wait_ms)
+
+        remaining = max(0.0, deadline - loop.time())
+        try:
+            return await asyncio.wait_for(future, remaining)
+        except TimeoutError:
+            raise TimeoutError(f"{name} 查詢逾時（{wait_timeout} 秒）") from None
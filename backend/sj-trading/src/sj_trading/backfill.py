@@ -0,0 +1,466 @@
+"""掃描歷史回補工具"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sj_trading.quota import (
+    QUOTA_CONSERVE,
+    QUOTA_NORMAL,
+    DegradationPolicy,
+    QuotaTracker,
+)
+from sj_trading.ratelimit import (
+    PRIORITY_BACKFILL,
+    TokenBucket,
+    UpstreamLimiter,
+    upstream_priority,
+)
+from sj_trading.scanner import execute_scan
+from sj_trading.session_pool import SessionPool
+from sj_trading.store import ScanStore
+from sj_trading.trading_calendar import TradingCalendar
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BackfillTask:
+    """
+    單一回補項目
+
+    Attributes:
+        scanner_type: 掃描器類型
+        date: 查詢日期
+        count: 查詢數量
+        ascending: 是否升序
+        simulation: 是否模擬模式
+    """
+
+    scanner_type: str
+    date: str
+    count: int
+    ascending: bool
+    simulation: bool
+
+    def key(self) -> str:
+        """
+        識別字串（與 ScanRequest.key 相同格式）
+
+        Returns:
+            格式為 scanner_type:date:count:asc|desc:sim|prod
+        """
+        order = "asc" if self.ascending else "desc"
+        mode = "sim" if self.simulation else "prod"
+        return f"{self.scanner_type}:{self.date}:{self.count}:{order}:{mode}"
+
+
+@dataclass
+class BackfillReport:
+    """
+    回補結果
+
+    Attributes:
+        planned: 區間內的項目數
+        skipped: 已儲存（或檢查點已完成）而略過的項目數
+        completed: 本次完成的項目數
+        failed: 本次失敗的項目數
+        rows: 本次取得的資料筆數
+        elapsed: 執行秒數
+        stopped_reason: 提前停止的原因，正常完成時為 None
+        errors: 失敗項目與錯誤訊息
+    """
+
+    planned: int = 0
+    skipped: int = 0
+    completed: int = 0
+    failed: int = 0
+    rows: int = 0
+    elapsed: float = 0.0
+    stopped_reason: str | None = None
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def scans_per_second(self) -> float:
+        """每秒完成的掃描數"""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """每秒取得的資料筆數"""
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        轉換為字典（含吞吐量）
+
+        Returns:
+            回補結果字典
+        """
+        return {
+            **asdict(self),
+            "elapsed": round(self.elapsed, 3),
+            "scans_per_second": round(self.scans_per_second, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class Checkpoint:
+    """
+    回補進度檢查點
+
+    已完成的項目寫入 JSON 檔（先寫暫存檔再取代），中斷後重新執行會略過。
+    """
+
+    def __init__(self, path: str | None):
+        """
+        載入檢查點
+
+        Args:
+            path: 檢查點檔案路徑，None 表示不保存進度
+        """
+        self.path = path
+        self.completed: set[str] = set()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.completed = set(json.load(f).get("completed", []))
+            logger.info(f"載入檢查點 {path}，已完成 {len(self.completed)} 項")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.completed
+
+    def mark(self, key: str) -> None:
+        """
+        記錄項目完成並寫入檔案
+
+        Args:
+            key: 項目識別字串
+        """
+        with self._lock:
+            self.completed.add(key)
+            if not self.path:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"completed": sorted(self.completed), "updated_at": time.time()},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.path)
+
+
+class BackfillJob:
+    """
+    回補日期區間內多個掃描器的歷史資料
+
+    已有收盤後取得的快照（最終結果）與檢查點中已完成的項目會略過，盤中取得的
+    快照會重新掃描；其餘項目以多個工作執行緒並行
+    執行，每次掃描前向權杖桶取得權杖。流量進入 conserve 時每次掃描消耗兩倍
+    權杖（速率減半），進入 critical 以上時停止，保留檢查點待流量恢復後續跑。
+    掃描以 backfill 優先順序送出，連線池設有 UpstreamLimiter 時排在互動請求之後。
+
+    Attributes:
+        pool: 連線池
+        store: 歷史儲存
+        bucket: 權杖桶
+        quota: 配額追蹤
+        policy: 流量降級策略
+        workers: 並行工作執行緒數
+        checkpoint: 進度檢查點
+        calendar: 交易日曆（決定收盤時間）
+    """
+
+    def __init__(
+        self,
+        pool: SessionPool,
+        store: ScanStore,
+        bucket: TokenBucket,
+        quota: QuotaTracker | None = None,
+        policy: DegradationPolicy | None = None,
+        workers: int = 4,
+        checkpoint: Checkpoint | None = None,
+        progress_interval: float = 10.0,
+        calendar: TradingCalendar | None = None,
+    ):
+        """
+        初始化回補工作
+
+        Args:
+            pool: 連線池
+            store: 歷史儲存
+            bucket: 權杖桶
+            quota: 配額追蹤，None 表示不檢查流量
+            policy: 流量降級策略
+            workers: 並行工作執行緒數
+            checkpoint: 進度檢查點
+            progress_interval: 進度日誌間隔（秒）
+            calendar: 交易日曆，決定收盤時間，None 時使用預設收盤時間
+        """
+        self.pool = pool
+        self.store = store
+        self.bucket = bucket
+        self.quota = quota
+        self.policy = policy or DegradationPolicy()
+        self.workers = workers
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.progress_interval = progress_interval
+        self.calendar = calendar or TradingCalendar()
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def stop(self) -> None:
+        """要求停止（進行中的掃描會完成）"""
+        self._stop.set()
+
+    def plan(
+        self, tasks: list[BackfillTask], report: BackfillReport
+    ) -> list[BackfillTask]:
+        """
+        排除已有最終結果（收盤後取得的快照）或已完成的項目
+
+        Args:
+            tasks: 所有項目
+            report: 記錄略過數量的回補結果
+
+        Returns:
+            需要執行的項目
+        """
+        pending = []
+        for task in tasks:
+            key = task.key()
+            snapshot = self.store.latest(
+                task.scanner_type,
+                task.date,
+                task.count,
+                task.ascending,
+                task.simulation,
+            )
+            if key in self.checkpoint or (
+                snapshot is not None
+                and self.calendar.is_final(task.date, snapshot.fetched_at)
+            ):
+                report.skipped += 1
+                continue
+            pending.append(task)
+        return pending
+
+    def run(self, tasks: list[BackfillTask]) -> BackfillReport:
+        """
+        執行回補
+
+        Args:
+            tasks: 所有項目
+
+        Returns:
+            BackfillReport
+        """
+        report = BackfillReport(planned=len(tasks))
+        pending = self.plan(tasks, report)
+        logger.info(
+            f"回補共 {report.planned} 項，略過 {report.skipped} 項，"
+            f"待執行 {len(pending)} 項"
+        )
+
+        start = time.monotonic()
+        last_progress = start
+
+        def work(task: BackfillTask) -> None:
+            nonlocal last_progress
+            if self._stop.is_set():
+                return
+
+            level = QUOTA_NORMAL
+            if self.quota is not None:
+                level = self.policy.level(self.quota.usage(task.simulation))
+            if level not in (QUOTA_NORMAL, QUOTA_CONSERVE):
+                with self._lock:
+                    report.stopped_reason = report.stopped_reason or f"流量等級 {level}"
+                self._stop.set()
+                return
+
+            tokens = 2.0 if level == QUOTA_CONSERVE else 1.0
+            self.bucket.acquire(min(tokens, self.bucket.capacity))
+            if self._stop.is_set():
+                return
+
+            key = task.key()
+            try:
+                with upstream_priority(PRIORITY_BACKFILL, caller="backfill"):
+                    result = execute_scan(
+                        scanner_type=task.scanner_type,
+                        date=task.date,
+                        count=task.count,
+                        ascending=task.ascending,
+                        simulation=task.simulation,
+                        pool=self.pool,
+                        quota=self.quota,
+                        policy=self.policy,
+                        store=self.store,
+                        calendar=self.calendar,
+                    )
+            except Exception as e:
+                logger.warning(f"回補失敗 {key}: {e}")
+                with self._lock:
+                    report.failed += 1
+                    report.errors[key] = str(e)
+                return
+
+            # 收盤前的結果之後仍需重新回補
+            if self.calendar.is_final(task.date, time.time()):
+                self.checkpoint.mark(key)
+            now = time.monotonic()
+            with self._lock:
+                report.completed += 1
+                report.rows += len(result.results)
+                if now - last_progress >= self.progress_interval:
+                    last_progress = now
+                    done = report.completed + report.failed
+                    logger.info(
+                        f"回補進度 {done}/{len(pending)}，"
+                        f"{report.completed / (now - start):.2f} 次/秒"
+                    )
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="backfill"
+        ) as executor:
+            try:
+                list(executor.map(work, pending))
+            except KeyboardInterrupt:
+                # 尚未開始的項目會直接略過，已完成的項目保留於檢查點
+                self._stop.set()
+                report.stopped_reason = "已中斷"
+
+        report.elapsed = time.monotonic() - start
+        if self._stop.is_set() and report.stopped_reason is None:
+            report.stopped_reason = "已要求停止"
+        logger.info(
+            f"回補結束：完成 {report.completed}、失敗 {report.failed}、"
+            f"{report.scans_per_second:.2f} 次/秒、{report.rows_per_second:.0f} 筆/秒"
+        )
+        return report
+
+
+def build_tasks(
+    scanner_types: list[str],
+    start_date: str,
+    end_date: str,
+    count: int = 100,
+    orders: tuple[bool, ...] = (False,),
+    simulation: bool = True,
+    calendar: TradingCalendar | None = None,
+) -> list[BackfillTask]:
+    """
+    產生日期區間內所有交易日、掃描器與排序的回補項目
+
+    Args:
+        scanner_types: 掃描器類型列表
+        start_date: 起始日期（含）
+        end_date: 結束日期（含）
+        count: 查詢數量
+        orders: 排序（True 為升序）
+        simulation: 是否模擬模式
+        calendar: 交易日曆，預設只排除週末與未來日期
+
+    Returns:
+        依日期排序的項目列表
+    """
+    calendar = calendar or TradingCalendar()
+    return [
+        BackfillTask(scanner_type, day, count, ascending, simulation)
+        for day in calendar.trading_days(start_date, end_date)
+        for scanner_type in scanner_types
+        for ascending in orders
+    ]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description="回補日期區間內的掃描歷史")
+    parser.add_argument("--start", required=True, help="起始日期 YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="結束日期 YYYY-MM-DD")
+    parser.add_argument(
+        "--scanner",
+        action="append",
+        dest="scanners",
+        help="掃描器類型，可重複指定（預設 ChangePercentRank）",
+    )
+    parser.add_argument("--count", type=int, default=100, help="查詢數量")
+    parser.add_argument(
+        "--order",
+        choices=["asc", "desc", "both"],
+        default="desc",
+        help="排序方式",
+    )
+    parser.add_argument("--production", action="store_true", help="使用正式環境")
+    parser.add_argument("--config", default="config.txt", help="配置檔案路徑")
+    parser.add_argument("--calendar", default=None, help="交易日曆檔路徑")
+    parser.add_argument(
+        "--store", default="scan_history.sqlite3", help="歷史資料庫路徑"
+    )
+    parser.add_argument(
+        "--checkpoint", default="backfill.checkpoint.json", help="檢查點檔案路徑"
+    )
+    parser.add_argument("--workers", type=int, default=4, help="並行工作執行緒數")
+    parser.add_argument("--pool-size", type=int, default=2, help="連線池大小")
+    parser.add_argument("--rate", type=float, default=2.0, help="每秒掃描數上限")
+    parser.add_argument("--burst", type=float, default=None, help="可突發的掃描數")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """命令列進入點"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    args = parse_args(argv)
+
+    orders = {"asc": (True,), "desc": (False,), "both": (True, False)}[args.order]
+    simulation = not args.production
+    calendar = TradingCalendar(args.calendar)
+    tasks = build_tasks(
+        args.scanners or ["ChangePercentRank"],
+        args.start,
+        args.end,
+        count=args.count,
+        orders=orders,
+        simulation=simulation,
+        calendar=calendar,
+    )
+
+    Path(args.checkpoint).parent.mkdir(parents=True, exist_ok=True)
+    pool = SessionPool(
+        config_file=args.config, size=args.pool_size, limiter=UpstreamLimiter()
+    )
+    store = ScanStore(args.store)
+    quota = QuotaTracker(pool)
+    quota.start([simulation])
+    job = BackfillJob(
+        pool,
+        store,
+        TokenBucket(args.rate, args.burst),
+        quota=quota,
+        workers=args.workers,
+        checkpoint=Checkpoint(args.checkpoint),
+        calendar=calendar,
+    )
+
+    try:
+        report = job.run(tasks)
+    finally:
+        quota.stop()
+        pool.close()
+        store.close()
+
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
@@ -0,0 +1,293 @@
+"""掃描結果快取模組"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+from sj_trading.record import ScanRecord
+from sj_trading.trading_calendar import taipei_today
+
+logger = logging.getLogger(__name__)
+
+CacheKey = tuple[str, str, bool, bool]
+
+
+class CacheHit(NamedTuple):
+    """
+    快取命中結果
+
+    Attributes:
+        results: 掃描結果列表
+        age: 資料取得至今的秒數
+        stale: 是否已超過正常存活時間（降級時才會回傳）
+    """
+
+    results: list[ScanRecord]
+    age: float
+    stale: bool
+
+
+@dataclass
+class CacheEntry:
+    """
+    快取項目
+
+    Attributes:
+        results: 掃描結果列表
+        count: 取得此結果時請求的數量
+        fetched_at: 取得時間（epoch 秒）
+        expires_at: 到期時間（epoch 秒），歷史日期為 None 表示永不過期
+    """
+
+    results: list[ScanRecord]
+    count: int
+    fetched_at: float
+    expires_at: float | None
+
+    def is_expired(self, now: float) -> bool:
+        """是否已過期"""
+        return self.expires_at is not None and now >= self.expires_at
+
+    def covers(self, count: int) -> bool:
+        """
+        是否足以回應指定數量的請求
+
+        回傳筆數少於當初請求數量時代表已取得全部資料，任何數量皆可回應。
+        """
+        return count <= self.count or len(self.results) < self.count
+
+
+class ScanCache:
+    """
+    掃描結果 LRU 快取
+
+    以 (scanner_type, date, ascending, simulation) 為鍵，保留數量最大的結果，
+    較小的 count 直接切片回應。歷史日期的結果不會再變動，因此永不過期；
+    當日（含未來）日期則套用較短的 TTL。過期項目保留至被 LRU 淘汰或覆寫，
+    流量不足時可透過 get_entry 的 max_stale 取回舊資料。
+
+    另外記錄查無資料的掃描條件（負向快取）：以與結果相同的鍵記錄，某個
+    掃描器或排序回傳空結果不影響同一天的其他掃描。收盤後記錄的項目永不
+    過期，收盤前（例如開盤前查詢）的項目則套用當日 TTL。
+
+    Attributes:
+        max_entries: 最大快取項目數，超過時淘汰最久未使用者
+        today_ttl: 當日資料的存活時間（秒）
+    """
+
+    def __init__(self, max_entries: int = 256, today_ttl: float = 60.0):
+        """
+        初始化快取
+
+        Args:
+            max_entries: 最大快取項目數
+            today_ttl: 當日資料的存活時間（秒）
+        """
+        self.max_entries = max_entries
+        self.today_ttl = today_ttl
+
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._empty: dict[CacheKey, float | None] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.empty_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        scanner_type: str,
+        date: str,
+        count: int,
+        ascending: bool,
+        simulation: bool,
+    ) -> list[ScanRecord] | None:
+        """
+        查詢快取
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            count: 查詢數量
+            ascending: 是否升序
+            simulation: 是否模擬模式
+
+        Returns:
+            掃描結果列表（前 count 筆），未命中時為 None
+        """
+        hit = self.get_entry(scanner_type, date, count, ascending, simulation)
+        return hit.results if hit is not None else None
+
+    def get_entry(
+        self,
+        scanner_type: str,
+        date: str,
+        count: int,
+        ascending: bool,
+        simulation: bool,
+        max_stale: float | None = 0.0,
+    ) -> CacheHit | None:
+        """
+        查詢快取並回傳資料時間
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            count: 查詢數量
+            ascending: 是否升序
+            simulation: 是否模擬模式
+            max_stale: 可接受超過到期時間的秒數，None 表示不論多舊都接受
+
+        Returns:
+            CacheHit（結果為前 count 筆），未命中時為 None
+        """
+        key = (scanner_type, date, ascending, simulation)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.covers(count):
+                self.misses += 1
+                return None
+
+            stale = entry.is_expired(now)
+            if stale and max_stale is not None:
+                expired_for = now - (entry.expires_at or now)
+                if expired_for > max_stale:
+                    self.misses += 1
+                    return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if stale:
+                self.stale_hits += 1
+            return CacheHit(entry.results[:count], now - entry.fetched_at, stale)
+
+    def put(
+        self,
+        scanner_type: str,
+        date: str,
+        count: int,
+        ascending: bool,
+        simulation: bool,
+        results: list[ScanRecord],
+    ) -> None:
+        """
+        寫入快取
+
+        已有未過期且數量較大的結果時保留原項目。
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            count: 查詢數量
+            ascending: 是否升序
+            simulation: 是否模擬模式
+            results: 掃描結果列表
+        """
+        key = (scanner_type, date, ascending, simulation)
+        now = time.time()
+        expires_at = None if self._is_historical(date) else now + self.today_ttl
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if (
+                existing is not None
+                and not existing.is_expired(now)
+                and existing.count > count
+            ):
+                self._entries.move_to_end(key)
+                return
+
+            self._entries[key] = CacheEntry(
+                results=list(results),
+                count=count,
+                fetched_at=now,
+                expires_at=expires_at,
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def mark_empty(
+        self,
+        scanner_type: str,
+        date: str,
+        ascending: bool,
+        simulation: bool,
+        final: bool = False,
+    ) -> None:
+        """
+        記錄掃描條件查無資料
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            ascending: 是否升序
+            simulation: 是否模擬模式
+            final: 是否為收盤後取得的結果，是則永不過期，否則套用當日 TTL
+        """
+        expires_at = None if final else time.time() + self.today_ttl
+        with self._lock:
+            self._empty[(scanner_type, date, ascending, simulation)] = expires_at
+
+    def is_empty(
+        self, scanner_type: str, date: str, ascending: bool, simulation: bool
+    ) -> bool:
+        """
+        掃描條件是否已知查無資料
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            ascending: 是否升序
+            simulation: 是否模擬模式
+
+        Returns:
+            是否已知查無資料
+        """
+        key = (scanner_type, date, ascending, simulation)
+        with self._lock:
+            if key not in self._empty:
+                return False
+            expires_at = self._empty[key]
+            if expires_at is not None and time.time() >= expires_at:
+                del self._empty[key]
+                return False
+            self.empty_hits += 1
+            return True
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            self._entries.clear()
+            self._empty.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得快取統計
+
+        Returns:
+            項目數、命中（含過期資料）、未命中、淘汰次數與查無資料的掃描條件數
+        """
+        return {
+            "entries": len(self._entries),
+            "empty_scans": len(self._empty),
+            "empty_hits": self.empty_hits,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def _is_historical(date: str) -> bool:
+        """日期是否早於今日（台北時間）"""
+        return date < taipei_today().isoformat()
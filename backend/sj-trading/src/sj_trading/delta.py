@@ -0,0 +1,92 @@
+"""兩次掃描結果的排名變化"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+
+def _diff(after: Any, before: Any) -> Any:
+    """數值差，任一方不是數值時為 None"""
+    if isinstance(after, int | float) and isinstance(before, int | float):
+        return round(after - before, 6)
+    return None
+
+
+def rank_delta(
+    before: Sequence[Mapping[str, Any]],
+    after: Sequence[Mapping[str, Any]],
+    value_field: str = "rank_value",
+) -> dict[str, Any]:
+    """
+    比較兩次掃描結果，依股票代號找出新進榜、退出榜與排名變動的股票
+
+    兩份結果各建一次以 code 為鍵的排名索引後對照，時間與結果筆數成正比。
+    排名由 1 起算；rank_change 為正表示排名上升（數字變小）。沒有 code 的
+    資料列不列入比較，但仍佔排名位置；同一代號出現多次時以最前面的排名為準。
+
+    Args:
+        before: 較早的掃描結果（依排名排序）
+        after: 較晚的掃描結果（依排名排序）
+        value_field: 計算數值變化的欄位
+
+    Returns:
+        包含 entered、left、moved 三個列表與 unchanged 筆數的字典。
+        entered 依新排名排序，left 依舊排名排序，moved 依排名變動幅度排序
+    """
+    before_ranks: dict[Any, int] = {}
+    for rank, row in enumerate(before, start=1):
+        code = row.get("code")
+        if code is not None:
+            before_ranks.setdefault(code, rank)
+    after_codes = {row.get("code") for row in after}
+
+    entered = []
+    moved = []
+    unchanged = 0
+    seen: set[Any] = set()
+    for rank, row in enumerate(after, start=1):
+        code = row.get("code")
+        if code is None or code in seen:
+            continue
+        seen.add(code)
+        old_rank = before_ranks.get(code)
+        value = row.get(value_field)
+        if old_rank is None:
+            entered.append(
+                {"code": code, "name": row.get("name"), "rank": rank, "value": value}
+            )
+            continue
+        if old_rank == rank:
+            unchanged += 1
+            continue
+        old_value = before[old_rank - 1].get(value_field)
+        moved.append(
+            {
+                "code": code,
+                "name": row.get("name"),
+                "rank_before": old_rank,
+                "rank_after": rank,
+                "rank_change": old_rank - rank,
+                "value_before": old_value,
+                "value_after": value,
+                "value_change": _diff(value, old_value),
+            }
+        )
+
+    left = [
+        {
+            "code": code,
+            "name": before[rank - 1].get("name"),
+            "rank": rank,
+            "value": before[rank - 1].get(value_field),
+        }
+        for code, rank in before_ranks.items()
+        if code not in after_codes
+    ]
+    moved.sort(key=lambda item: (-abs(item["rank_change"]), item["rank_after"]))
+
+    return {
+        "entered": entered,
+        "left": left,
+        "moved": moved,
+        "unchanged": unchanged,
+    }
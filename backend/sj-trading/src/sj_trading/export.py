@@ -0,0 +1,179 @@
+"""掃描結果匯出模組（NDJSON、Parquet、Arrow IPC）"""
+
+import json
+import logging
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Any
+
+from sj_trading.record import STOCK_FIELDS
+from sj_trading.scanner import save_csv
+
+logger = logging.getLogger(__name__)
+
+# 固定欄位與型別，由 STOCK_FIELDS（即 app.models.StockData 的欄位）推得；
+# 其他欄位依出現順序附加於後
+_ARROW_TYPES = {str: "string", float: "float64", int: "int64"}
+EXPORT_SCHEMA: tuple[tuple[str, str], ...] = tuple(
+    (name, _ARROW_TYPES[py_type]) for name, py_type in STOCK_FIELDS
+)
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet", "arrow")
+
+
+def _require_pyarrow() -> Any:
+    """
+    載入 pyarrow
+
+    Raises:
+        RuntimeError: 未安裝 pyarrow 時
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError(
+            "匯出 Parquet/Arrow 需要 pyarrow，請執行 pip install 'sj-trading[export]'"
+        ) from e
+    return pa
+
+
+def iter_ndjson(data: Sequence[Mapping[str, Any]]) -> Iterator[str]:
+    """
+    逐行產生 NDJSON 內容
+
+    Args:
+        data: 資料列表
+
+    Yields:
+        每筆資料一行 JSON（含換行）
+    """
+    for row in data:
+        yield json.dumps(dict(row), ensure_ascii=False, default=str) + "\n"
+
+
+def to_arrow_table(data: Sequence[Mapping[str, Any]]) -> Any:
+    """
+    將資料轉換為 Arrow Table
+
+    固定欄位一律存在並使用 EXPORT_SCHEMA 的型別，缺值為 null；數值欄位
+    以安全轉換處理，無法完整表示的值（例如整數欄位中帶小數的值）不會被
+    截斷而是拋出錯誤。其他欄位依第一次出現的順序附加，無法推斷型別時
+    轉為字串。
+
+    Args:
+        data: 資料列表
+
+    Returns:
+        pyarrow.Table
+
+    Raises:
+        ValueError: 固定欄位的值無法轉換為該欄位型別時
+    """
+    pa = _require_pyarrow()
+
+    known = {name for name, _ in EXPORT_SCHEMA}
+    extra: dict[str, None] = {}
+    for row in data:
+        for key in row:
+            if key not in known:
+                extra.setdefault(key)
+
+    arrays = []
+    fields = []
+    for name, type_name in EXPORT_SCHEMA:
+        arrow_type = pa.type_for_alias(type_name)
+        values = [row.get(name) for row in data]
+        if type_name == "string":
+            array = pa.array(
+                [None if v is None else str(v) for v in values], type=arrow_type
+            )
+        else:
+            # 直接以型別建立陣列會截斷浮點數，先推斷型別再安全轉換
+            try:
+                array = pa.array(values).cast(arrow_type, safe=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"欄位 {name} 無法轉換為 {type_name}: {e}") from e
+        arrays.append(array)
+        fields.append(pa.field(name, arrow_type))
+
+    for name in extra:
+        values = [row.get(name) for row in data]
+        try:
+            array = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = pa.array(
+                [None if v is None else str(v) for v in values], type=pa.string()
+            )
+        arrays.append(array)
+        fields.append(pa.field(name, array.type))
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def to_parquet_bytes(data: Sequence[Mapping[str, Any]]) -> bytes:
+    """
+    產生 Parquet 內容
+
+    Args:
+        data: 資料列表
+
+    Returns:
+        Parquet 檔案位元組（zstd 壓縮）
+    """
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(to_arrow_table(data), sink, compression="zstd")
+    return bytes(sink.getvalue())
+
+
+def to_arrow_ipc_bytes(data: Sequence[Mapping[str, Any]]) -> bytes:
+    """
+    產生 Arrow IPC 檔案內容，可直接以 memory map 零複製讀取
+
+    Args:
+        data: 資料列表
+
+    Returns:
+        Arrow IPC 檔案位元組
+    """
+    pa = _require_pyarrow()
+
+    table = to_arrow_table(data)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return bytes(sink.getvalue())
+
+
+def save_export(
+    data: Sequence[Mapping[str, Any]], filename: str, export_format: str = "parquet"
+) -> None:
+    """
+    依格式儲存資料
+
+    Args:
+        data: 資料列表
+        filename: 檔案名稱
+        export_format: 匯出格式（csv、ndjson、parquet、arrow）
+
+    Raises:
+        ValueError: 不支援的格式
+    """
+    if export_format == "csv":
+        save_csv(data, filename)
+        return
+
+    if export_format == "ndjson":
+        with open(filename, "w", encoding="utf-8") as f:
+            f.writelines(iter_ndjson(data))
+    elif export_format == "parquet":
+        with open(filename, "wb") as f:
+            f.write(to_parquet_bytes(data))
+    elif export_format == "arrow":
+        with open(filename, "wb") as f:
+            f.write(to_arrow_ipc_bytes(data))
+    else:
+        raise ValueError(f"不支援的匯出格式: {export_format}")
+
+    logger.info(f"已將 {len(data)} 筆資料儲存至 {filename}")
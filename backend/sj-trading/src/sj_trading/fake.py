@@ -0,0 +1,242 @@
+"""本地模擬的 Shioaji 後端（效能量測與開發用）"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+# 假後端不檢查帳密，但 ShioajiClient 需要完整的配置欄位
+FAKE_CONFIG: dict[str, str] = {
+    "API_KEY": "fake",
+    "SECRET_KEY": "fake",
+    "CA_PATH": "fake.pfx",
+    "CA_PASSWD": "fake",
+}
+
+
+class FakeUpstreamError(RuntimeError):
+    """模擬的上游錯誤"""
+
+
+@dataclass
+class FakeConfig:
+    """
+    模擬後端的行為設定
+
+    Attributes:
+        latency: scanners() 的平均延遲（秒）
+        jitter: 延遲的隨機變動比例（0.2 表示 ±20%）
+        login_latency: login() 與 activate_ca() 的延遲（秒）
+        usage_latency: usage() 的延遲（秒）
+        max_rows: 每次掃描最多回傳的筆數
+        failure_rate: scanners() 拋出 FakeUpstreamError 的機率
+        bytes_per_row: 每筆資料計入的流量（bytes）
+        limit_bytes: 流量上限（bytes）
+        seed: 亂數種子，None 表示不固定
+    """
+
+    latency: float = 0.05
+    jitter: float = 0.2
+    login_latency: float = 0.1
+    usage_latency: float = 0.01
+    max_rows: int = 200
+    failure_rate: float = 0.0
+    bytes_per_row: int = 300
+    limit_bytes: int = 500_000_000
+    seed: int | None = None
+
+
+class FakeUsageStatus:
+    """模擬的 UsageStatus"""
+
+    def __init__(self, bytes_used: int, limit_bytes: int, connections: int = 1):
+        self.connections = connections
+        self.bytes = bytes_used
+        self.limit_bytes = limit_bytes
+        self.remaining_bytes = limit_bytes - bytes_used
+
+    def __repr__(self) -> str:
+        return f"UsageStatus(bytes={self.bytes}, limit_bytes={self.limit_bytes})"
+
+
+class FakeMeter:
+    """
+    模擬帳號的流量計數，同一個 factory 建立的實例共用
+
+    Attributes:
+        bytes_used: 已使用位元組
+        scanner_calls: scanners() 呼叫次數
+    """
+
+    def __init__(self) -> None:
+        self.bytes_used = 0
+        self.scanner_calls = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount: int) -> None:
+        """記錄一次掃描的流量"""
+        with self._lock:
+            self.bytes_used += amount
+            self.scanner_calls += 1
+
+
+class FakeScannerItem:
+    """模擬的 ScannerItem，欄位與 Shioaji 相同"""
+
+    def __init__(self, date: str, rank: int, rng: random.Random):
+        base = round(rng.uniform(10, 1000), 2)
+        change = round(base * rng.uniform(-0.1, 0.1), 2)
+        close = round(base + change, 2)
+        volume = rng.randint(1, 5000)
+
+        self.date = date
+        self.code = str(1101 + rank)
+        self.name = f"股票{rank}"
+        self.ts = int(time.time() * 1e9)
+        self.open = base
+        self.high = round(max(base, close) * 1.02, 2)
+        self.low = round(min(base, close) * 0.98, 2)
+        self.close = close
+        self.price_range = round(self.high - self.low, 2)
+        self.tick_type = rng.choice((1, 2))
+        self.change_price = change
+        self.change_type = 2 if change > 0 else (4 if change < 0 else 3)
+        self.average_price = round((self.high + self.low) / 2, 2)
+        self.volume = volume
+        self.total_volume = volume * rng.randint(10, 100)
+        self.amount = int(close * volume * 1000)
+        self.total_amount = int(close * self.total_volume * 1000)
+        self.yesterday_volume = rng.randint(1, 500000)
+        self.volume_ratio = round(rng.uniform(0.1, 5), 2)
+        self.buy_price = round(close - 0.05, 2)
+        self.buy_volume = rng.randint(1, 500)
+        self.sell_price = round(close + 0.05, 2)
+        self.sell_volume = rng.randint(1, 500)
+        self.bid_orders = rng.randint(1, 5000)
+        self.bid_volumes = rng.randint(1, 50000)
+        self.ask_orders = rng.randint(1, 5000)
+        self.ask_volumes = rng.randint(1, 50000)
+        self.rank_value = float(change)
+
+
+class FakeShioaji:
+    """
+    模擬的 shioaji.Shioaji，只實作 ShioajiClient 使用的方法
+
+    scanners() 的結果依 (scanner_type, date, ascending) 決定，同參數每次相同；
+    延遲、失敗率與流量計算由 FakeConfig 控制。同一個 factory 建立的實例
+    共用流量計數（與真實帳號相同）。
+
+    Attributes:
+        simulation: 是否模擬模式
+        config: 行為設定
+        meter: 流量計數
+    """
+
+    def __init__(
+        self,
+        simulation: bool = True,
+        config: FakeConfig | None = None,
+        meter: FakeMeter | None = None,
+    ):
+        self.simulation = simulation
+        self.config = config or FakeConfig()
+        self.meter = meter or FakeMeter()
+        self._rng = random.Random(self.config.seed)
+        self._logged_in = False
+
+    @classmethod
+    def factory(
+        cls, config: FakeConfig | None = None, meter: FakeMeter | None = None
+    ) -> Callable[..., "FakeShioaji"]:
+        """
+        建立可傳給 ShioajiClient / SessionPool 的 api_factory
+
+        Args:
+            config: 行為設定
+            meter: 共用的流量計數，預設建立新的計數
+
+        Returns:
+            以 simulation 參數建立 FakeShioaji 的函式
+        """
+        config = config or FakeConfig()
+        meter = meter or FakeMeter()
+
+        def create(simulation: bool = True) -> FakeShioaji:
+            return cls(simulation=simulation, config=config, meter=meter)
+
+        return create
+
+    def login(self, api_key: str, secret_key: str, **kwargs: Any) -> list[str]:
+        self._sleep(self.config.login_latency)
+        self._logged_in = True
+        return ["FakeAccount"]
+
+    def activate_ca(self, ca_path: str, ca_passwd: str, **kwargs: Any) -> bool:
+        self._sleep(self.config.login_latency)
+        return True
+
+    def logout(self) -> bool:
+        self._logged_in = False
+        return True
+
+    def usage(
+        self, timeout: int = 5000, cb: Callable[[Any], None] | None = None
+    ) -> FakeUsageStatus | None:
+        status = FakeUsageStatus(self.meter.bytes_used, self.config.limit_bytes)
+        return self._respond(status, self.config.usage_latency, cb)
+
+    def scanners(
+        self,
+        scanner_type: str,
+        ascending: bool = True,
+        date: str | None = None,
+        count: int = 100,
+        timeout: int = 30000,
+        cb: Callable[[list[Any]], None] | None = None,
+    ) -> list[FakeScannerItem] | None:
+        if self._rng.random() < self.config.failure_rate:
+            self._sleep(self.config.latency)
+            raise FakeUpstreamError(f"模擬的掃描失敗: {scanner_type} {date}")
+
+        rows = min(count, self.config.max_rows)
+        day = date or time.strftime("%Y-%m-%d")
+        rng = random.Random(f"{scanner_type}:{day}:{ascending}")
+        items = [FakeScannerItem(day, rank, rng) for rank in range(rows)]
+        items.sort(key=lambda item: item.rank_value, reverse=not ascending)
+        self.meter.add(rows * self.config.bytes_per_row)
+        return self._respond(items, self.config.latency, cb)
+
+    def snapshots(
+        self,
+        contracts: list[Any],
+        timeout: int = 30000,
+        cb: Callable[[list[Any]], None] | None = None,
+    ) -> list[Any] | None:
+        return self._respond([], self.config.latency, cb)
+
+    def _respond(
+        self, value: Any, latency: float, cb: Callable[[Any], None] | None
+    ) -> Any:
+        """依延遲回傳結果，或於背景計時後呼叫回呼"""
+        if cb is None:
+            self._sleep(latency)
+            return value
+        timer = threading.Timer(self._delay(latency), cb, args=(value,))
+        timer.daemon = True
+        timer.start()
+        return None
+
+    def _delay(self, latency: float) -> float:
+        """加上隨機變動的延遲"""
+        if latency <= 0:
+            return 0.0
+        jitter = self.config.jitter
+        return latency * self._rng.uniform(1 - jitter, 1 + jitter)
+
+    def _sleep(self, latency: float) -> None:
+        delay = self._delay(latency)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,86 @@
+"""多個掃描排名依股票代號合併"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+JOIN_INTERSECT = "intersect"
+JOIN_UNION = "union"
+JOIN_DIFFERENCE = "difference"
+
+JOIN_METHODS = (JOIN_INTERSECT, JOIN_UNION, JOIN_DIFFERENCE)
+
+
+def _index(
+    rows: Sequence[Mapping[str, Any]],
+) -> dict[Any, tuple[int, Mapping[str, Any]]]:
+    """以 code 為鍵的排名索引；略過沒有 code 的資料列，重複時保留最前面的排名"""
+    index: dict[Any, tuple[int, Mapping[str, Any]]] = {}
+    for rank, row in enumerate(rows, start=1):
+        code = row.get("code")
+        if code is not None and code not in index:
+            index[code] = (rank, row)
+    return index
+
+
+def join_rankings(
+    rankings: Mapping[str, Sequence[Mapping[str, Any]]],
+    how: str = JOIN_INTERSECT,
+    value_field: str = "rank_value",
+) -> list[dict[str, Any]]:
+    """
+    依股票代號合併多個掃描排名
+
+    每個排名各建一次以 code 為鍵的索引，再以第一個排名為主表逐一對照，
+    時間與總筆數成正比。每個掃描器輸出 {名稱}_rank（由 1 起算）與
+    {名稱}_value 兩欄，未上榜時為 None。沒有 code 的資料列不參與合併，
+    但仍佔排名位置。
+
+    Args:
+        rankings: 掃描器名稱與其結果（依排名排序），依插入順序處理
+        how: intersect（所有排名都上榜）、union（任一排名上榜）或
+            difference（第一個排名上榜、其餘都未上榜）
+        value_field: 各排名輸出的數值欄位
+
+    Returns:
+        合併後的資料列，依第一個排名的名次排序；union 中只出現在其他
+        排名的股票依排名順序接在後面
+
+    Raises:
+        ValueError: how 不是支援的合併方式或沒有任何排名時
+    """
+    if how not in JOIN_METHODS:
+        raise ValueError(f"不支援的合併方式: {how}，可用 {', '.join(JOIN_METHODS)}")
+    if not rankings:
+        raise ValueError("至少需要一個排名")
+
+    names = list(rankings)
+    indexes = {name: _index(rows) for name, rows in rankings.items()}
+
+    if how == JOIN_UNION:
+        codes: dict[str, None] = {}
+        for name in names:
+            codes.update(dict.fromkeys(indexes[name]))
+        selected = list(codes)
+    else:
+        first, others = indexes[names[0]], [indexes[name] for name in names[1:]]
+        if how == JOIN_INTERSECT:
+            selected = [code for code in first if all(code in o for o in others)]
+        else:
+            selected = [code for code in first if not any(code in o for o in others)]
+
+    merged = []
+    for code in selected:
+        row: dict[str, Any] = {"code": code, "name": None}
+        for name in names:
+            hit = indexes[name].get(code)
+            if hit is None:
+                row[f"{name}_rank"] = None
+                row[f"{name}_value"] = None
+                continue
+            rank, source = hit
+            if row["name"] is None:
+                row["name"] = source.get("name")
+            row[f"{name}_rank"] = rank
+            row[f"{name}_value"] = source.get(value_field)
+        merged.append(row)
+    return merged
@@ -0,0 +1,464 @@
+"""掃描流程效能指標模組（Prometheus 文字格式）"""
+
+import bisect
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import TypeVar, cast
+
+LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value: str) -> str:
+    """跳脫標籤值中的特殊字元"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """組合標籤字串，沒有標籤時為空字串"""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    """格式化數值"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指標基底類別"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        """由標籤字典取得標籤值"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} 需要標籤 {self.labelnames}，收到 {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        """輸出 Prometheus 文字格式的各行"""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    只增不減的計數器
+
+    Attributes:
+        name: 指標名稱
+        documentation: 說明
+        labelnames: 標籤名稱
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        增加計數
+
+        Args:
+            amount: 增加量（不可為負）
+            labels: 標籤值
+        """
+        if amount < 0:
+            raise ValueError("計數器不可減少")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        """
+        直接設定計數（用於反映其他元件自行累計的次數）
+
+        Args:
+            value: 累計值
+            labels: 標籤值
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        """取得目前計數"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """
+    可增可減的量測值
+
+    Attributes:
+        name: 指標名稱
+        documentation: 說明
+        labelnames: 標籤名稱
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        """設定數值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """增加數值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """減少數值"""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        """取得目前數值"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        """區塊執行期間數值加一"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """
+    分佈統計（累計區間計數、總和與次數）
+
+    Attributes:
+        name: 指標名稱
+        documentation: 說明
+        labelnames: 標籤名稱
+        buckets: 區間上限（遞增）
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每組標籤：[各區間計數..., 總和, 次數]
+        self._values: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        記錄一次觀測值
+
+        Args:
+            value: 觀測值
+            labels: 標籤值
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = data
+            if index < len(self.buckets):
+                data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """記錄區塊執行秒數（發生例外時同樣記錄）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> float:
+        """取得觀測次數"""
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            return data[-1] if data is not None else 0.0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(data)) for key, data in self._values.items())
+
+        lines = []
+        names = (*self.labelnames, "le")
+        for key, data in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, data, strict=False):
+                cumulative += count
+                labels = _format_labels(names, (*key, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(names, (*key, "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {_format_value(data[-1])}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(data[-1])}")
+        return lines
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class MetricsRegistry:
+    """
+    指標集合
+
+    輸出前會先呼叫已註冊的收集函式，用於更新由其他元件自行維護的數值
+    （例如連線池、快取統計）。
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """建立（或取得已存在的）計數器"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """建立（或取得已存在的）量測值"""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """建立（或取得已存在的）分佈統計"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        註冊輸出前呼叫的收集函式
+
+        Args:
+            collector: 更新指標數值的函式
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]) -> None:
+        """移除收集函式"""
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """
+        輸出 Prometheus 文字格式
+
+        Returns:
+            所有指標的文字內容
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            collector()
+
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: M) -> M:
+        """註冊指標，同名且同類型時回傳既有指標"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"指標 {metric.name} 已以其他類型註冊")
+                return cast(M, existing)
+            self._metrics[metric.name] = metric
+            return metric
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+SCAN_STAGE_SECONDS = REGISTRY.histogram(
+    "sj_scan_stage_seconds",
+    "掃描流程各階段耗時（秒）",
+    ["stage"],
+)
+SCAN_SECONDS = REGISTRY.histogram(
+    "sj_scan_seconds",
+    "execute_scan 總耗時（秒），依資料來源分類",
+    ["source"],
+)
+SCANS = REGISTRY.counter(
+    "sj_scans_total",
+    "完成的掃描次數，依資料來源分類",
+    ["source"],
+)
+SCANS_IN_FLIGHT = REGISTRY.gauge(
+    "sj_scans_in_flight",
+    "執行中的掃描數",
+)
+SCAN_ROWS = REGISTRY.counter(
+    "sj_scan_rows_total",
+    "向 Shioaji 取得的掃描資料筆數",
+)
+UPSTREAM_CALLS = REGISTRY.counter(
+    "sj_upstream_calls_total",
+    "Shioaji API 呼叫次數",
+    ["endpoint"],
+)
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    "sj_upstream_in_flight",
+    "執行中的 Shioaji API 呼叫數",
+    ["endpoint"],
+)
+UPSTREAM_QUEUE_SECONDS = REGISTRY.histogram(
+    "sj_upstream_queue_seconds",
+    "Shioaji API 呼叫等待速率限制額度的秒數",
+    ["endpoint", "priority"],
+)
+UPSTREAM_QUEUED = REGISTRY.gauge(
+    "sj_upstream_queued",
+    "等待速率限制額度的 Shioaji API 呼叫數",
+    ["endpoint"],
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "sj_upstream_retries_total",
+    "上游掃描呼叫因暫時性錯誤重試的次數",
+)
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "sj_upstream_hedges_total",
+    "對沖請求次數，result 為 sent（已送出）、won（先於原請求完成）或 skipped"
+    "（沒有閒置連線等本地原因而略過）",
+    ["result"],
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "sj_circuit_state",
+    "斷路器狀態（0 關閉、1 半開、2 開啟）",
+    ["circuit"],
+)
+ERRORS = REGISTRY.counter(
+    "sj_errors_total",
+    "錯誤次數，依階段與例外類型分類",
+    ["stage", "type"],
+)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """
+    記錄掃描階段耗時，發生例外時同時累計錯誤
+
+    Args:
+        stage: 階段名稱
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.inc(stage=stage, type=type(e).__name__)
+        raise
+    finally:
+        SCAN_STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+@contextmanager
+def track_upstream(endpoint: str, timed: bool = True) -> Iterator[None]:
+    """
+    記錄一次 Shioaji API 呼叫：呼叫次數、進行中數量、耗時與錯誤
+
+    Args:
+        endpoint: API 名稱（login、scanners 等）
+        timed: 是否記錄耗時；回呼模式下呼叫只是送出請求，不記錄
+    """
+    UPSTREAM_CALLS.inc(endpoint=endpoint)
+    with UPSTREAM_IN_FLIGHT.track_inprogress(endpoint=endpoint):
+        if timed:
+            with track_stage(endpoint):
+                yield
+        else:
+            try:
+                yield
+            except Exception as e:
+                ERRORS.inc(stage=endpoint, type=type(e).__name__)
+                raise
@@ -0,0 +1,296 @@
+"""API 流量配額追蹤模組"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from sj_trading.session_pool import SessionPool
+
+logger = logging.getLogger(__name__)
+
+
+def make_usage_data(bytes_used: int, limit_bytes: int) -> dict[str, Any]:
+    """
+    由已使用與上限位元組計算流量使用資訊
+
+    Args:
+        bytes_used: 已使用位元組
+        limit_bytes: 上限位元組
+
+    Returns:
+        流量使用資訊字典
+    """
+    remaining_bytes = limit_bytes - bytes_used
+    remaining_pct = (remaining_bytes / limit_bytes * 100) if limit_bytes > 0 else 0
+    is_over_limit = bytes_used >= limit_bytes
+
+    return {
+        "bytes_used": bytes_used,
+        "limit_bytes": limit_bytes,
+        "remaining_bytes": remaining_bytes,
+        "remaining_percent": round(remaining_pct, 2),
+        "is_over_limit": is_over_limit,
+        "warning": (
+            f"警告：流量已達上限！已使用 {bytes_used} bytes，上限為 {limit_bytes} bytes"
+            if is_over_limit
+            else None
+        ),
+    }
+
+
+@dataclass
+class QuotaState:
+    """
+    單一模式的配額狀態
+
+    Attributes:
+        bytes_used: 上次查詢時的已使用位元組
+        limit_bytes: 上限位元組
+        refreshed_at: 上次查詢時間（epoch 秒）
+        estimated_bytes: 上次查詢後本地估算的用量
+        rows_since_refresh: 上次查詢後取得的資料筆數
+    """
+
+    bytes_used: int = 0
+    limit_bytes: int = 0
+    refreshed_at: float = 0.0
+    estimated_bytes: float = 0.0
+    rows_since_refresh: int = 0
+
+
+class QuotaTracker:
+    """
+    本地流量配額追蹤
+
+    於背景定期呼叫 usage() 取得實際用量，兩次查詢之間依每筆資料的平均位元組
+    估算掃描用量，掃描流程可直接取得預估值而不需額外呼叫 Shioaji。
+    每次查詢後以實際增加的位元組校正每筆資料的估算值。
+
+    Attributes:
+        pool: 用於查詢 usage() 的連線池
+        refresh_interval: 背景查詢間隔（秒）
+        bytes_per_row: 目前估算的每筆資料位元組
+    """
+
+    def __init__(
+        self,
+        pool: SessionPool,
+        refresh_interval: float = 300.0,
+        bytes_per_row: float = 300.0,
+    ):
+        """
+        初始化配額追蹤
+
+        Args:
+            pool: 用於查詢 usage() 的連線池
+            refresh_interval: 背景查詢間隔（秒）
+            bytes_per_row: 每筆資料位元組的初始估算值
+        """
+        self.pool = pool
+        self.refresh_interval = refresh_interval
+        self.bytes_per_row = bytes_per_row
+
+        self._states: dict[bool, QuotaState] = {}
+        self._tracked: set[bool] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, modes: list[bool] | None = None) -> None:
+        """
+        啟動背景查詢執行緒
+
+        Args:
+            modes: 一開始就追蹤的模式（True 為模擬模式）
+        """
+        self._tracked.update(modes or [])
+        self._thread = threading.Thread(
+            target=self._run, name="quota-tracker", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止背景查詢執行緒"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def refresh(self, simulation: bool = True) -> dict[str, Any] | None:
+        """
+        立即查詢實際用量並校正估算值
+
+        Args:
+            simulation: 是否模擬模式
+
+        Returns:
+            最新的流量使用資訊，查詢失敗時為 None
+        """
+        self._tracked.add(simulation)
+        try:
+            with self.pool.acquire(simulation) as client:
+                usage_info = client.get_usage()
+        except Exception as e:
+            logger.warning(f"配額查詢失敗（simulation={simulation}）: {e}")
+            return None
+
+        if not usage_info:
+            return None
+
+        with self._lock:
+            state = self._states.get(simulation)
+            if state is not None and state.rows_since_refresh > 0:
+                delta = usage_info.bytes - state.bytes_used
+                if delta >= 0:
+                    sample = delta / state.rows_since_refresh
+                    self.bytes_per_row = 0.7 * self.bytes_per_row + 0.3 * sample
+
+            self._states[simulation] = QuotaState(
+                bytes_used=usage_info.bytes,
+                limit_bytes=usage_info.limit_bytes,
+                refreshed_at=time.time(),
+            )
+
+        logger.info(
+            f"配額更新（simulation={simulation}）：{usage_info.bytes}/"
+            f"{usage_info.limit_bytes} bytes，每筆約 {self.bytes_per_row:.0f} bytes"
+        )
+        return self.usage(simulation)
+
+    def record_scan(self, simulation: bool, rows: int) -> None:
+        """
+        記錄一次掃描的本地估算用量
+
+        Args:
+            simulation: 是否模擬模式
+            rows: 取得的資料筆數
+        """
+        with self._lock:
+            state = self._states.get(simulation)
+            if state is None:
+                # 尚未取得實際用量，喚醒背景執行緒查詢
+                self._tracked.add(simulation)
+                self._wake.set()
+                return
+            state.rows_since_refresh += max(rows, 1)
+            state.estimated_bytes += max(rows, 1) * self.bytes_per_row
+
+    def usage(self, simulation: bool = True) -> dict[str, Any] | None:
+        """
+        取得預估的流量使用資訊（不呼叫 Shioaji）
+
+        Args:
+            simulation: 是否模擬模式
+
+        Returns:
+            流量使用資訊字典，額外包含 estimated_bytes 與 refreshed_at；
+            尚未取得實際用量時為 None
+        """
+        with self._lock:
+            state = self._states.get(simulation)
+            if state is None:
+                return None
+            projected = state.bytes_used + int(state.estimated_bytes)
+            usage_data = make_usage_data(projected, state.limit_bytes)
+            usage_data["estimated_bytes"] = int(state.estimated_bytes)
+            usage_data["refreshed_at"] = state.refreshed_at
+            return usage_data
+
+    def _run(self) -> None:
+        """背景查詢迴圈"""
+        last_refresh: dict[bool, float] = {}
+        while not self._stopped.is_set():
+            now = time.time()
+            for simulation in list(self._tracked):
+                due = now - last_refresh.get(simulation, 0.0) >= self.refresh_interval
+                if not due and simulation in self._states:
+                    continue
+                if self.refresh(simulation) is not None:
+                    last_refresh[simulation] = now
+
+            self._wake.wait(timeout=min(self.refresh_interval, 30.0))
+            self._wake.clear()
+
+
+QUOTA_NORMAL = "normal"
+QUOTA_CONSERVE = "conserve"
+QUOTA_CRITICAL = "critical"
+QUOTA_EXHAUSTED = "exhausted"
+
+
+class QuotaExceededError(RuntimeError):
+    """
+    流量已達上限且沒有可用的快取資料
+
+    Attributes:
+        usage_data: 流量使用資訊
+    """
+
+    def __init__(self, usage_data: dict[str, Any]):
+        super().__init__(usage_data.get("warning") or "API 流量已達上限")
+        self.usage_data = usage_data
+
+
+@dataclass
+class DegradationPolicy:
+    """
+    依剩餘流量逐步降級的策略
+
+    - normal：正常行為
+    - conserve：剩餘低於 conserve_below%，當日快取的有效時間延長為
+      conserve_ttl_factor 倍，降低向 Shioaji 更新的頻率
+    - critical：剩餘低於 critical_below%，有快取就使用（不論多舊）
+    - exhausted：已達上限，有快取就使用，沒有快取的新查詢直接拒絕
+
+    Attributes:
+        conserve_below: 進入 conserve 的剩餘百分比
+        critical_below: 進入 critical 的剩餘百分比
+        conserve_ttl_factor: conserve 時快取有效時間的倍數
+        refuse_uncached: exhausted 時是否拒絕沒有快取的查詢
+    """
+
+    conserve_below: float = 30.0
+    critical_below: float = 10.0
+    conserve_ttl_factor: float = 5.0
+    refuse_uncached: bool = True
+
+    def level(self, usage_data: dict[str, Any] | None) -> str:
+        """
+        判斷目前的降級等級
+
+        Args:
+            usage_data: 流量使用資訊，未知時為 None
+
+        Returns:
+            normal、conserve、critical 或 exhausted
+        """
+        if usage_data is None:
+            return QUOTA_NORMAL
+        if usage_data["is_over_limit"]:
+            return QUOTA_EXHAUSTED
+        remaining = usage_data["remaining_percent"]
+        if remaining < self.critical_below:
+            return QUOTA_CRITICAL
+        if remaining < self.conserve_below:
+            return QUOTA_CONSERVE
+        return QUOTA_NORMAL
+
+    def max_stale(self, level: str, ttl: float) -> float | None:
+        """
+        該等級可接受快取超過到期時間的秒數
+
+        Args:
+            level: 降級等級
+            ttl: 快取正常的存活時間（秒）
+
+        Returns:
+            秒數，None 表示不論多舊都接受
+        """
+        if level == QUOTA_NORMAL:
+            return 0.0
+        if level == QUOTA_CONSERVE:
+            return ttl * max(self.conserve_ttl_factor - 1, 0.0)
+        return None
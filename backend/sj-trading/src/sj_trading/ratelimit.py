@@ -0,0 +1,347 @@
+"""請求速率限制模組"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sj_trading.metrics import UPSTREAM_QUEUE_SECONDS, UPSTREAM_QUEUED
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+PRIORITY_BACKFILL = "backfill"
+
+# 依優先順序排列（前者優先）
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, PRIORITY_BACKFILL)
+
+# 各端點預設的 (每秒呼叫數, 可突發數)
+DEFAULT_BUDGETS: dict[str, tuple[float, float | None]] = {
+    "scanners": (5.0, 10.0),
+    "snapshots": (10.0, 50.0),
+    "usage": (2.0, 5.0),
+}
+
+_priority: ContextVar[str] = ContextVar(
+    "upstream_priority", default=PRIORITY_INTERACTIVE
+)
+_caller: ContextVar[str] = ContextVar("upstream_caller", default="")
+
+
+class RateLimitWaitTimeout(TimeoutError):
+    """等待本地速率限制額度逾時（尚未呼叫上游，不代表上游異常）"""
+
+
+class TokenBucket:
+    """
+    執行緒安全的權杖桶
+
+    以固定速率補充權杖，容量決定可瞬間突發的請求數。
+
+    Attributes:
+        rate: 每秒補充的權杖數
+        capacity: 權杖桶容量
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        """
+        初始化權杖桶（一開始為滿的）
+
+        Args:
+            rate: 每秒補充的權杖數
+            capacity: 權杖桶容量，預設與 rate 相同（至少 1）
+        """
+        if rate <= 0:
+            raise ValueError("rate 必須大於 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        嘗試立即取得權杖
+
+        Args:
+            tokens: 需要的權杖數
+
+        Returns:
+            是否取得
+        """
+        with self._cond:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.acquired += 1
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        """
+        取得權杖，不足時等待補充
+
+        Args:
+            tokens: 需要的權杖數（不可超過容量）
+            timeout: 最長等待秒數，None 表示持續等待
+
+        Returns:
+            是否取得（逾時為 False）
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"需要的權杖數 {tokens} 超過容量 {self.capacity}")
+
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += 1
+                    self.waited += time.monotonic() - start
+                    return True
+
+                wait = (tokens - self._tokens) / self.rate
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """
+        預估取得權杖需要等待的秒數
+
+        Args:
+            tokens: 需要的權杖數
+
+        Returns:
+            秒數，目前已足夠時為 0
+        """
+        with self._cond:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def set_rate(self, rate: float) -> None:
+        """
+        調整補充速率
+
+        Args:
+            rate: 每秒補充的權杖數
+        """
+        if rate <= 0:
+            raise ValueError("rate 必須大於 0")
+        with self._cond:
+            self._refill()
+            self.rate = rate
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得權杖桶統計
+
+        Returns:
+            速率、容量、目前權杖數、取得次數與累計等待秒數
+        """
+        with self._cond:
+            self._refill()
+            return {
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "tokens": round(self._tokens, 3),
+                "acquired": self.acquired,
+                "waited": round(self.waited, 3),
+            }
+
+    def _refill(self) -> None:
+        """依經過時間補充權杖（需持有鎖）"""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+
+@contextmanager
+def upstream_priority(priority: str, caller: str | None = None) -> Iterator[None]:
+    """
+    設定區塊內上游呼叫的優先順序與呼叫者（contextvars，只影響目前的執行緒或
+    協程，以及由其複製 context 建立的工作）
+
+    Args:
+        priority: interactive、background 或 backfill
+        caller: 呼叫者識別（例如用戶端位址），同一優先順序內依呼叫者輪流；
+            None 表示沿用外層設定
+
+    Raises:
+        ValueError: priority 不是支援的優先順序時
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"不支援的優先順序: {priority}，可用 {', '.join(PRIORITIES)}")
+    priority_token = _priority.set(priority)
+    caller_token = _caller.set(caller) if caller is not None else None
+    try:
+        yield
+    finally:
+        if caller_token is not None:
+            _caller.reset(caller_token)
+        _priority.reset(priority_token)
+
+
+def current_priority() -> str:
+    """目前 context 的上游呼叫優先順序"""
+    return _priority.get()
+
+
+class UpstreamLimiter:
+    """
+    上游 API 呼叫的速率限制與公平佇列
+
+    每個端點各有一個權杖桶；額度不足時呼叫者依序排隊而不是被拒絕。
+    佇列先依優先順序（interactive 優先於 background、backfill），
+    同一優先順序內以虛擬完成時間排序：每個呼叫者的下一個請求排在其上一個
+    請求之後，因此單一呼叫者的大量請求不會讓其他呼叫者一直等待。
+    較低優先順序的請求只在沒有較高優先順序的請求排隊時執行。
+
+    Attributes:
+        buckets: 端點名稱與其權杖桶，未列出的端點不限制
+    """
+
+    # 超過此數量時清除已追上進度的呼叫者紀錄
+    _MAX_CALLERS = 4096
+
+    def __init__(self, budgets: Mapping[str, tuple[float, float | None]] | None = None):
+        """
+        初始化
+
+        Args:
+            budgets: 端點名稱與 (每秒呼叫數, 可突發數)，預設為 DEFAULT_BUDGETS
+        """
+        budgets = DEFAULT_BUDGETS if budgets is None else budgets
+        self.buckets = {
+            endpoint: TokenBucket(rate, burst)
+            for endpoint, (rate, burst) in budgets.items()
+        }
+        self._cond = threading.Condition()
+        self._queues: dict[str, list[tuple[int, float, int]]] = {
+            endpoint: [] for endpoint in self.buckets
+        }
+        self._virtual = dict.fromkeys(self.buckets, 0.0)
+        self._finish: dict[tuple[str, str], float] = {}
+        self._seq = itertools.count()
+        self.queued = dict.fromkeys(self.buckets, 0)
+
+    def acquire(self, endpoint: str, timeout: float | None = None) -> float:
+        """
+        取得一次呼叫額度，不足時排隊等待
+
+        優先順序與呼叫者取自目前 context（見 upstream_priority）。
+
+        Args:
+            endpoint: 端點名稱（scanners、usage、snapshots 等）
+            timeout: 最長等待秒數，None 表示持續等待
+
+        Returns:
+            排隊等待的秒數
+
+        Raises:
+            RateLimitWaitTimeout: 等待逾時
+        """
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return 0.0
+        priority = _priority.get()
+        start = time.monotonic()
+
+        with self._cond:
+            queue = self._queues[endpoint]
+            if not queue and bucket.try_acquire():
+                waited = 0.0
+            else:
+                self._wait(endpoint, bucket, PRIORITIES.index(priority), start, timeout)
+                waited = time.monotonic() - start
+
+        UPSTREAM_QUEUE_SECONDS.observe(waited, endpoint=endpoint, priority=priority)
+        return waited
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得統計
+
+        Returns:
+            各端點的權杖桶統計、排隊中的呼叫數與累計排隊次數
+        """
+        with self._cond:
+            waiting = {endpoint: len(queue) for endpoint, queue in self._queues.items()}
+            queued = dict(self.queued)
+        return {
+            endpoint: {
+                **bucket.stats(),
+                "waiting": waiting[endpoint],
+                "queued": queued[endpoint],
+            }
+            for endpoint, bucket in self.buckets.items()
+        }
+
+    def _wait(
+        self,
+        endpoint: str,
+        bucket: TokenBucket,
+        rank: int,
+        start: float,
+        timeout: float | None,
+    ) -> None:
+        """排隊直到輪到自己且取得權杖（需持有鎖）"""
+        caller = (endpoint, _caller.get())
+        tag = max(self._virtual[endpoint], self._finish.get(caller, 0.0)) + 1.0
+        self._finish[caller] = tag
+        entry = (rank, tag, next(self._seq))
+        queue = self._queues[endpoint]
+        heapq.heappush(queue, entry)
+        self.queued[endpoint] += 1
+        deadline = None if timeout is None else start + timeout
+
+        UPSTREAM_QUEUED.inc(endpoint=endpoint)
+        try:
+            while True:
+                first = queue[0] is entry
+                if first and bucket.try_acquire():
+                    heapq.heappop(queue)
+                    self._virtual[endpoint] = tag
+                    self._prune()
+                    return
+                # 只有排在最前面的呼叫者等待權杖補充，其餘等待通知
+                wait = max(bucket.wait_time(), 0.001) if first else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RateLimitWaitTimeout(f"等待 {endpoint} 呼叫額度逾時")
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+        except BaseException:
+            if entry in queue:
+                queue.remove(entry)
+                heapq.heapify(queue)
+            raise
+        finally:
+            UPSTREAM_QUEUED.dec(endpoint=endpoint)
+            self._cond.notify_all()
+
+    def _prune(self) -> None:
+        """清除已追上虛擬時間的呼叫者紀錄（需持有鎖）"""
+        if len(self._finish) <= self._MAX_CALLERS:
+            return
+        self._finish = {
+            caller: tag
+            for caller, tag in self._finish.items()
+            if tag > self._virtual[caller[0]]
+        }
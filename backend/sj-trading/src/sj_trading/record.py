@@ -0,0 +1,143 @@
+"""精簡的掃描結果資料列"""
+
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+# app.models.StockData 宣告的欄位與型別（匯出的固定欄位亦依此決定）
+STOCK_FIELDS: tuple[tuple[str, type], ...] = (
+    ("code", str),
+    ("name", str),
+    ("date", str),
+    ("open", float),
+    ("close", float),
+    ("high", float),
+    ("low", float),
+    ("volume", int),
+    ("change_percent", float),
+    ("change_price", float),
+    ("rank_value", float),
+    ("ts", int),
+)
+
+# StockData 宣告的欄位在前，其後為 Shioaji ScannerItem 的其餘欄位
+RECORD_FIELDS: tuple[str, ...] = (
+    *(name for name, _ in STOCK_FIELDS),
+    "price_range",
+    "tick_type",
+    "change_type",
+    "average_price",
+    "total_volume",
+    "amount",
+    "total_amount",
+    "yesterday_volume",
+    "volume_ratio",
+    "buy_price",
+    "buy_volume",
+    "sell_price",
+    "sell_volume",
+    "bid_orders",
+    "bid_volumes",
+    "ask_orders",
+    "ask_volumes",
+)
+
+_FIELD_SET = frozenset(RECORD_FIELDS)
+
+
+class _Missing:
+    """欄位不存在的標記"""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<missing>"
+
+
+_MISSING: Any = _Missing()
+
+
+class ScanRecord(Mapping[str, Any]):
+    """
+    單筆掃描結果
+
+    已知欄位存放於 __slots__，不需為每筆資料配置一個字典；
+    未知欄位放在 extra 字典（沒有時為 None）。實作唯讀 Mapping 介面，
+    可直接用於 CSV 輸出、StockData(**record) 與 dict(record)。
+    """
+
+    __slots__ = (*RECORD_FIELDS, "_extra")
+
+    def __init__(self, values: Mapping[str, Any]):
+        """
+        初始化資料列
+
+        Args:
+            values: 欄位名稱與值的對應
+        """
+        for name in RECORD_FIELDS:
+            object.__setattr__(self, name, values.get(name, _MISSING))
+
+        extra = {key: value for key, value in values.items() if key not in _FIELD_SET}
+        object.__setattr__(self, "_extra", extra or None)
+
+    @classmethod
+    def from_scanner(cls, scanner: Any) -> "ScanRecord":
+        """
+        由 Shioaji scanner 物件建立
+
+        Args:
+            scanner: Shioaji scanner 物件
+
+        Returns:
+            ScanRecord
+        """
+        return cls(scanner.__dict__)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for name in RECORD_FIELDS:
+            if getattr(self, name) is not _MISSING:
+                yield name
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        count = sum(1 for name in RECORD_FIELDS if getattr(self, name) is not _MISSING)
+        return count + (len(self._extra) if self._extra is not None else 0)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELD_SET:
+            return getattr(self, key) is not _MISSING  # type: ignore[arg-type]
+        return self._extra is not None and key in self._extra
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("ScanRecord 為唯讀")
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (ScanRecord, (self.to_dict(),))
+
+    def __repr__(self) -> str:
+        return f"ScanRecord({self.to_dict()!r})"
+
+    @property
+    def extra(self) -> dict[str, Any]:
+        """未知欄位"""
+        return dict(self._extra) if self._extra is not None else {}
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        轉換為字典
+
+        Returns:
+            包含所有存在欄位的字典
+        """
+        return dict(self.items())
@@ -0,0 +1,597 @@
+"""上游流量錄製與重播（負載測試與問題重現用）
+
+錄製檔為 gzip 壓縮的 NDJSON，第一行為檔頭，其後每行一次 scanners() 或
+usage() 呼叫：
+
+    {"op": "scanners", "sim": true, "t": 12.3, "dur": 0.41,
+     "args": {"scanner_type": ..., "date": ..., "ascending": ..., "count": ...},
+     "cols": [...], "rows": [[...], ...]}
+
+t 為相對錄製開始的秒數，dur 為呼叫耗時；scanners() 的結果以欄位名稱加
+各列數值的方式存放，避免每筆重複欄位名稱。呼叫失敗時改記錄 error，並以
+error_type、error_base 記錄例外類別名稱與其最接近的內建例外，重播時據以
+重建（例如上游逾時仍為 TimeoutError，參數錯誤仍為 ValueError）。
+"""
+
+import builtins
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+LOG_VERSION = 1
+
+OP_SCANNERS = "scanners"
+OP_USAGE = "usage"
+
+_USAGE_FIELDS = ("connections", "bytes", "limit_bytes", "remaining_bytes")
+
+
+class ReplayMissError(LookupError):
+    """錄製檔中沒有對應的呼叫"""
+
+
+class ReplayedError(RuntimeError):
+    """
+    重播錄製時發生的上游錯誤
+
+    重播時的例外為同名的子類別，並同時繼承原例外最接近的內建例外，
+    因此重試與斷路器的判斷與錄製時相同。
+    """
+
+
+# (例外類別名稱, 內建例外名稱) 對應的重播例外類別
+_REPLAYED_CLASSES: dict[tuple[str, str], type[ReplayedError]] = {}
+
+
+def _builtin_base(error: BaseException) -> str:
+    """例外類別最接近的內建例外名稱"""
+    for cls in type(error).__mro__:
+        if cls.__module__ == "builtins":
+            return cls.__name__
+    return RuntimeError.__name__
+
+
+def replayed_error(name: str, base_name: str, message: str) -> ReplayedError:
+    """
+    建立重播用的例外
+
+    Args:
+        name: 錄製時的例外類別名稱
+        base_name: 錄製時最接近的內建例外名稱，不是內建例外時視為 RuntimeError
+        message: 錯誤訊息
+
+    Returns:
+        名稱為 name、同時繼承 ReplayedError 與內建例外的例外
+    """
+    base = getattr(builtins, base_name, None)
+    if not (isinstance(base, type) and issubclass(base, Exception)):
+        base = RuntimeError
+    key = (name, base.__name__)
+    cls = _REPLAYED_CLASSES.get(key)
+    if cls is None:
+        cls = type(name, (ReplayedError, base), {"__module__": __name__})
+        cls = _REPLAYED_CLASSES.setdefault(key, cls)
+    return cls(message)
+
+
+def _encode_items(items: list[Any]) -> tuple[list[str], list[list[Any]]]:
+    """將 scanner 物件列表轉為 (欄位名稱, 各列數值)"""
+    if not items:
+        return [], []
+    cols = list(items[0].__dict__)
+    return cols, [[item.__dict__.get(name) for name in cols] for item in items]
+
+
+def _encode_usage(status: Any) -> dict[str, Any] | None:
+    """將 UsageStatus 轉為字典"""
+    if status is None:
+        return None
+    return {name: getattr(status, name, None) for name in _USAGE_FIELDS}
+
+
+class ReplayItem:
+    """重播的 ScannerItem，屬性與錄製時相同"""
+
+    def __init__(self, values: dict[str, Any]):
+        self.__dict__.update(values)
+
+
+class ReplayUsageStatus:
+    """重播的 UsageStatus"""
+
+    def __init__(self, values: dict[str, Any]):
+        self.__dict__.update(values)
+
+    def __repr__(self) -> str:
+        return f"UsageStatus(bytes={self.bytes}, limit_bytes={self.limit_bytes})"
+
+
+class ScanRecorder:
+    """
+    將上游呼叫寫入錄製檔，可由多個執行緒共用
+
+    Attributes:
+        path: 錄製檔路徑
+        entries: 已寫入的呼叫數
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        開啟錄製檔（覆寫既有檔案）
+
+        Args:
+            path: 錄製檔路徑
+        """
+        self.path = Path(path)
+        self.entries = 0
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")  # noqa: SIM115
+        self._write({"version": LOG_VERSION, "started_at": time.time()})
+        logger.info(f"開始錄製上游呼叫: {self.path}")
+
+    def elapsed(self) -> float:
+        """相對錄製開始的秒數"""
+        return time.monotonic() - self._start
+
+    def record(
+        self,
+        op: str,
+        simulation: bool,
+        args: dict[str, Any],
+        started: float,
+        result: Any = None,
+        error: BaseException | None = None,
+    ) -> None:
+        """
+        寫入一次呼叫
+
+        Args:
+            op: 呼叫名稱（scanners 或 usage）
+            simulation: 是否模擬模式
+            args: 呼叫參數
+            started: 呼叫開始時間（elapsed() 的值）
+            result: 呼叫結果
+            error: 呼叫失敗時的例外
+        """
+        entry: dict[str, Any] = {
+            "op": op,
+            "sim": simulation,
+            "t": round(started, 4),
+            "dur": round(self.elapsed() - started, 4),
+            "args": args,
+        }
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+            entry["error_type"] = type(error).__name__
+            entry["error_base"] = _builtin_base(error)
+        elif op == OP_SCANNERS:
+            entry["cols"], entry["rows"] = _encode_items(result or [])
+        else:
+            entry["usage"] = _encode_usage(result)
+
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write(entry)
+            self.entries += 1
+
+    def flush(self) -> None:
+        """將緩衝內容寫入磁碟"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self) -> None:
+        """關閉錄製檔"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                logger.info(f"錄製結束，共 {self.entries} 筆呼叫: {self.path}")
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        self._file.write(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+            + "\n"
+        )
+
+
+class RecordingApi:
+    """
+    包裝 Shioaji API 實例，將 scanners() 與 usage() 的呼叫與結果寫入錄製檔
+
+    其餘屬性與方法直接轉給原本的實例。
+
+    Attributes:
+        api: 原本的 API 實例
+        recorder: 錄製器
+        simulation: 是否模擬模式
+    """
+
+    def __init__(self, api: Any, recorder: ScanRecorder, simulation: bool = True):
+        self.api = api
+        self.recorder = recorder
+        self.simulation = simulation
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.api, name)
+
+    def scanners(
+        self,
+        scanner_type: Any,
+        ascending: bool = True,
+        date: str | None = None,
+        count: int = 100,
+        timeout: int = 30000,
+        cb: Callable[[list[Any]], None] | None = None,
+    ) -> Any:
+        args = {
+            "scanner_type": str(getattr(scanner_type, "value", scanner_type)),
+            "date": date,
+            "ascending": ascending,
+            "count": count,
+        }
+        return self._call(
+            OP_SCANNERS,
+            args,
+            lambda callback: self.api.scanners(
+                scanner_type=scanner_type,
+                ascending=ascending,
+                date=date,
+                count=count,
+                timeout=timeout,
+                cb=callback,
+            ),
+            cb,
+        )
+
+    def usage(
+        self, timeout: int = 5000, cb: Callable[[Any], None] | None = None
+    ) -> Any:
+        return self._call(
+            OP_USAGE,
+            {},
+            lambda callback: self.api.usage(timeout=timeout, cb=callback),
+            cb,
+        )
+
+    def _call(
+        self,
+        op: str,
+        args: dict[str, Any],
+        call: Callable[[Callable[[Any], None] | None], Any],
+        cb: Callable[[Any], None] | None,
+    ) -> Any:
+        """執行呼叫並錄製；回呼模式下於回呼時錄製"""
+        started = self.recorder.elapsed()
+
+        if cb is not None:
+
+            def callback(result: Any) -> None:
+                self.recorder.record(op, self.simulation, args, started, result)
+                cb(result)
+
+            try:
+                return call(callback)
+            except Exception as e:
+                self.recorder.record(op, self.simulation, args, started, error=e)
+                raise
+
+        try:
+            result = call(None)
+        except Exception as e:
+            self.recorder.record(op, self.simulation, args, started, error=e)
+            raise
+        self.recorder.record(op, self.simulation, args, started, result)
+        return result
+
+
+def recording_factory(
+    recorder: ScanRecorder, api_factory: Callable[..., Any] | None = None
+) -> Callable[..., RecordingApi]:
+    """
+    建立錄製上游呼叫的 api_factory
+
+    Args:
+        recorder: 錄製器
+        api_factory: 建立實際 API 實例的函式，預設為 shioaji.Shioaji
+
+    Returns:
+        可傳給 ShioajiClient / SessionPool 的 api_factory
+    """
+    if api_factory is None:
+        import shioaji as sj
+
+        api_factory = sj.Shioaji
+
+    def create(simulation: bool = True) -> RecordingApi:
+        return RecordingApi(api_factory(simulation=simulation), recorder, simulation)
+
+    return create
+
+
+@dataclass
+class ReplayEntry:
+    """
+    錄製檔中的一次呼叫
+
+    Attributes:
+        op: 呼叫名稱
+        simulation: 是否模擬模式
+        offset: 相對錄製開始的秒數
+        duration: 呼叫耗時（秒）
+        args: 呼叫參數
+        cols: scanners() 結果的欄位名稱
+        rows: scanners() 結果的各列數值
+        usage: usage() 的結果
+        error: 呼叫失敗時的錯誤訊息
+        error_type: 呼叫失敗時的例外類別名稱
+        error_base: 呼叫失敗時例外最接近的內建例外名稱
+    """
+
+    op: str
+    simulation: bool
+    offset: float
+    duration: float
+    args: dict[str, Any]
+    cols: list[str] = field(default_factory=list)
+    rows: list[list[Any]] = field(default_factory=list)
+    usage: dict[str, Any] | None = None
+    error: str | None = None
+    error_type: str | None = None
+    error_base: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ReplayEntry":
+        return cls(
+            op=data["op"],
+            simulation=data["sim"],
+            offset=data["t"],
+            duration=data["dur"],
+            args=data.get("args", {}),
+            cols=data.get("cols", []),
+            rows=data.get("rows", []),
+            usage=data.get("usage"),
+            error=data.get("error"),
+            error_type=data.get("error_type"),
+            error_base=data.get("error_base"),
+        )
+
+    def exception(self) -> ReplayedError:
+        """
+        重建錄製時的錯誤（舊版錄製檔沒有類別資訊時為 ReplayedError）
+
+        Returns:
+            重播用的例外
+        """
+        message = self.error or ""
+        if self.error_type is None:
+            return ReplayedError(message)
+        message = message.removeprefix(f"{self.error_type}: ")
+        return replayed_error(self.error_type, self.error_base or "", message)
+
+    def items(self, count: int | None = None) -> list[ReplayItem]:
+        """重建 scanners() 的結果"""
+        rows = self.rows if count is None else self.rows[:count]
+        return [ReplayItem(dict(zip(self.cols, row, strict=True))) for row in rows]
+
+
+def _scan_key(simulation: bool, args: dict[str, Any]) -> tuple[Any, ...]:
+    return (
+        OP_SCANNERS,
+        simulation,
+        args.get("scanner_type"),
+        args.get("date"),
+        bool(args.get("ascending")),
+    )
+
+
+class ReplayLog:
+    """
+    讀入的錄製檔與重播進度
+
+    相同參數的呼叫依錄製順序輪流回傳，用完後重複最後一筆；要求的筆數比
+    錄製時少時截斷結果。同一份 ReplayLog 建立的 ReplayApi 共用進度。
+
+    Attributes:
+        path: 錄製檔路徑
+        entries: 依時間排序的呼叫
+        started_at: 錄製開始時間（epoch 秒）
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        讀入錄製檔
+
+        檔案未正常關閉（例如錄製中的行程中止）時保留已讀到的部分。
+
+        Args:
+            path: 錄製檔路徑
+        """
+        self.path = Path(path)
+        self.entries: list[ReplayEntry] = []
+        self.started_at: float | None = None
+        self._cursors: dict[tuple[Any, ...], deque[ReplayEntry]] = defaultdict(deque)
+        self._last: dict[tuple[Any, ...], ReplayEntry] = {}
+        self._lock = threading.Lock()
+
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    data = json.loads(line)
+                    if "version" in data:
+                        if data["version"] != LOG_VERSION:
+                            raise ValueError(f"不支援的錄製檔版本: {data['version']}")
+                        self.started_at = data.get("started_at")
+                        continue
+                    self.entries.append(ReplayEntry.from_dict(data))
+        except (EOFError, json.JSONDecodeError) as e:
+            logger.warning(f"錄製檔不完整，使用已讀取的 {len(self.entries)} 筆: {e}")
+
+        self.entries.sort(key=lambda entry: entry.offset)
+        self.reset()
+        logger.info(f"已載入錄製檔 {self.path}，共 {len(self.entries)} 筆呼叫")
+
+    def reset(self) -> None:
+        """重播進度回到開頭"""
+        with self._lock:
+            self._cursors.clear()
+            self._last.clear()
+            for entry in self.entries:
+                self._cursors[self._key(entry.op, entry.simulation, entry.args)].append(
+                    entry
+                )
+
+    def next(self, op: str, simulation: bool, args: dict[str, Any]) -> ReplayEntry:
+        """
+        取得下一筆符合的呼叫
+
+        Args:
+            op: 呼叫名稱
+            simulation: 是否模擬模式
+            args: 呼叫參數
+
+        Returns:
+            符合的呼叫
+
+        Raises:
+            ReplayMissError: 錄製檔中沒有符合的呼叫
+        """
+        key = self._key(op, simulation, args)
+        with self._lock:
+            pending = self._cursors.get(key)
+            if pending:
+                entry = pending.popleft()
+                self._last[key] = entry
+                return entry
+            if key in self._last:
+                return self._last[key]
+        raise ReplayMissError(
+            f"錄製檔中沒有符合的呼叫: {op} simulation={simulation} {args}"
+        )
+
+    def scans(self) -> list[ReplayEntry]:
+        """依時間排序的 scanners() 呼叫（用於重現請求時序）"""
+        return [entry for entry in self.entries if entry.op == OP_SCANNERS]
+
+    def duration(self) -> float:
+        """錄製期間長度（秒）"""
+        if not self.entries:
+            return 0.0
+        last = self.entries[-1]
+        return last.offset + last.duration
+
+    def factory(self, speed: float = 1.0) -> Callable[..., "ReplayApi"]:
+        """
+        建立重播用的 api_factory
+
+        Args:
+            speed: 時間壓縮倍數，10 表示延遲為錄製時的十分之一，0 表示不延遲
+
+        Returns:
+            可傳給 ShioajiClient / SessionPool 的 api_factory
+        """
+
+        def create(simulation: bool = True) -> ReplayApi:
+            return ReplayApi(self, simulation=simulation, speed=speed)
+
+        return create
+
+    @staticmethod
+    def _key(op: str, simulation: bool, args: dict[str, Any]) -> tuple[Any, ...]:
+        if op == OP_SCANNERS:
+            return _scan_key(simulation, args)
+        return (op, simulation)
+
+
+class ReplayApi:
+    """
+    依錄製檔回應的 Shioaji API，只實作 ShioajiClient 使用的方法
+
+    scanners() 與 usage() 回傳錄製時的結果，並依錄製時的耗時（除以 speed）
+    延遲；錄製時失敗的呼叫以同名的 ReplayedError 子類別重現（見 replayed_error）。
+
+    Attributes:
+        log: 錄製檔
+        simulation: 是否模擬模式
+        speed: 時間壓縮倍數
+    """
+
+    def __init__(self, log: ReplayLog, simulation: bool = True, speed: float = 1.0):
+        if speed < 0:
+            raise ValueError("speed 不可為負數")
+        self.log = log
+        self.simulation = simulation
+        self.speed = speed
+
+    def login(self, api_key: str, secret_key: str, **kwargs: Any) -> list[str]:
+        return ["ReplayAccount"]
+
+    def activate_ca(self, ca_path: str, ca_passwd: str, **kwargs: Any) -> bool:
+        return True
+
+    def logout(self) -> bool:
+        return True
+
+    def usage(
+        self, timeout: int = 5000, cb: Callable[[Any], None] | None = None
+    ) -> ReplayUsageStatus | None:
+        entry = self.log.next(OP_USAGE, self.simulation, {})
+        status = ReplayUsageStatus(entry.usage) if entry.usage else None
+        return self._respond(entry, status, cb)
+
+    def scanners(
+        self,
+        scanner_type: Any,
+        ascending: bool = True,
+        date: str | None = None,
+        count: int = 100,
+        timeout: int = 30000,
+        cb: Callable[[list[Any]], None] | None = None,
+    ) -> list[ReplayItem] | None:
+        args = {
+            "scanner_type": str(getattr(scanner_type, "value", scanner_type)),
+            "date": date,
+            "ascending": ascending,
+            "count": count,
+        }
+        entry = self.log.next(OP_SCANNERS, self.simulation, args)
+        return self._respond(entry, entry.items(count), cb)
+
+    def snapshots(
+        self,
+        contracts: list[Any],
+        timeout: int = 30000,
+        cb: Callable[[list[Any]], None] | None = None,
+    ) -> list[Any] | None:
+        if cb is not None:
+            cb([])
+            return None
+        return []
+
+    def _respond(
+        self, entry: ReplayEntry, value: Any, cb: Callable[[Any], None] | None
+    ) -> Any:
+        """依錄製時的耗時回傳結果，或於背景計時後呼叫回呼"""
+        delay = entry.duration / self.speed if self.speed > 0 else 0.0
+        if cb is None:
+            if delay > 0:
+                time.sleep(delay)
+            if entry.error is not None:
+                raise entry.exception()
+            return value
+        if entry.error is not None:
+            raise entry.exception()
+        timer = threading.Timer(delay, cb, args=(value,))
+        timer.daemon = True
+        timer.start()
+        return None
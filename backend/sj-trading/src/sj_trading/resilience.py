@@ -0,0 +1,384 @@
+"""上游呼叫的逾時、重試、斷路器與對沖請求"""
+
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from sj_trading.metrics import CIRCUIT_STATE, UPSTREAM_HEDGES, UPSTREAM_RETRIES
+from sj_trading.ratelimit import RateLimitWaitTimeout
+from sj_trading.session_pool import PoolExhaustedError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# 斷路器狀態對應的指標數值
+_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+# 本地資源不足（連線池或速率限制額度），尚未呼叫上游；重試只會增加壓力
+LOCAL_ERRORS: tuple[type[BaseException], ...] = (
+    PoolExhaustedError,
+    RateLimitWaitTimeout,
+)
+
+# 呼叫端參數、設定錯誤或本地資源不足，重試不會成功，也不代表上游異常
+NON_RETRYABLE_ERRORS: tuple[type[BaseException], ...] = (
+    ValueError,
+    TypeError,
+    LookupError,
+    FileNotFoundError,
+    PermissionError,
+    *LOCAL_ERRORS,
+)
+
+# 上游逾時：已耗盡整個逾時時間，重試會讓請求等待數倍時間；計入斷路器但不重試
+UPSTREAM_TIMEOUT_ERRORS: tuple[type[BaseException], ...] = (TimeoutError,)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    斷路器開啟中，不呼叫上游直接失敗
+
+    Attributes:
+        retry_after: 預計可再嘗試的秒數
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"上游服務異常（{name}），{math.ceil(retry_after)} 秒後再試")
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    重試策略（指數退避加完整隨機抖動）
+
+    Attributes:
+        attempts: 最多嘗試次數（含第一次）
+        base_delay: 第一次重試前的退避上限（秒），之後每次加倍
+        max_delay: 單次退避上限（秒）
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+
+    def backoff(self, retry: int) -> float:
+        """
+        第 retry 次重試前的等待秒數（由 0 起算），於 0 與上限之間隨機取值，
+        避免多個請求同時重試
+
+        Args:
+            retry: 重試序號
+
+        Returns:
+            等待秒數
+        """
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2**retry))
+
+    @staticmethod
+    def retryable(error: BaseException) -> bool:
+        """是否為可重試的暫時性錯誤（上游逾時不重試）"""
+        return isinstance(error, Exception) and not isinstance(
+            error, (*NON_RETRYABLE_ERRORS, *UPSTREAM_TIMEOUT_ERRORS)
+        )
+
+
+class CircuitBreaker:
+    """
+    執行緒安全的斷路器
+
+    連續失敗 failure_threshold 次後開啟，開啟期間 allow() 直接拒絕；
+    經過 reset_timeout 秒後進入半開狀態，只放行一個試探呼叫，成功則關閉，
+    失敗則重新開啟。
+
+    Attributes:
+        name: 名稱（指標標籤與錯誤訊息）
+        failure_threshold: 開啟前的連續失敗次數
+        reset_timeout: 開啟後到允許試探的秒數
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ):
+        """
+        初始化斷路器（關閉狀態）
+
+        Args:
+            name: 名稱
+            failure_threshold: 開啟前的連續失敗次數
+            reset_timeout: 開啟後到允許試探的秒數
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold 必須至少為 1")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+        CIRCUIT_STATE.set(0, circuit=name)
+
+    @property
+    def state(self) -> str:
+        """目前狀態（closed、open、half_open）"""
+        with self._lock:
+            self._advance(time.monotonic())
+            return self._state
+
+    def allow(self) -> None:
+        """
+        檢查是否可呼叫上游
+
+        Raises:
+            CircuitOpenError: 開啟中，或半開狀態下已有試探呼叫進行中
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._advance(now)
+            if self._state == CIRCUIT_CLOSED:
+                return
+            if self._state == CIRCUIT_HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            retry_after = max(0.0, self._opened_at + self.reset_timeout - now)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        """記錄成功，關閉斷路器"""
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != CIRCUIT_CLOSED:
+                logger.info(f"斷路器 {self.name} 已關閉")
+                self._set_state(CIRCUIT_CLOSED)
+
+    def release(self) -> None:
+        """結束試探呼叫但不改變狀態（呼叫因上游以外的原因失敗時）"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """記錄失敗，達到門檻或試探失敗時開啟斷路器"""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == CIRCUIT_HALF_OPEN or (
+                self._state == CIRCUIT_CLOSED
+                and self._failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    f"斷路器 {self.name} 開啟（連續失敗 {self._failures} 次），"
+                    f"{self.reset_timeout:.0f} 秒內不呼叫上游"
+                )
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                self._set_state(CIRCUIT_OPEN)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得統計
+
+        Returns:
+            狀態、連續失敗次數、開啟次數與拒絕次數
+        """
+        with self._lock:
+            self._advance(time.monotonic())
+            return {
+                "state": self._state,
+                "failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+    def _advance(self, now: float) -> None:
+        """開啟超過 reset_timeout 時轉為半開（需持有鎖）"""
+        if self._state == CIRCUIT_OPEN and now - self._opened_at >= self.reset_timeout:
+            self._set_state(CIRCUIT_HALF_OPEN)
+
+    def _set_state(self, state: str) -> None:
+        """變更狀態並更新指標（需持有鎖）"""
+        self._state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], circuit=self.name)
+
+
+class UpstreamGuard:
+    """
+    包裝上游掃描呼叫：逾時、重試、斷路器與對沖請求
+
+    模擬與正式模式各有一個斷路器，只有上游錯誤計入失敗；等待連線或速率
+    限制額度逾時等本地錯誤不重試也不計入。對沖啟用時，呼叫超過 hedge_after
+    秒仍未完成就以另一個連線送出相同請求，採用先完成的結果；沒有閒置連線時
+    略過對沖，繼續等待原請求。
+
+    Attributes:
+        timeout: 單次呼叫的逾時時間（秒）
+        retry: 重試策略
+        hedge_after: 送出對沖請求前等待的秒數，None 表示不對沖
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        retry: RetryPolicy | None = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedge_after: float | None = None,
+        hedge_workers: int = 8,
+    ):
+        """
+        初始化
+
+        Args:
+            timeout: 單次呼叫的逾時時間（秒）
+            retry: 重試策略，預設為 RetryPolicy()
+            failure_threshold: 斷路器開啟前的連續失敗次數
+            reset_timeout: 斷路器開啟後到允許試探的秒數
+            hedge_after: 送出對沖請求前等待的秒數，None 表示不對沖
+            hedge_workers: 對沖時執行呼叫的工作執行緒數
+        """
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.hedge_after = hedge_after
+        self.breakers = {
+            simulation: CircuitBreaker(
+                "simulation" if simulation else "production",
+                failure_threshold,
+                reset_timeout,
+            )
+            for simulation in (True, False)
+        }
+        self._executor: ThreadPoolExecutor | None = None
+        self._hedge_workers = hedge_workers
+        self._lock = threading.Lock()
+
+    def call(
+        self,
+        simulation: bool,
+        attempt: Callable[[bool], T],
+        hedge: bool = False,
+    ) -> T:
+        """
+        呼叫上游，失敗時依重試策略重試
+
+        Args:
+            simulation: 是否模擬模式（決定使用的斷路器）
+            attempt: 執行一次呼叫的函式，參數為是否為對沖請求（對沖請求
+                不應等待可用連線）
+            hedge: 是否允許對沖（例如連線池有多個連線時）
+
+        Returns:
+            attempt 的結果
+
+        Raises:
+            CircuitOpenError: 斷路器開啟中
+            PoolExhaustedError: 等待可用連線逾時（不重試）
+            RateLimitWaitTimeout: 等待速率限制額度逾時（不重試）
+            TimeoutError: 上游呼叫逾時（計入斷路器，不重試）
+            Exception: 不可重試的錯誤或重試次數用盡時的最後一個錯誤
+        """
+        breaker = self.breakers[simulation]
+        for retry in range(self.retry.attempts):
+            breaker.allow()
+            try:
+                if hedge and self.hedge_after is not None:
+                    result = self._hedged(attempt)
+                else:
+                    result = attempt(False)
+            except Exception as e:
+                if isinstance(e, NON_RETRYABLE_ERRORS):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if not self.retry.retryable(e) or retry + 1 >= self.retry.attempts:
+                    raise
+                delay = self.retry.backoff(retry)
+                UPSTREAM_RETRIES.inc()
+                logger.warning(
+                    f"上游呼叫失敗（{type(e).__name__}: {e}），"
+                    f"{delay:.2f} 秒後重試（第 {retry + 1} 次）"
+                )
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得統計
+
+        Returns:
+            逾時設定、重試次數上限、對沖設定與各模式斷路器狀態
+        """
+        return {
+            "timeout": self.timeout,
+            "attempts": self.retry.attempts,
+            "hedge_after": self.hedge_after,
+            "circuits": {
+                breaker.name: breaker.stats() for breaker in self.breakers.values()
+            },
+        }
+
+    def close(self) -> None:
+        """停止對沖用的工作執行緒（不等待進行中的呼叫）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, attempt: Callable[[bool], T], hedged: bool) -> Future[T]:
+        """於工作執行緒中執行呼叫，沿用目前的 context（例如上游優先順序）"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._hedge_workers, thread_name_prefix="hedge"
+                )
+            executor = self._executor
+        context = contextvars.copy_context()
+        return executor.submit(context.run, attempt, hedged)
+
+    def _hedged(self, attempt: Callable[[bool], T]) -> T:
+        """
+        送出呼叫，逾 hedge_after 秒未完成時再送出對沖請求，採用先成功的結果
+
+        對沖請求因本地資源不足（沒有閒置連線等）失敗時視為略過，只等待原請求。
+        """
+        primary = self._submit(attempt, False)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        backup = self._submit(attempt, True)
+        UPSTREAM_HEDGES.inc(result="sent")
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is backup:
+                        UPSTREAM_HEDGES.inc(result="won")
+                    return future.result()
+                if future is backup and isinstance(error, LOCAL_ERRORS):
+                    UPSTREAM_HEDGES.inc(result="skipped")
+                    logger.debug(f"略過對沖請求: {error}")
+        # 兩者都失敗時回報原本請求的錯誤
+        return primary.result()
@@ -0,0 +1,425 @@
+"""掃描結果的伺服器端篩選、排序與分頁"""
+
+import base64
+import binascii
+import operator
+import re
+import secrets
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from sj_trading.record import RECORD_FIELDS
+
+_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "!=": operator.ne,
+    "==": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+_FILTER_PATTERN = re.compile(r"^\s*(\w+)\s*(>=|<=|!=|==|>|<)\s*(.+?)\s*$")
+
+_FIELD_SET = frozenset(RECORD_FIELDS)
+
+
+def _change_percent(row: Mapping[str, Any]) -> float | None:
+    """由收盤價與漲跌計算漲跌幅（%）"""
+    change, close = row.get("change_price"), row.get("close")
+    if not isinstance(change, int | float) or not isinstance(close, int | float):
+        return None
+    reference = close - change
+    return round(change / reference * 100, 2) if reference else None
+
+
+# Shioaji 未提供時由其他欄位推算的欄位
+_DERIVED: dict[str, Callable[[Mapping[str, Any]], Any]] = {
+    "change_percent": _change_percent,
+}
+
+# 每個結果集保留的篩選與排序結果數
+_MAX_QUERIES = 32
+
+
+@dataclass(frozen=True)
+class Filter:
+    """
+    單一篩選條件
+
+    Attributes:
+        field: 欄位名稱
+        op: 比較運算子（>=、<=、>、<、==、!=）
+        value: 比較值（可轉為數值時為 float）
+        text: 比較值的原始字串，用於比較字串欄位
+    """
+
+    field: str
+    op: str
+    value: Any
+    text: str
+
+    @classmethod
+    def parse(cls, expression: str) -> "Filter":
+        """
+        解析篩選運算式，例如 close>=10、volume>1000、code==2330
+
+        數值欄位以浮點數比較，字串欄位（例如 code）以原始字串比較。
+
+        Args:
+            expression: 篩選運算式
+
+        Returns:
+            Filter
+
+        Raises:
+            ValueError: 運算式格式錯誤時
+        """
+        match = _FILTER_PATTERN.match(expression)
+        if match is None:
+            raise ValueError(f"無效的篩選條件: {expression}")
+        field, op, raw = match.groups()
+        try:
+            value: Any = float(raw)
+        except ValueError:
+            value = raw
+        return cls(field, op, value, raw)
+
+    def matches(self, value: Any) -> bool:
+        """值是否符合條件，缺值或型別不同時不符合"""
+        if value is None:
+            return False
+        target = self.text if isinstance(value, str) else self.value
+        try:
+            return _OPERATORS[self.op](value, target)
+        except TypeError:
+            return False
+
+
+def parse_sort(expression: str | None) -> tuple[tuple[str, bool], ...]:
+    """
+    解析排序運算式，例如 -volume,close（- 表示遞減）
+
+    Args:
+        expression: 以逗號分隔的欄位，None 或空字串表示維持原排名
+
+    Returns:
+        (欄位名稱, 是否遞減) 的序列
+    """
+    if not expression:
+        return ()
+    keys = []
+    for part in expression.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        descending = part.startswith("-")
+        keys.append((part.lstrip("+-"), descending))
+    return tuple(keys)
+
+
+class ResultSet:
+    """
+    以欄為單位存放的掃描結果，可反覆篩選、排序與分頁
+
+    欄位在第一次使用時由資料列轉出；相同的篩選與排序條件會保留結果索引，
+    重複查詢只需切片。資料列不會變動，可由多個執行緒共用。
+
+    Attributes:
+        rows: 原始資料列（依排名排序）
+    """
+
+    def __init__(self, rows: Sequence[Mapping[str, Any]]):
+        """
+        建立結果集
+
+        Args:
+            rows: 掃描結果（依排名排序）
+        """
+        self.rows = list(rows)
+        self._columns: dict[str, list[Any]] = {}
+        self._queries: OrderedDict[tuple[Any, ...], list[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def column(self, name: str) -> list[Any]:
+        """
+        取得單一欄位的所有值
+
+        Args:
+            name: 欄位名稱
+
+        Returns:
+            依排名排序的值，缺值為 None；change_percent 缺值時由
+            change_price 與 close 推算
+
+        Raises:
+            ValueError: 欄位不存在時
+        """
+        values = self._columns.get(name)
+        if values is None:
+            if name not in _FIELD_SET and not any(name in row for row in self.rows):
+                raise ValueError(f"未知的欄位: {name}")
+            values = [row.get(name) for row in self.rows]
+            derive = _DERIVED.get(name)
+            if derive is not None:
+                values = [
+                    derive(row) if value is None else value
+                    for row, value in zip(self.rows, values, strict=True)
+                ]
+            self._columns[name] = values
+        return values
+
+    def select(
+        self,
+        filters: Sequence[Filter] = (),
+        sort: Sequence[tuple[str, bool]] = (),
+    ) -> list[int]:
+        """
+        取得符合條件的資料列索引
+
+        Args:
+            filters: 篩選條件（全部符合）
+            sort: (欄位名稱, 是否遞減) 的序列，缺值排在最後
+
+        Returns:
+            資料列索引（依排序）
+
+        Raises:
+            ValueError: 欄位不存在時
+        """
+        key = (tuple(filters), tuple(sort))
+        with self._lock:
+            cached = self._queries.get(key)
+            if cached is not None:
+                self._queries.move_to_end(key)
+                return cached
+
+        indices = list(range(len(self.rows)))
+        for condition in filters:
+            values = self.column(condition.field)
+            indices = [i for i in indices if condition.matches(values[i])]
+
+        # 由最後一個鍵開始做穩定排序，得到多鍵排序結果
+        for name, descending in reversed(sort):
+            values = self.column(name)
+            present = [value is not None for value in values]
+            try:
+                if descending:
+                    indices.sort(
+                        key=lambda i: (present[i], values[i] if present[i] else 0),
+                        reverse=True,
+                    )
+                else:
+                    indices.sort(
+                        key=lambda i: (not present[i], values[i] if present[i] else 0)
+                    )
+            except TypeError as e:
+                raise ValueError(f"欄位 {name} 的值無法排序") from e
+
+        with self._lock:
+            self._queries[key] = indices
+            while len(self._queries) > _MAX_QUERIES:
+                self._queries.popitem(last=False)
+        return indices
+
+    def page(
+        self,
+        indices: Sequence[int],
+        offset: int,
+        limit: int,
+        fields: Sequence[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        取出一頁資料列
+
+        Args:
+            indices: select() 的結果
+            offset: 起始位置
+            limit: 筆數
+            fields: 只輸出的欄位，None 表示全部
+
+        Returns:
+            只含這一頁的資料列字典（每次呼叫重新建立）
+
+        Raises:
+            ValueError: 欄位不存在時
+        """
+        window = indices[offset : offset + limit]
+        if fields is None:
+            return [dict(self.rows[i]) for i in window]
+        columns = {name: self.column(name) for name in fields}
+        return [{name: values[i] for name, values in columns.items()} for i in window]
+
+
+def encode_cursor(offset: int, query: str) -> str:
+    """
+    產生分頁游標
+
+    Args:
+        offset: 下一頁的起始位置
+        query: 篩選與排序條件的識別字串
+
+    Returns:
+        不透明的游標字串
+    """
+    raw = f"{offset}:{zlib.crc32(query.encode('utf-8')):08x}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, query: str) -> int:
+    """
+    解析分頁游標
+
+    Args:
+        cursor: encode_cursor() 產生的游標
+        query: 目前的篩選與排序條件識別字串
+
+    Returns:
+        起始位置
+
+    Raises:
+        ValueError: 游標無效或與目前條件不符時
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset, checksum = base64.urlsafe_b64decode(padded).decode("ascii").split(":")
+        start = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"無效的游標: {cursor}") from e
+    if checksum != f"{zlib.crc32(query.encode('utf-8')):08x}" or start < 0:
+        raise ValueError("游標與目前的篩選或排序條件不符")
+    return start
+
+
+@dataclass
+class _Handle:
+    """結果集登錄項目"""
+
+    id: str
+    key: str
+    results: Sequence[Any]
+    result_set: ResultSet
+    expires_at: float
+
+
+class ResultHandles:
+    """
+    以不透明代碼存取的掃描結果集（LRU，逾時失效）
+
+    同一個掃描請求的結果與上次相同（例如快取命中）時沿用原代碼與
+    已轉好的欄位資料。
+
+    Attributes:
+        ttl: 代碼存活時間（秒），每次存取時延長
+        max_entries: 最多保留的結果集數
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 1024):
+        """
+        初始化登錄表
+
+        Args:
+            ttl: 代碼存活時間（秒）
+            max_entries: 最多保留的結果集數
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._handles: OrderedDict[str, _Handle] = OrderedDict()
+        self._by_key: dict[str, _Handle] = {}
+        self._lock = threading.Lock()
+
+    def register(self, key: str, results: Sequence[Any]) -> str:
+        """
+        登錄掃描結果
+
+        Args:
+            key: 掃描請求的識別字串
+            results: 掃描結果
+
+        Returns:
+            結果集代碼
+        """
+        now = time.time()
+        with self._lock:
+            handle = self._by_key.get(key)
+            if handle is not None and same_rows(handle.results, results):
+                handle.expires_at = now + self.ttl
+                self._handles[handle.id] = handle
+                self._handles.move_to_end(handle.id)
+                return handle.id
+
+        # 轉換在鎖外進行，不阻擋其他請求
+        handle = _Handle(
+            id=secrets.token_urlsafe(12),
+            key=key,
+            results=results,
+            result_set=ResultSet(results),
+            expires_at=now + self.ttl,
+        )
+        with self._lock:
+            old = self._by_key.get(key)
+            if old is not None:
+                self._handles.pop(old.id, None)
+            self._handles[handle.id] = handle
+            self._by_key[key] = handle
+            while len(self._handles) > self.max_entries:
+                _, evicted = self._handles.popitem(last=False)
+                if self._by_key.get(evicted.key) is evicted:
+                    del self._by_key[evicted.key]
+        return handle.id
+
+    def get(self, handle_id: str) -> ResultSet | None:
+        """
+        取得結果集並延長存活時間
+
+        Args:
+            handle_id: 結果集代碼
+
+        Returns:
+            ResultSet，不存在或已逾時時為 None
+        """
+        now = time.time()
+        with self._lock:
+            handle = self._handles.get(handle_id)
+            if handle is None:
+                return None
+            if now >= handle.expires_at:
+                del self._handles[handle_id]
+                if self._by_key.get(handle.key) is handle:
+                    del self._by_key[handle.key]
+                return None
+            handle.expires_at = now + self.ttl
+            self._handles.move_to_end(handle_id)
+            return handle.result_set
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得統計
+
+        Returns:
+            結果集數與上限
+        """
+        return {"handles": len(self._handles), "max_entries": self.max_entries}
+
+
+def same_rows(a: Sequence[Any], b: Sequence[Any]) -> bool:
+    """
+    兩份結果是否為相同的資料列物件（快取命中時成立）
+
+    只比對物件是否相同，不比較內容，可用來沿用依結果計算的衍生資料。
+
+    Args:
+        a: 掃描結果
+        b: 掃描結果
+
+    Returns:
+        長度相同且每一列皆為同一物件
+    """
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b, strict=True))
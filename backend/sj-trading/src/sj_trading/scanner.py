@@ -1,16 +1,46 @@
 """股票掃描器模組"""
 
 import csv
+import functools
 import logging
 import time
+from collections.abc import Callable, Iterator, Mapping, Sequence
 from io import StringIO
-from typing import Any
+from typing import Any, NamedTuple
 
 from sj_trading.api_client import ShioajiClient
+from sj_trading.cache import ScanCache
 from sj_trading.config import load_config
+from sj_trading.metrics import (
+    ERRORS,
+    SCAN_ROWS,
+    SCAN_SECONDS,
+    SCAN_STAGE_SECONDS,
+    SCANS,
+    SCANS_IN_FLIGHT,
+    track_stage,
+)
+from sj_trading.quota import (
+    QUOTA_CONSERVE,
+    QUOTA_EXHAUSTED,
+    QUOTA_NORMAL,
+    DegradationPolicy,
+    QuotaExceededError,
+    QuotaTracker,
+    make_usage_data,
+)
+from sj_trading.record import ScanRecord
+from sj_trading.resilience import CircuitOpenError, UpstreamGuard
+from sj_trading.session_pool import SessionPool
+from sj_trading.singleflight import SingleFlight
+from sj_trading.store import ScanStore
+from sj_trading.trading_calendar import TradingCalendar, is_final, taipei_today
 
 logger = logging.getLogger(__name__)
 
+# 未提供 UpstreamGuard 時 scanners() 的逾時時間（秒）
+DEFAULT_TIMEOUT = 30.0
+
 
 def scanner_to_dict(scanner: Any) -> dict[str, Any]:
     """
@@ -38,6 +68,194 @@ def scanners_to_list(scanners: list[Any]) -> list[dict[str, Any]]:
     return [scanner_to_dict(scanner) for scanner in scanners]
 
 
+def scanners_to_records(scanners: list[Any]) -> list[ScanRecord]:
+    """
+    將 scanner 列表轉換為 ScanRecord 列表
+
+    Args:
+        scanners: Shioaji scanner 物件列表
+
+    Returns:
+        ScanRecord 列表
+    """
+    return [ScanRecord.from_scanner(scanner) for scanner in scanners]
+
+
+def usage_to_dict(usage_info: Any) -> dict[str, Any] | None:
+    """
+    將流量使用狀況轉換為字典
+
+    Args:
+        usage_info: Shioaji UsageStatus 物件
+
+    Returns:
+        流量使用資訊字典，查詢失敗時為 None
+    """
+    if not usage_info:
+        return None
+
+    usage_data = make_usage_data(usage_info.bytes, usage_info.limit_bytes)
+
+    if usage_data["is_over_limit"]:
+        logger.warning(
+            f"API 流量已達上限：{usage_data['bytes_used']}/"
+            f"{usage_data['limit_bytes']} bytes"
+        )
+    else:
+        logger.info(
+            f"流量使用狀況：{usage_data['bytes_used']}/"
+            f"{usage_data['limit_bytes']} bytes "
+            f"({usage_data['remaining_percent']:.2f}% 剩餘)"
+        )
+
+    return usage_data
+
+
+def _scan_with_client(
+    client: ShioajiClient,
+    scanner_type: str,
+    date: str,
+    count: int,
+    ascending: bool,
+    quota: QuotaTracker | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> tuple[list[ScanRecord], dict[str, Any] | None]:
+    """
+    使用已登入的客戶端查詢流量並執行掃描
+
+    有配額追蹤時改用本地預估值，不再查詢 usage()。scanners() 的逾時時間為
+    timeout 秒。
+
+    Returns:
+        (掃描結果列表, 流量使用資訊)
+    """
+    # 查詢流量使用狀況
+    usage_data = None if quota is not None else usage_to_dict(client.get_usage())
+
+    # 執行掃描
+    scanners = client.scanners(
+        scanner_type=scanner_type,
+        date=date,
+        count=count,
+        ascending=ascending,
+        timeout=int(timeout * 1000),
+    )
+
+    # 轉換為精簡的資料列
+    with track_stage("convert"):
+        results = scanners_to_records(scanners)
+    SCAN_ROWS.inc(len(results))
+
+    if quota is not None:
+        quota.record_scan(client.simulation, len(results))
+        usage_data = quota.usage(client.simulation)
+
+    return results, usage_data
+
+
+def _fetch_scan(
+    scanner_type: str,
+    date: str,
+    count: int,
+    ascending: bool,
+    simulation: bool,
+    config_file: str,
+    pool: SessionPool | None,
+    quota: QuotaTracker | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    acquire_timeout: float | None = None,
+) -> tuple[list[ScanRecord], dict[str, Any] | None]:
+    """
+    向 Shioaji 執行掃描，有連線池時借用連線，否則登入後登出
+
+    Args:
+        timeout: scanners() 的逾時時間（秒）
+        acquire_timeout: 等待可用連線的秒數，None 時使用連線池設定
+
+    Returns:
+        (掃描結果列表, 流量使用資訊)
+    """
+    if pool is not None:
+        acquire_start = time.perf_counter()
+        with pool.acquire(simulation, acquire_timeout) as client:
+            SCAN_STAGE_SECONDS.observe(
+                time.perf_counter() - acquire_start, stage="pool_acquire"
+            )
+            return _scan_with_client(
+                client, scanner_type, date, count, ascending, quota, timeout
+            )
+
+    # 讀取配置
+    with track_stage("config_load"):
+        config = load_config(config_file)
+
+    # 初始化客戶端
+    client = ShioajiClient(config, simulation=simulation)
+
+    try:
+        # 登入
+        client.login()
+
+        # 啟用憑證
+        client.activate_ca()
+
+        return _scan_with_client(
+            client, scanner_type, date, count, ascending, quota, timeout
+        )
+    finally:
+        # 確保登出
+        client.logout()
+
+
+SOURCE_UPSTREAM = "upstream"
+SOURCE_CACHE = "cache"
+SOURCE_STORE = "store"
+SOURCE_SKIPPED = "skipped"
+
+
+class ScanResult(NamedTuple):
+    """
+    掃描結果
+
+    Attributes:
+        results: 掃描結果列表（唯讀的 ScanRecord）
+        execution_time: 執行時間（秒）
+        usage_data: 流量使用資訊，未知時為 None
+        data_age: 資料取得至今的秒數，剛向 Shioaji 查詢時為 0
+        stale: 是否為流量不足時提供的過期快取資料
+        quota_level: 降級等級（normal、conserve、critical、exhausted）
+        source: 資料來源（upstream、cache、store、skipped）
+    """
+
+    results: list[ScanRecord]
+    execution_time: float
+    usage_data: dict[str, Any] | None
+    data_age: float = 0.0
+    stale: bool = False
+    quota_level: str = QUOTA_NORMAL
+    source: str = SOURCE_UPSTREAM
+
+
+def _instrumented(fn: Callable[..., ScanResult]) -> Callable[..., ScanResult]:
+    """記錄掃描次數、總耗時、執行中數量與錯誤類型"""
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> ScanResult:
+        with SCANS_IN_FLIGHT.track_inprogress():
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                ERRORS.inc(stage="scan", type=type(e).__name__)
+                SCANS.inc(source="error")
+                raise
+        SCANS.inc(source=result.source)
+        SCAN_SECONDS.observe(result.execution_time, source=result.source)
+        return result
+
+    return wrapper
+
+
+@_instrumented
 def execute_scan(
     scanner_type: str,
     date: str,
@@ -45,7 +263,15 @@ def execute_scan(
     ascending: bool = True,
     simulation: bool = True,
     config_file: str = "config.txt",
-) -> tuple[list[dict[str, Any]], float, dict[str, Any] | None]:
+    pool: SessionPool | None = None,
+    cache: ScanCache | None = None,
+    flight: SingleFlight | None = None,
+    quota: QuotaTracker | None = None,
+    policy: DegradationPolicy | None = None,
+    store: ScanStore | None = None,
+    calendar: TradingCalendar | None = None,
+    guard: UpstreamGuard | None = None,
+) -> ScanResult:
     """
     執行股票掃描
 
@@ -55,118 +281,267 @@ def execute_scan(
         count: 查詢數量
         ascending: 是否升序
         simulation: 是否模擬模式
-        config_file: 配置檔案路徑
+        config_file: 配置檔案路徑（未使用連線池時）
+        pool: 連線池，提供時借用已登入的客戶端，不再逐次登入登出
+        cache: 掃描結果快取，命中時不呼叫 Shioaji
+        flight: 請求合併器，相同參數的並行掃描共用同一次 Shioaji 呼叫
+        quota: 配額追蹤，提供時以本地預估取代每次掃描前的 usage() 查詢
+        policy: 流量降級策略，未提供時使用預設門檻
+        store: 歷史儲存，每次查詢結果都會寫入；歷史日期快取未命中時，收盤後
+            取得的快照視為最終結果直接回傳（收盤前的快照則重新查詢）；流量達
+            critical 以上時任何快照都可當作過期資料回傳
+        calendar: 交易日曆，非交易日直接回傳空結果，不呼叫 Shioaji；並決定
+            收盤時間（未提供時使用預設收盤時間）
+        guard: 上游呼叫的逾時、重試、斷路器與對沖設定；斷路器開啟時改回傳
+            快取或歷史儲存中的舊資料（stale）
 
     Returns:
-        (掃描結果列表, 執行時間, 流量使用資訊)
+        ScanResult
 
     Raises:
+        QuotaExceededError: 流量已達上限且沒有可用的快取資料
+        CircuitOpenError: 斷路器開啟中且沒有任何舊資料
         Exception: 執行失敗時
     """
     start_time = time.time()
 
-    # 讀取配置
-    config = load_config(config_file)
-
-    # 初始化客戶端
-    client = ShioajiClient(config, simulation=simulation)
-
-    try:
-        # 登入
-        client.login()
-
-        # 啟用憑證
-        client.activate_ca()
+    policy = policy or DegradationPolicy()
+    usage_data = quota.usage(simulation) if quota is not None else None
+    level = policy.level(usage_data)
 
-        # 查詢流量使用狀況
-        usage_info = client.get_usage()
-        usage_data = None
+    reason = calendar.non_trading_reason(date) if calendar is not None else None
+    if reason is not None or (
+        cache is not None and cache.is_empty(scanner_type, date, ascending, simulation)
+    ):
+        execution_time = time.time() - start_time
+        logger.info(
+            f"{scanner_type} {date} 沒有資料（{reason or '先前查詢為空'}），略過掃描"
+        )
+        return ScanResult(
+            [], execution_time, usage_data, quota_level=level, source=SOURCE_SKIPPED
+        )
 
-        if usage_info:
-            bytes_used = usage_info.bytes
-            limit_bytes = usage_info.limit_bytes
-            remaining_bytes = limit_bytes - bytes_used
-            remaining_pct = (
-                (remaining_bytes / limit_bytes * 100) if limit_bytes > 0 else 0
+    if cache is not None:
+        with track_stage("cache_lookup"):
+            hit = cache.get_entry(
+                scanner_type,
+                date,
+                count,
+                ascending,
+                simulation,
+                max_stale=policy.max_stale(level, cache.today_ttl),
+            )
+        if hit is not None:
+            execution_time = time.time() - start_time
+            logger.info(
+                f"快取命中，共 {len(hit.results)} 筆資料，"
+                f"資料時間 {hit.age:.0f} 秒前（流量等級 {level}）"
             )
-            is_over_limit = bytes_used >= limit_bytes
-
-            usage_data = {
-                "bytes_used": bytes_used,
-                "limit_bytes": limit_bytes,
-                "remaining_bytes": remaining_bytes,
-                "remaining_percent": round(remaining_pct, 2),
-                "is_over_limit": is_over_limit,
-                "warning": (
-                    f"警告：流量已達上限！已使用 {bytes_used} bytes，"
-                    f"上限為 {limit_bytes} bytes"
-                    if is_over_limit
-                    else None
-                ),
-            }
-
-            if is_over_limit:
-                logger.warning(f"API 流量已達上限：{bytes_used}/{limit_bytes} bytes")
-            else:
+            return ScanResult(
+                hit.results,
+                execution_time,
+                usage_data,
+                hit.age,
+                hit.stale,
+                level,
+                SOURCE_CACHE,
+            )
+
+    if store is not None:
+        historical = date < taipei_today().isoformat()
+        degraded = level not in (QUOTA_NORMAL, QUOTA_CONSERVE)
+        if historical or degraded:
+            with track_stage("store_lookup"):
+                snapshot = store.latest(
+                    scanner_type, date, count, ascending, simulation
+                )
+                # 收盤前取得的快照仍會變動，只有收盤後的快照可視為歷史日期的
+                # 最終結果；其餘只在流量不足時當作過期資料回傳，否則重新查詢
+                final = (
+                    snapshot is not None
+                    and historical
+                    and _is_final(calendar, date, snapshot.fetched_at)
+                )
+                usable = final or degraded
+                results = store.load(snapshot.id, count) if snapshot and usable else []
+            if snapshot is not None and usable:
+                if cache is not None and final:
+                    cache.put(scanner_type, date, count, ascending, simulation, results)
+                execution_time = time.time() - start_time
+                data_age = time.time() - snapshot.fetched_at
                 logger.info(
-                    f"流量使用狀況：{bytes_used}/{limit_bytes} bytes "
-                    f"({remaining_pct:.2f}% 剩餘)"
+                    f"由歷史儲存讀取快照 {snapshot.id}，共 {len(results)} 筆資料"
+                    f"（流量等級 {level}）"
+                )
+                return ScanResult(
+                    results,
+                    execution_time,
+                    usage_data,
+                    data_age,
+                    not final,
+                    level,
+                    SOURCE_STORE,
                 )
 
-        # 執行掃描
-        scanners = client.scanners(
-            scanner_type=scanner_type,
-            date=date,
-            count=count,
-            ascending=ascending,
-            timeout=30000,
+    if level == QUOTA_EXHAUSTED and policy.refuse_uncached and usage_data:
+        logger.warning(f"流量已達上限，拒絕未快取的查詢: {scanner_type} {date}")
+        raise QuotaExceededError(usage_data)
+
+    def attempt(hedged: bool) -> tuple[list[ScanRecord], dict[str, Any] | None]:
+        return _fetch_scan(
+            scanner_type,
+            date,
+            count,
+            ascending,
+            simulation,
+            config_file,
+            pool,
+            quota,
+            timeout=guard.timeout if guard is not None else DEFAULT_TIMEOUT,
+            # 對沖請求只使用閒置連線，不與原請求搶同一個連線
+            acquire_timeout=0.0 if hedged else None,
         )
 
-        # 轉換為字典列表
-        results = scanners_to_list(scanners)
+    def fetch() -> tuple[list[ScanRecord], dict[str, Any] | None]:
+        if guard is not None:
+            hedge = pool is not None and pool.size > 1
+            results, usage_data = guard.call(simulation, attempt, hedge=hedge)
+        else:
+            results, usage_data = attempt(False)
+        if cache is not None:
+            cache.put(scanner_type, date, count, ascending, simulation, results)
+            if not results:
+                final = _is_final(calendar, date, time.time())
+                cache.mark_empty(scanner_type, date, ascending, simulation, final)
+        if store is not None:
+            # 寫入歷史儲存不在請求路徑上，結果已放入快取後於背景寫入
+            try:
+                store.save_later(
+                    scanner_type, date, count, ascending, simulation, results
+                )
+            except RuntimeError as e:
+                logger.warning(f"寫入歷史儲存失敗: {e}")
+        return results, usage_data
 
+    try:
+        if flight is not None:
+            key = (scanner_type, date, count, ascending, simulation)
+            results, usage_data = flight.do(key, fetch)
+        else:
+            results, usage_data = fetch()
+    except CircuitOpenError:
+        fallback = _fallback_result(
+            scanner_type, date, count, ascending, simulation, cache, store
+        )
+        if fallback is None:
+            raise
+        source, data_age, results = fallback
         execution_time = time.time() - start_time
-        logger.info(f"掃描完成，共 {len(results)} 筆資料，耗時 {execution_time:.2f} 秒")
+        logger.warning(
+            f"上游斷路器開啟，回傳 {data_age:.0f} 秒前的舊資料，共 {len(results)} 筆"
+        )
+        return ScanResult(
+            results, execution_time, usage_data, data_age, True, level, source
+        )
 
-        return results, execution_time, usage_data
+    execution_time = time.time() - start_time
+    logger.info(f"掃描完成，共 {len(results)} 筆資料，耗時 {execution_time:.2f} 秒")
 
-    finally:
-        # 確保登出
-        client.logout()
+    return ScanResult(
+        results, execution_time, usage_data, quota_level=policy.level(usage_data)
+    )
+
+
+def _is_final(calendar: TradingCalendar | None, date: str, fetched_at: float) -> bool:
+    """結果是否於收盤後取得（未提供交易日曆時使用預設收盤時間）"""
+    if calendar is not None:
+        return calendar.is_final(date, fetched_at)
+    return is_final(date, fetched_at)
 
 
-def generate_csv(data: list[dict[str, Any]]) -> str:
+def _fallback_result(
+    scanner_type: str,
+    date: str,
+    count: int,
+    ascending: bool,
+    simulation: bool,
+    cache: ScanCache | None,
+    store: ScanStore | None,
+) -> tuple[str, float, list[ScanRecord]] | None:
     """
-    產生 CSV 內容
+    取得不論新舊的快取或歷史儲存資料（上游無法使用時）
+
+    Returns:
+        (資料來源, 資料時間秒數, 掃描結果)，都沒有時為 None
+    """
+    if cache is not None:
+        hit = cache.get_entry(
+            scanner_type, date, count, ascending, simulation, max_stale=None
+        )
+        if hit is not None:
+            return SOURCE_CACHE, hit.age, hit.results
+    if store is not None:
+        snapshot = store.latest(scanner_type, date, count, ascending, simulation)
+        if snapshot is not None:
+            age = time.time() - snapshot.fetched_at
+            return SOURCE_STORE, age, store.load(snapshot.id, count)
+    return None
+
+
+def iter_csv(data: Sequence[Mapping[str, Any]], chunk_size: int = 100) -> Iterator[str]:
+    """
+    逐段產生 CSV 內容
+
+    第一段為 BOM 與標題列，之後每段包含 chunk_size 筆資料，
+    適合搭配串流回應，記憶體用量不隨資料筆數成長。
 
     Args:
         data: 資料列表
+        chunk_size: 每段包含的資料筆數
 
-    Returns:
-        CSV 字串（UTF-8-BOM 編碼）
+    Yields:
+        CSV 字串片段
     """
     if not data:
-        return ""
+        return
 
-    output = StringIO()
+    buffer = StringIO()
 
     # 取得所有欄位名稱
     fieldnames = list(data[0].keys())
 
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+
+    # 加上 BOM 以便 Excel 正確識別 UTF-8
+    buffer.write("\ufeff")
     writer.writeheader()
 
-    for row in data:
+    for index, row in enumerate(data, start=1):
         writer.writerow(row)
+        if index % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
 
-    # 加上 BOM 以便 Excel 正確識別 UTF-8
-    csv_content = "\ufeff" + output.getvalue()
-    output.close()
+    if buffer.tell():
+        yield buffer.getvalue()
+    buffer.close()
+
+
+def generate_csv(data: Sequence[Mapping[str, Any]]) -> str:
+    """
+    產生 CSV 內容
+
+    Args:
+        data: 資料列表
 
-    return csv_content
+    Returns:
+        CSV 字串（UTF-8-BOM 編碼）
+    """
+    return "".join(iter_csv(data))
 
 
-def save_csv(data: list[dict[str, Any]], filename: str = "output.csv") -> None:
+def save_csv(data: Sequence[Mapping[str, Any]], filename: str = "output.csv") -> None:
     """
     儲存資料為 CSV 檔案
 
@@ -178,9 +553,8 @@ def save_csv(data: list[dict[str, Any]], filename: str = "output.csv") -> None:
         logger.warning("沒有資料可儲存")
         return
 
-    csv_content = generate_csv(data)
-
-    with open(filename, "w", encoding="utf-8-sig") as f:
-        f.write(csv_content.lstrip("\ufeff"))  # 移除字串開頭的 BOM，因為檔案編碼已處理
+    # iter_csv 已包含 BOM，以 UTF-8 寫入即為 UTF-8-BOM 檔案
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        f.writelines(iter_csv(data))
 
     logger.info(f"已將 {len(data)} 筆資料儲存至 {filename}")
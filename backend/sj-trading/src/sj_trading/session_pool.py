@@ -0,0 +1,296 @@
+"""Shioaji 連線池模組"""
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from sj_trading.api_client import ShioajiClient
+from sj_trading.config import load_config
+from sj_trading.ratelimit import UpstreamLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(TimeoutError):
+    """等待可用連線逾時（連線都在使用中，不代表上游異常）"""
+
+
+@dataclass
+class PooledSession:
+    """
+    連線池中的單一連線
+
+    Attributes:
+        client: Shioaji 客戶端
+        logged_in_at: 登入時間（monotonic 秒）
+        last_checked: 上次健康檢查時間（monotonic 秒）
+        healthy: 是否可直接使用，False 時借出前會重新登入
+    """
+
+    client: ShioajiClient
+    logged_in_at: float = 0.0
+    last_checked: float = 0.0
+    healthy: bool = False
+
+
+class SessionPool:
+    """
+    已登入並啟用憑證的 Shioaji 客戶端連線池
+
+    模擬與正式模式各自維護一組連線。借出前會依健康檢查間隔呼叫
+    usage() 確認連線仍有效，失效或超過存活時間時自動重新登入。
+
+    Attributes:
+        config_file: 配置檔案路徑
+        size: 每個模式的最大連線數
+        health_check_interval: 健康檢查間隔（秒）
+        max_session_age: 連線最長存活時間（秒），超過後重新登入
+        acquire_timeout: 等待可用連線的逾時時間（秒）
+        limiter: 所有連線共用的上游呼叫速率限制（額度以帳號計算）
+    """
+
+    def __init__(
+        self,
+        config_file: str = "config.txt",
+        size: int = 1,
+        health_check_interval: float = 60.0,
+        max_session_age: float = 6 * 3600,
+        acquire_timeout: float = 30.0,
+        api_factory: Callable[..., Any] | None = None,
+        config: dict[str, str] | None = None,
+        limiter: UpstreamLimiter | None = None,
+    ):
+        """
+        初始化連線池
+
+        Args:
+            config_file: 配置檔案路徑
+            size: 每個模式的最大連線數
+            health_check_interval: 健康檢查間隔（秒）
+            max_session_age: 連線最長存活時間（秒）
+            acquire_timeout: 等待可用連線的逾時時間（秒）
+            api_factory: 建立 API 實例的函式，傳給 ShioajiClient
+            config: 直接提供的配置，提供時不讀取 config_file
+            limiter: 上游呼叫速率限制，傳給每個 ShioajiClient，None 表示不限制
+        """
+        if size < 1:
+            raise ValueError("連線池大小必須至少為 1")
+
+        self.config_file = config_file
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.max_session_age = max_session_age
+        self.acquire_timeout = acquire_timeout
+        self.api_factory = api_factory
+        self.limiter = limiter
+
+        self._config: dict[str, str] | None = config
+        self._idle: dict[bool, queue.LifoQueue[PooledSession]] = {
+            True: queue.LifoQueue(),
+            False: queue.LifoQueue(),
+        }
+        self._created = {True: 0, False: 0}
+        self._lock = threading.Lock()
+        # 連線歸還或移除時通知等待中的請求（移除後可建立替代連線）
+        self._available = threading.Condition(self._lock)
+        self._closed = False
+
+    def warm_up(self, modes: list[bool] | None = None) -> None:
+        """
+        預先建立並登入連線
+
+        失敗時僅記錄日誌，之後借出時會再嘗試建立。
+
+        Args:
+            modes: 要預熱的模式列表（True 為模擬模式），預設為模擬模式
+        """
+        for simulation in modes if modes is not None else [True]:
+            try:
+                with self.acquire(simulation):
+                    pass
+                logger.info(f"連線池預熱完成（simulation={simulation}）")
+            except Exception as e:
+                logger.warning(f"連線池預熱失敗（simulation={simulation}）: {e}")
+
+    @contextmanager
+    def acquire(
+        self, simulation: bool = True, timeout: float | None = None
+    ) -> Iterator[ShioajiClient]:
+        """
+        借出一個可用的客戶端，離開 with 區塊時自動歸還
+
+        區塊內發生例外時，該連線下次借出前會強制進行健康檢查，失效時重新
+        登入。連線池本身不重試失敗的呼叫；重試由呼叫端負責（例如
+        UpstreamGuard 每次重試都重新借出連線，因此會在檢查或重新登入後的
+        連線上執行）。
+
+        Args:
+            simulation: 是否使用模擬模式
+            timeout: 等待可用連線的秒數，None 時使用 acquire_timeout，
+                0 表示沒有閒置連線且已達上限時立即失敗
+
+        Yields:
+            已登入並啟用憑證的 ShioajiClient
+
+        Raises:
+            PoolExhaustedError: 等待可用連線逾時
+            RuntimeError: 連線池已關閉
+        """
+        session = self._checkout(simulation, timeout)
+        try:
+            yield session.client
+        except Exception:
+            session.last_checked = 0.0
+            raise
+        finally:
+            self._checkin(simulation, session)
+
+    def close(self) -> None:
+        """關閉連線池並登出所有閒置連線"""
+        self._closed = True
+        with self._available:
+            self._available.notify_all()
+        for simulation, idle in self._idle.items():
+            while True:
+                try:
+                    session = idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._discard(simulation, session)
+        logger.info("連線池已關閉")
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得連線池狀態
+
+        Returns:
+            各模式的連線數與閒置數
+        """
+        with self._lock:
+            return {
+                ("simulation" if simulation else "production"): {
+                    "size": self.size,
+                    "created": self._created[simulation],
+                    "idle": self._idle[simulation].qsize(),
+                }
+                for simulation in (True, False)
+            }
+
+    def _get_config(self) -> dict[str, str]:
+        """讀取並快取配置"""
+        if self._config is None:
+            self._config = load_config(self.config_file)
+        return self._config
+
+    def _checkout(self, simulation: bool, timeout: float | None) -> PooledSession:
+        """取得閒置連線或建立新連線，並確保可用"""
+        if self._closed:
+            raise RuntimeError("連線池已關閉")
+
+        idle = self._idle[simulation]
+        try:
+            session = idle.get_nowait()
+        except queue.Empty:
+            session = self._create_or_wait(simulation, timeout)
+
+        try:
+            self._ensure_ready(session)
+        except Exception:
+            self._discard(simulation, session)
+            raise
+        return session
+
+    def _create_or_wait(self, simulation: bool, timeout: float | None) -> PooledSession:
+        """
+        未達上限時建立新連線，否則等待其他請求歸還
+
+        等待期間有連線被移除（例如登入失敗）時，由等待中的請求建立替代
+        連線，不必等到逾時。
+        """
+        idle = self._idle[simulation]
+        deadline = time.monotonic() + (
+            self.acquire_timeout if timeout is None else timeout
+        )
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("連線池已關閉")
+                try:
+                    return idle.get_nowait()
+                except queue.Empty:
+                    pass
+                if self._created[simulation] < self.size:
+                    self._created[simulation] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError("等待可用的 Shioaji 連線逾時")
+                self._available.wait(remaining)
+
+        try:
+            client = ShioajiClient(
+                self._get_config(),
+                simulation=simulation,
+                api_factory=self.api_factory,
+                limiter=self.limiter,
+            )
+        except Exception:
+            self._release_slot(simulation)
+            raise
+        return PooledSession(client=client)
+
+    def _ensure_ready(self, session: PooledSession) -> None:
+        """依存活時間與健康檢查結果決定是否重新登入"""
+        now = time.monotonic()
+
+        if session.healthy and now - session.logged_in_at > self.max_session_age:
+            logger.info("連線已超過存活時間，重新登入")
+            session.healthy = False
+
+        if session.healthy and now - session.last_checked > self.health_check_interval:
+            session.healthy = session.client.get_usage() is not None
+            session.last_checked = now
+            if not session.healthy:
+                logger.warning("連線健康檢查失敗，重新登入")
+
+        if not session.healthy:
+            self._login(session)
+
+    def _login(self, session: PooledSession) -> None:
+        """登入並啟用憑證"""
+        client = session.client
+        client.logout()
+        client.login()
+        client.activate_ca()
+
+        now = time.monotonic()
+        session.logged_in_at = now
+        session.last_checked = now
+        session.healthy = True
+
+    def _checkin(self, simulation: bool, session: PooledSession) -> None:
+        """歸還連線，連線池已關閉時直接登出"""
+        if self._closed:
+            self._discard(simulation, session)
+            return
+        with self._available:
+            self._idle[simulation].put(session)
+            self._available.notify()
+
+    def _discard(self, simulation: bool, session: PooledSession) -> None:
+        """登出並移除連線"""
+        try:
+            session.client.logout()
+        finally:
+            self._release_slot(simulation)
+
+    def _release_slot(self, simulation: bool) -> None:
+        """釋出連線名額並通知等待中的請求"""
+        with self._available:
+            self._created[simulation] -= 1
+            self._available.notify()
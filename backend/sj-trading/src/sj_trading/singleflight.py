@@ -0,0 +1,99 @@
+"""重複請求合併模組"""
+
+import logging
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    """進行中的呼叫"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    合併相同鍵值的並行呼叫
+
+    同一時間相同鍵值只會執行一次，其餘呼叫者等待並共用同一結果（或例外）。
+
+    Attributes:
+        executions: 實際執行次數
+        coalesced: 被合併（未實際執行）的呼叫次數
+    """
+
+    def __init__(self) -> None:
+        """初始化"""
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        執行或加入進行中的呼叫
+
+        Args:
+            key: 呼叫鍵值
+            fn: 實際執行的函式
+
+        Returns:
+            fn 的回傳值（合併的呼叫者共用同一物件）
+
+        Raises:
+            Exception: fn 拋出的例外會傳遞給所有等待者
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"合併進行中的請求: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[no-any-return]
+
+        try:
+            call.result = fn()
+            return call.result  # type: ignore[no-any-return]
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得合併統計
+
+        Returns:
+            實際執行次數、合併次數、單次最多等待者與進行中數量
+        """
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "max_waiters": self.max_waiters,
+            "in_flight": len(self._calls),
+        }
@@ -0,0 +1,588 @@
+"""掃描歷史本地儲存模組（SQLite）"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from sj_trading.record import ScanRecord
+from sj_trading.trading_calendar import is_final
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scanner_type TEXT NOT NULL,
+    date TEXT NOT NULL,
+    ascending INTEGER NOT NULL,
+    simulation INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_lookup
+    ON snapshots (date, scanner_type, ascending, simulation, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_snapshots_type
+    ON snapshots (scanner_type, date);
+CREATE TABLE IF NOT EXISTS snapshot_rows (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    code TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, rank)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_snapshot_rows_code
+    ON snapshot_rows (code, snapshot_id);
+"""
+
+
+@dataclass
+class StoredSnapshot:
+    """
+    已儲存的掃描快照
+
+    Attributes:
+        id: 快照編號
+        scanner_type: 掃描器類型
+        date: 查詢日期
+        ascending: 是否升序
+        simulation: 是否模擬模式
+        count: 查詢數量
+        row_count: 實際筆數
+        fetched_at: 取得時間（epoch 秒）
+    """
+
+    id: int
+    scanner_type: str
+    date: str
+    ascending: bool
+    simulation: bool
+    count: int
+    row_count: int
+    fetched_at: float
+
+    def covers(self, count: int) -> bool:
+        """是否足以回應指定數量的請求"""
+        return count <= self.count or self.row_count < self.count
+
+
+class ScanStore:
+    """
+    以 SQLite 儲存每次掃描的快照
+
+    快照依 date、scanner_type、排序與模式建立索引，資料列另依 code 建立索引，
+    可快速查詢某段期間的排名或單一股票的歷史。
+
+    Attributes:
+        path: 資料庫檔案路徑
+    """
+
+    def __init__(self, path: str = "scan_history.sqlite3"):
+        """
+        開啟（必要時建立）資料庫
+
+        Args:
+            path: 資料庫檔案路徑，":memory:" 表示僅存在記憶體
+        """
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        # 背景寫入用的單一工作執行緒，依送出順序寫入
+        self._writer: ThreadPoolExecutor | None = None
+        self._writer_lock = threading.Lock()
+        self._pending = 0
+        self._closed = False
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """等待背景寫入完成後關閉資料庫"""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+            self._closed = True
+        if writer is not None:
+            writer.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    def save(
+        self,
+        scanner_type: str,
+        date: str,
+        count: int,
+        ascending: bool,
+        simulation: bool,
+        results: Sequence[Mapping[str, Any]],
+        fetched_at: float | None = None,
+    ) -> int:
+        """
+        儲存一次掃描快照
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            count: 查詢數量
+            ascending: 是否升序
+            simulation: 是否模擬模式
+            results: 掃描結果列表
+            fetched_at: 取得時間（epoch 秒），預設為現在
+
+        Returns:
+            快照編號
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        rows = [
+            (
+                rank,
+                row.get("code"),
+                json.dumps(dict(row), ensure_ascii=False, default=str),
+            )
+            for rank, row in enumerate(results, start=1)
+        ]
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO snapshots (scanner_type, date, ascending, simulation, "
+                "count, row_count, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    scanner_type,
+                    date,
+                    ascending,
+                    simulation,
+                    count,
+                    len(rows),
+                    fetched_at,
+                ),
+            )
+            snapshot_id = cursor.lastrowid
+            assert snapshot_id is not None
+            self._conn.executemany(
+                "INSERT INTO snapshot_rows (snapshot_id, rank, code, data) "
+                "VALUES (?, ?, ?, ?)",
+                [(snapshot_id, *row) for row in rows],
+            )
+
+        logger.debug(f"已儲存快照 {snapshot_id}：{scanner_type} {date}，{len(rows)} 筆")
+        return snapshot_id
+
+    def save_later(
+        self,
+        scanner_type: str,
+        date: str,
+        count: int,
+        ascending: bool,
+        simulation: bool,
+        results: Sequence[Mapping[str, Any]],
+    ) -> Future[int]:
+        """
+        於背景工作執行緒儲存快照，不阻塞呼叫端
+
+        取得時間於送出時決定；寫入失敗只記錄日誌。
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            count: 查詢數量
+            ascending: 是否升序
+            simulation: 是否模擬模式
+            results: 掃描結果列表（送出後不應再修改）
+
+        Returns:
+            完成時為快照編號的 Future
+
+        Raises:
+            RuntimeError: 儲存已關閉
+        """
+        args = (scanner_type, date, count, ascending, simulation, results, time.time())
+        with self._writer_lock:
+            if self._closed:
+                raise RuntimeError("歷史儲存已關閉")
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="scan-store"
+                )
+            future = self._writer.submit(self.save, *args)
+            self._pending += 1
+        future.add_done_callback(self._saved)
+        return future
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        等待已送出的背景寫入完成
+
+        Args:
+            timeout: 最長等待秒數，None 表示持續等待
+
+        Returns:
+            是否已全部完成
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                return True
+            marker = self._writer.submit(lambda: None)
+        try:
+            marker.result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def _saved(self, future: Future[int]) -> None:
+        """背景寫入完成"""
+        with self._writer_lock:
+            self._pending -= 1
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"寫入歷史儲存失敗: {future.exception()}")
+
+    def latest(
+        self,
+        scanner_type: str,
+        date: str,
+        count: int,
+        ascending: bool,
+        simulation: bool,
+        at: float | None = None,
+    ) -> StoredSnapshot | None:
+        """
+        取得足以回應請求的最新快照
+
+        Args:
+            scanner_type: 掃描器類型
+            date: 查詢日期
+            count: 查詢數量
+            ascending: 是否升序
+            simulation: 是否模擬模式
+            at: 只考慮此時間（epoch 秒）以前取得的快照
+
+        Returns:
+            StoredSnapshot，沒有時為 None
+        """
+        sql = (
+            "SELECT * FROM snapshots WHERE date = ? AND scanner_type = ? "
+            "AND ascending = ? AND simulation = ? "
+            "AND (count >= ? OR row_count < count)"
+        )
+        params: list[Any] = [date, scanner_type, ascending, simulation, count]
+        if at is not None:
+            sql += " AND fetched_at <= ?"
+            params.append(at)
+        sql += " ORDER BY fetched_at DESC LIMIT 1"
+
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return self._to_snapshot(row) if row is not None else None
+
+    def get(self, snapshot_id: int) -> StoredSnapshot | None:
+        """
+        依編號取得快照
+
+        Args:
+            snapshot_id: 快照編號
+
+        Returns:
+            StoredSnapshot，不存在時為 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM snapshots WHERE id = ?", (snapshot_id,)
+            ).fetchone()
+        return self._to_snapshot(row) if row is not None else None
+
+    def previous(self, snapshot: StoredSnapshot) -> StoredSnapshot | None:
+        """
+        取得同一天、同一掃描條件中前一次取得的快照
+
+        Args:
+            snapshot: 基準快照
+
+        Returns:
+            StoredSnapshot，沒有時為 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM snapshots WHERE date = ? AND scanner_type = ? "
+                "AND ascending = ? AND simulation = ? AND fetched_at < ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (
+                    snapshot.date,
+                    snapshot.scanner_type,
+                    snapshot.ascending,
+                    snapshot.simulation,
+                    snapshot.fetched_at,
+                ),
+            ).fetchone()
+        return self._to_snapshot(row) if row is not None else None
+
+    def load(self, snapshot_id: int, count: int | None = None) -> list[ScanRecord]:
+        """
+        讀取快照的資料列
+
+        Args:
+            snapshot_id: 快照編號
+            count: 只讀取前 count 筆
+
+        Returns:
+            依排名排序的 ScanRecord 列表
+        """
+        sql = "SELECT data FROM snapshot_rows WHERE snapshot_id = ? ORDER BY rank"
+        params: list[Any] = [snapshot_id]
+        if count is not None:
+            sql += " LIMIT ?"
+            params.append(count)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [ScanRecord(json.loads(row["data"])) for row in rows]
+
+    def snapshots(
+        self,
+        start_date: str,
+        end_date: str,
+        scanner_type: str | None = None,
+        ascending: bool | None = None,
+        simulation: bool | None = None,
+    ) -> list[StoredSnapshot]:
+        """
+        列出日期區間內的快照
+
+        Args:
+            start_date: 起始日期（含）
+            end_date: 結束日期（含）
+            scanner_type: 掃描器類型
+            ascending: 是否升序
+            simulation: 是否模擬模式
+
+        Returns:
+            依日期與取得時間排序的快照列表
+        """
+        where, params = self._filters(
+            start_date, end_date, scanner_type, ascending, simulation
+        )
+        sql = f"SELECT * FROM snapshots s WHERE {where} ORDER BY date, fetched_at"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._to_snapshot(row) for row in rows]
+
+    def query(
+        self,
+        start_date: str,
+        end_date: str,
+        scanner_type: str | None = None,
+        ascending: bool | None = None,
+        simulation: bool | None = None,
+        code: str | None = None,
+        latest_only: bool = True,
+        limit: int = 10000,
+    ) -> list[dict[str, Any]]:
+        """
+        查詢日期區間內的歷史排名
+
+        Args:
+            start_date: 起始日期（含）
+            end_date: 結束日期（含）
+            scanner_type: 掃描器類型
+            ascending: 是否升序
+            simulation: 是否模擬模式
+            code: 股票代號
+            latest_only: 每個日期與掃描條件只取最新一次快照
+            limit: 最多回傳筆數
+
+        Returns:
+            資料列表，每筆包含 snapshot_id、scanner_type、date、ascending、
+            fetched_at、rank 與 data（原始欄位）
+        """
+        where, params = self._filters(
+            start_date, end_date, scanner_type, ascending, simulation
+        )
+        if latest_only:
+            where += (
+                " AND s.fetched_at = (SELECT MAX(fetched_at) FROM snapshots l "
+                "WHERE l.date = s.date AND l.scanner_type = s.scanner_type "
+                "AND l.ascending = s.ascending AND l.simulation = s.simulation)"
+            )
+        if code is not None:
+            where += " AND r.code = ?"
+            params.append(code)
+
+        sql = (
+            "SELECT s.id AS snapshot_id, s.scanner_type, s.date, s.ascending, "
+            "s.simulation, s.fetched_at, r.rank, r.data "
+            "FROM snapshot_rows r JOIN snapshots s ON s.id = r.snapshot_id "
+            f"WHERE {where} ORDER BY s.date, s.scanner_type, s.ascending, r.rank "
+            "LIMIT ?"
+        )
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        return [
+            {
+                "snapshot_id": row["snapshot_id"],
+                "scanner_type": row["scanner_type"],
+                "date": row["date"],
+                "ascending": bool(row["ascending"]),
+                "simulation": bool(row["simulation"]),
+                "fetched_at": row["fetched_at"],
+                "rank": row["rank"],
+                "data": json.loads(row["data"]),
+            }
+            for row in rows
+        ]
+
+    def empty_scans(
+        self, final: Callable[[str, float], bool] = is_final
+    ) -> list[tuple[str, str, bool, bool]]:
+        """
+        列出收盤後確認查無資料的掃描條件
+
+        只有所有快照都沒有資料，且最後一次於收盤後取得的條件才列出（開盤前
+        取得的空結果不代表當日沒有資料）。
+
+        Args:
+            final: 判斷快照是否於收盤後取得的函式，參數為日期與取得時間
+
+        Returns:
+            (掃描器類型, 日期, 是否升序, 是否模擬模式) 列表
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT scanner_type, date, ascending, simulation, "
+                "MAX(fetched_at) AS fetched_at FROM snapshots "
+                "GROUP BY date, scanner_type, ascending, simulation "
+                "HAVING MAX(row_count) = 0"
+            ).fetchall()
+        return [
+            (
+                row["scanner_type"],
+                row["date"],
+                bool(row["ascending"]),
+                bool(row["simulation"]),
+            )
+            for row in rows
+            if final(row["date"], row["fetched_at"])
+        ]
+
+    def compact(
+        self,
+        before: str,
+        final: Callable[[str, float], bool] = is_final,
+    ) -> int:
+        """
+        精簡 before 以前日期的盤中快照
+
+        每個日期與掃描條件保留收盤後取得的最新快照（數量較少時另保留收盤後
+        數量最大的快照，仍可回應較大的請求）；沒有收盤後的快照時只保留最新
+        一筆。
+
+        Args:
+            before: 精簡此日期（不含）以前的快照
+            final: 判斷快照是否於收盤後取得的函式，參數為日期與取得時間
+
+        Returns:
+            刪除的快照數
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM snapshots WHERE date < ? ORDER BY fetched_at DESC",
+                (before,),
+            ).fetchall()
+
+        groups: dict[tuple[Any, ...], list[StoredSnapshot]] = defaultdict(list)
+        for row in rows:
+            snapshot = self._to_snapshot(row)
+            groups[
+                (
+                    snapshot.date,
+                    snapshot.scanner_type,
+                    snapshot.ascending,
+                    snapshot.simulation,
+                )
+            ].append(snapshot)
+
+        removed: list[int] = []
+        for snapshots in groups.values():
+            finals = [s for s in snapshots if final(s.date, s.fetched_at)]
+            if finals:
+                # max 取第一個最大值，即數量最大者中最新的一筆
+                keep = {finals[0].id, max(finals, key=lambda s: s.count).id}
+            else:
+                keep = {snapshots[0].id}
+            removed.extend(s.id for s in snapshots if s.id not in keep)
+
+        if removed:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "DELETE FROM snapshots WHERE id = ?", [(i,) for i in removed]
+                )
+            logger.info(f"已精簡 {before} 以前的快照，刪除 {len(removed)} 筆")
+        return len(removed)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        取得儲存統計
+
+        Returns:
+            快照數、資料列數與等待中的背景寫入數
+        """
+        with self._lock:
+            snapshots = self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()
+            rows = self._conn.execute("SELECT COUNT(*) FROM snapshot_rows").fetchone()
+        with self._writer_lock:
+            pending = self._pending
+        return {
+            "path": self.path,
+            "snapshots": snapshots[0],
+            "rows": rows[0],
+            "pending_writes": pending,
+        }
+
+    @staticmethod
+    def _filters(
+        start_date: str,
+        end_date: str,
+        scanner_type: str | None,
+        ascending: bool | None,
+        simulation: bool | None,
+    ) -> tuple[str, list[Any]]:
+        """組合快照的篩選條件"""
+        where = "s.date BETWEEN ? AND ?"
+        params: list[Any] = [start_date, end_date]
+        if scanner_type is not None:
+            where += " AND s.scanner_type = ?"
+            params.append(scanner_type)
+        if ascending is not None:
+            where += " AND s.ascending = ?"
+            params.append(ascending)
+        if simulation is not None:
+            where += " AND s.simulation = ?"
+            params.append(simulation)
+        return where, params
+
+    @staticmethod
+    def _to_snapshot(row: sqlite3.Row) -> StoredSnapshot:
+        """資料庫列轉換為 StoredSnapshot"""
+        return StoredSnapshot(
+            id=row["id"],
+            scanner_type=row["scanner_type"],
+            date=row["date"],
+            ascending=bool(row["ascending"]),
+            simulation=bool(row["simulation"]),
+            count=row["count"],
+            row_count=row["row_count"],
+            fetched_at=row["fetched_at"],
+        )
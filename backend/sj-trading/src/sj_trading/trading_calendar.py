@@ -0,0 +1,297 @@
+"""本地交易日曆模組"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from datetime import date as date_cls
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+NON_TRADING_INVALID = "invalid"
+NON_TRADING_FUTURE = "future"
+NON_TRADING_WEEKEND = "weekend"
+NON_TRADING_HOLIDAY = "holiday"
+
+# 收盤時間（含 14:00-14:30 盤後定價交易），之後取得的掃描結果不再變動
+MARKET_CLOSE = "14:30"
+# 台灣不實施日光節約時間，以固定時差計算
+TAIPEI = timezone(timedelta(hours=8), "Asia/Taipei")
+
+
+def taipei_today(now: float | None = None) -> date_cls:
+    """
+    取得台北時間的今日（不受伺服器時區影響）
+
+    Args:
+        now: 時間（epoch 秒），預設為現在
+
+    Returns:
+        台北時間的日期
+    """
+    return datetime.fromtimestamp(time.time() if now is None else now, TAIPEI).date()
+
+
+def check_date(day: str) -> str | None:
+    """
+    檢查日期格式與是否為未來日期（以台北時間判斷，不需日曆資料）
+
+    Args:
+        day: 日期（YYYY-MM-DD）
+
+    Returns:
+        invalid 或 future，可查詢時為 None
+    """
+    try:
+        parsed = date_cls.fromisoformat(day)
+    except ValueError:
+        return NON_TRADING_INVALID
+    if parsed > taipei_today():
+        return NON_TRADING_FUTURE
+    return None
+
+
+def market_close(day: str, close_time: str = MARKET_CLOSE) -> float:
+    """
+    取得交易日的收盤時間
+
+    Args:
+        day: 日期（YYYY-MM-DD）
+        close_time: 收盤時間（HH:MM，台北時間）
+
+    Returns:
+        收盤時間（epoch 秒）
+    """
+    hour, minute = (int(part) for part in close_time.split(":"))
+    parsed = date_cls.fromisoformat(day)
+    return datetime(
+        parsed.year, parsed.month, parsed.day, hour, minute, tzinfo=TAIPEI
+    ).timestamp()
+
+
+def is_final(day: str, fetched_at: float, close_time: str = MARKET_CLOSE) -> bool:
+    """
+    掃描結果是否為當日的最終結果（於收盤後取得）
+
+    Args:
+        day: 查詢日期（YYYY-MM-DD）
+        fetched_at: 取得時間（epoch 秒）
+        close_time: 收盤時間（HH:MM，台北時間）
+
+    Returns:
+        是否於收盤後取得
+    """
+    return fetched_at >= market_close(day, close_time)
+
+
+class TradingCalendar:
+    """
+    本地交易日曆
+
+    週末與休市日不是交易日；補班交易日（週末開市）可於檔案中以 + 前綴標示。
+    日曆檔為純文字，每行一個日期（YYYY-MM-DD），# 之後為註解，例如：
+
+        2026-01-01  # 元旦
+        +2026-02-07  # 補班交易日
+
+    檔案修改後會在下一次查詢時自動重新載入（最多每 reload_interval 秒檢查一次）。
+
+    Attributes:
+        path: 日曆檔路徑，None 表示只排除週末
+        reload_interval: 檢查檔案是否更新的間隔（秒）
+        close_time: 收盤時間（HH:MM，台北時間），之前取得的結果仍可能變動
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        holidays: Iterable[str] = (),
+        trading_days: Iterable[str] = (),
+        reload_interval: float = 60.0,
+        close_time: str = MARKET_CLOSE,
+    ):
+        """
+        初始化交易日曆
+
+        Args:
+            path: 日曆檔路徑
+            holidays: 額外的休市日
+            trading_days: 額外的補班交易日
+            reload_interval: 檢查檔案是否更新的間隔（秒）
+            close_time: 收盤時間（HH:MM，台北時間）
+
+        Raises:
+            ValueError: 收盤時間格式錯誤
+        """
+        market_close("2000-01-03", close_time)
+        self.path = path
+        self.reload_interval = reload_interval
+        self.close_time = close_time
+
+        self._holidays: set[str] = set(holidays)
+        self._trading_days: set[str] = set(trading_days)
+        self._file_holidays: set[str] = set()
+        self._file_trading_days: set[str] = set()
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+        if path:
+            self.reload()
+
+    def reload(self) -> bool:
+        """
+        重新載入日曆檔
+
+        Returns:
+            是否有載入（檔案不存在時為 False）
+
+        Raises:
+            ValueError: 檔案中有無效的日期
+        """
+        if not self.path or not os.path.exists(self.path):
+            if self.path:
+                logger.warning(f"找不到交易日曆檔 {self.path}，僅排除週末")
+            return False
+
+        holidays: set[str] = set()
+        trading_days: set[str] = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line_no, raw in enumerate(f, start=1):
+                line = raw.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                target = trading_days if line.startswith("+") else holidays
+                day = line.lstrip("+").strip()
+                try:
+                    date_cls.fromisoformat(day)
+                except ValueError as e:
+                    raise ValueError(
+                        f"{self.path} 第 {line_no} 行日期無效: {day}"
+                    ) from e
+                target.add(day)
+
+        with self._lock:
+            self._file_holidays = holidays
+            self._file_trading_days = trading_days
+            self._mtime = os.path.getmtime(self.path)
+            self._checked_at = time.monotonic()
+
+        logger.info(
+            f"載入交易日曆 {self.path}：休市日 {len(holidays)} 天，"
+            f"補班交易日 {len(trading_days)} 天"
+        )
+        return True
+
+    def add_holiday(self, day: str) -> None:
+        """
+        新增休市日
+
+        Args:
+            day: 日期（YYYY-MM-DD）
+        """
+        date_cls.fromisoformat(day)
+        with self._lock:
+            self._trading_days.discard(day)
+            self._holidays.add(day)
+
+    def add_trading_day(self, day: str) -> None:
+        """
+        新增補班交易日
+
+        Args:
+            day: 日期（YYYY-MM-DD）
+        """
+        date_cls.fromisoformat(day)
+        with self._lock:
+            self._holidays.discard(day)
+            self._trading_days.add(day)
+
+    def non_trading_reason(self, day: str) -> str | None:
+        """
+        判斷日期不是交易日的原因
+
+        Args:
+            day: 日期（YYYY-MM-DD）
+
+        Returns:
+            invalid、future、weekend 或 holiday，交易日為 None
+        """
+        error = check_date(day)
+        if error is not None:
+            return error
+
+        self._maybe_reload()
+        with self._lock:
+            if day in self._trading_days or day in self._file_trading_days:
+                return None
+            if day in self._holidays or day in self._file_holidays:
+                return NON_TRADING_HOLIDAY
+        if date_cls.fromisoformat(day).weekday() >= 5:
+            return NON_TRADING_WEEKEND
+        return None
+
+    def is_trading_day(self, day: str) -> bool:
+        """
+        是否為交易日
+
+        Args:
+            day: 日期（YYYY-MM-DD）
+
+        Returns:
+            是否為交易日
+        """
+        return self.non_trading_reason(day) is None
+
+    def is_final(self, day: str, fetched_at: float) -> bool:
+        """
+        掃描結果是否為當日的最終結果（於收盤後取得）
+
+        Args:
+            day: 查詢日期（YYYY-MM-DD）
+            fetched_at: 取得時間（epoch 秒）
+
+        Returns:
+            是否於收盤後取得
+        """
+        return is_final(day, fetched_at, self.close_time)
+
+    def trading_days(self, start_date: str, end_date: str) -> Iterator[str]:
+        """
+        逐日產生區間內的交易日
+
+        Args:
+            start_date: 起始日期（含）
+            end_date: 結束日期（含）
+
+        Yields:
+            日期字串
+        """
+        current = date_cls.fromisoformat(start_date)
+        end = date_cls.fromisoformat(end_date)
+        while current <= end:
+            day = current.isoformat()
+            if self.is_trading_day(day):
+                yield day
+            current += timedelta(days=1)
+
+    def _maybe_reload(self) -> None:
+        """日曆檔修改時重新載入"""
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            try:
+                self.reload()
+            except ValueError as e:
+                self._mtime = mtime
+                logger.warning(f"交易日曆重新載入失敗，沿用舊資料: {e}")
@@ -0,0 +1,26 @@
+"""測試共用的假後端與連線池"""
+
+from collections.abc import Iterator
+
+import pytest
+
+from sj_trading.fake import FAKE_CONFIG, FakeConfig, FakeShioaji
+from sj_trading.session_pool import SessionPool
+
+
+@pytest.fixture
+def fake_config() -> FakeConfig:
+    """沒有延遲、結果固定的假後端設定"""
+    return FakeConfig(latency=0.0, login_latency=0.0, usage_latency=0.0, seed=1)
+
+
+@pytest.fixture
+def pool(fake_config: FakeConfig) -> Iterator[SessionPool]:
+    """使用假後端的連線池（每個模式一個連線）"""
+    pool = SessionPool(
+        config=FAKE_CONFIG,
+        api_factory=FakeShioaji.factory(fake_config),
+        acquire_timeout=1.0,
+    )
+    yield pool
+    pool.close()
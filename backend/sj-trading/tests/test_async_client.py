@@ -0,0 +1,141 @@
+"""非同步客戶端測試"""
+
+import asyncio
+import time
+from typing import Any
+
+import pytest
+
+from sj_trading.async_client import AsyncShioajiClient
+from sj_trading.fake import FAKE_CONFIG, FakeConfig, FakeShioaji, FakeUpstreamError
+from sj_trading.ratelimit import RateLimitWaitTimeout, UpstreamLimiter
+from sj_trading.session_pool import SessionPool
+
+
+def make_pool(
+    config: FakeConfig, limiter: UpstreamLimiter | None = None
+) -> SessionPool:
+    return SessionPool(
+        config=FAKE_CONFIG,
+        api_factory=FakeShioaji.factory(config),
+        acquire_timeout=1.0,
+        limiter=limiter,
+    )
+
+
+def scan(pool: SessionPool, timeout: float | None = None, **kwargs: Any) -> Any:
+    """借出連線並以非同步客戶端執行一次掃描"""
+
+    async def run() -> Any:
+        with pool.acquire() as client:
+            return await AsyncShioajiClient(client).scanners(
+                "ChangePercentRank", "2026-10-16", timeout=timeout, **kwargs
+            )
+
+    return asyncio.run(run())
+
+
+def test_scanners_returns_callback_result(pool: SessionPool) -> None:
+    with pool.acquire() as client:
+        expected = client.scanners("ChangePercentRank", "2026-10-16", count=10)
+
+    results = scan(pool, count=10)
+
+    assert [r.code for r in results] == [r.code for r in expected]
+
+
+def test_send_error_propagates(fake_config: FakeConfig) -> None:
+    fake_config.failure_rate = 1.0
+    pool = make_pool(fake_config)
+    try:
+        with pytest.raises(FakeUpstreamError):
+            scan(pool)
+    finally:
+        pool.close()
+
+
+def test_callback_exception_sets_future_exception(pool: SessionPool) -> None:
+    async def run() -> Any:
+        with pool.acquire() as client:
+            return await AsyncShioajiClient(client)._call(
+                lambda cb, _: cb(FakeUpstreamError("回呼錯誤")), 1.0, "scanners"
+            )
+
+    with pytest.raises(FakeUpstreamError, match="回呼錯誤"):
+        asyncio.run(run())
+
+
+def test_times_out_without_callback(pool: SessionPool) -> None:
+    async def run() -> Any:
+        with pool.acquire() as client:
+            return await AsyncShioajiClient(client)._call(
+                lambda cb, _: None, 0.05, "scanners"
+            )
+
+    with pytest.raises(TimeoutError, match="scanners"):
+        asyncio.run(run())
+
+
+def test_get_usage_returns_none_on_error(pool: SessionPool) -> None:
+    def failing_usage(**kwargs: Any) -> None:
+        raise FakeUpstreamError("usage 失敗")
+
+    async def run() -> Any:
+        with pool.acquire() as client:
+            client.api.usage = failing_usage
+            return await AsyncShioajiClient(client).get_usage(timeout=1.0)
+
+    assert asyncio.run(run()) is None
+
+
+def test_callback_path_goes_through_limiter(fake_config: FakeConfig) -> None:
+    limiter = UpstreamLimiter({"scanners": (10.0, 1.0)})
+    pool = make_pool(fake_config, limiter)
+    try:
+        scan(pool)
+        start = time.monotonic()
+        scan(pool)
+        elapsed = time.monotonic() - start
+    finally:
+        pool.close()
+
+    assert limiter.stats()["scanners"]["queued"] == 1
+    assert elapsed >= 0.05
+
+
+def test_limiter_wait_counts_toward_timeout(fake_config: FakeConfig) -> None:
+    limiter = UpstreamLimiter({"scanners": (0.5, 1.0)})
+    pool = make_pool(fake_config, limiter)
+    try:
+        scan(pool)
+        with pytest.raises(RateLimitWaitTimeout):
+            scan(pool, timeout=0.05)
+    finally:
+        pool.close()
+
+
+def test_concurrent_calls_share_one_loop(fake_config: FakeConfig) -> None:
+    fake_config.latency = 0.2
+    fake_config.jitter = 0.0
+    pool = make_pool(fake_config)
+
+    async def run() -> list[Any]:
+        with pool.acquire() as client:
+            async_client = AsyncShioajiClient(client)
+            return await asyncio.gather(
+                *(
+                    async_client.scanners("ChangePercentRank", "2026-10-16")
+                    for _ in range(5)
+                )
+            )
+
+    try:
+        start = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - start
+    finally:
+        pool.close()
+
+    assert len(results) == 5
+    assert all(results)
+    assert elapsed < 0.2 * 5
@@ -0,0 +1,135 @@
+"""歷史回補測試"""
+
+import json
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from sj_trading.backfill import (
+    BackfillJob,
+    BackfillReport,
+    BackfillTask,
+    Checkpoint,
+    build_tasks,
+)
+from sj_trading.quota import DegradationPolicy, QuotaTracker
+from sj_trading.ratelimit import TokenBucket
+from sj_trading.session_pool import SessionPool
+from sj_trading.store import ScanStore
+from sj_trading.trading_calendar import TAIPEI
+
+DAY = "2026-10-16"
+INTRADAY = datetime(2026, 10, 16, 10, 0, tzinfo=TAIPEI).timestamp()
+AFTER_CLOSE = datetime(2026, 10, 16, 15, 0, tzinfo=TAIPEI).timestamp()
+ROWS = [{"code": "2330", "close": 1035.0}]
+
+# 剩餘流量永遠低於門檻的策略
+ALWAYS_CONSERVE = DegradationPolicy(conserve_below=101.0, critical_below=0.0)
+ALWAYS_CRITICAL = DegradationPolicy(conserve_below=101.0, critical_below=101.0)
+
+
+class RecordingBucket(TokenBucket):
+    """記錄每次取得的權杖數"""
+
+    def __init__(self) -> None:
+        super().__init__(rate=1000.0, capacity=10.0)
+        self.requests: list[float] = []
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        self.requests.append(tokens)
+        return super().acquire(tokens, timeout)
+
+
+@pytest.fixture
+def store() -> Iterator[ScanStore]:
+    """記憶體中的歷史儲存"""
+    store = ScanStore(":memory:")
+    yield store
+    store.close()
+
+
+def task(scanner_type: str = "VolumeRank") -> BackfillTask:
+    return BackfillTask(scanner_type, DAY, 10, False, True)
+
+
+def test_build_tasks_skips_weekends() -> None:
+    tasks = build_tasks(["VolumeRank"], "2026-10-15", "2026-10-18", orders=(True,))
+    assert [t.date for t in tasks] == ["2026-10-15", "2026-10-16"]
+    assert tasks[-1].key() == "VolumeRank:2026-10-16:100:asc:sim"
+
+
+def test_plan_skips_final_snapshots_and_checkpoint(
+    pool: SessionPool, store: ScanStore
+) -> None:
+    store.save("VolumeRank", DAY, 10, False, True, ROWS, fetched_at=AFTER_CLOSE)
+    store.save("AmountRank", DAY, 10, False, True, ROWS, fetched_at=INTRADAY)
+    checkpoint = Checkpoint(None)
+    checkpoint.mark(task("TickCountRank").key())
+    job = BackfillJob(pool, store, RecordingBucket(), checkpoint=checkpoint)
+    report = BackfillReport()
+
+    pending = job.plan(
+        [task("VolumeRank"), task("AmountRank"), task("TickCountRank")], report
+    )
+
+    # 盤中快照仍會變動，需要重新回補
+    assert pending == [task("AmountRank")]
+    assert report.skipped == 2
+
+
+def test_checkpoint_persists_completed_keys(tmp_path: Path) -> None:
+    path = tmp_path / "backfill.checkpoint.json"
+    checkpoint = Checkpoint(str(path))
+    checkpoint.mark("b")
+    checkpoint.mark("a")
+
+    assert json.loads(path.read_text(encoding="utf-8"))["completed"] == ["a", "b"]
+    assert not Path(f"{path}.tmp").exists()
+    reloaded = Checkpoint(str(path))
+    assert "a" in reloaded
+    assert "c" not in reloaded
+
+
+def test_run_completes_and_checkpoints_final_results(
+    pool: SessionPool, store: ScanStore, tmp_path: Path
+) -> None:
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    job = BackfillJob(pool, store, RecordingBucket(), workers=2, checkpoint=checkpoint)
+
+    report = job.run([task("VolumeRank"), task("AmountRank")])
+
+    assert report.completed == 2
+    assert report.failed == 0
+    assert report.rows == 20
+    assert report.stopped_reason is None
+    assert task("VolumeRank").key() in checkpoint
+    assert store.flush(timeout=1.0)
+    assert store.stats()["snapshots"] == 2
+
+
+def test_critical_quota_stops_job(pool: SessionPool, store: ScanStore) -> None:
+    quota = QuotaTracker(pool)
+    quota.refresh(True)
+    bucket = RecordingBucket()
+    job = BackfillJob(pool, store, bucket, quota=quota, policy=ALWAYS_CRITICAL)
+
+    report = job.run([task("VolumeRank"), task("AmountRank")])
+
+    assert report.completed == 0
+    assert report.stopped_reason == "流量等級 critical"
+    assert bucket.requests == []
+    assert store.stats()["snapshots"] == 0
+
+
+def test_conserve_quota_uses_double_tokens(pool: SessionPool, store: ScanStore) -> None:
+    quota = QuotaTracker(pool)
+    quota.refresh(True)
+    bucket = RecordingBucket()
+    job = BackfillJob(pool, store, bucket, quota=quota, policy=ALWAYS_CONSERVE)
+
+    report = job.run([task("VolumeRank")])
+
+    assert report.completed == 1
+    assert bucket.requests == [2.0]
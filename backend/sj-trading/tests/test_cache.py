@@ -0,0 +1,109 @@
+"""掃描結果快取與負向快取測試"""
+
+import time
+
+import pytest
+
+from sj_trading.cache import ScanCache
+from sj_trading.record import ScanRecord
+
+PAST = "2026-10-16"
+
+
+def records(n: int) -> list[ScanRecord]:
+    """建立 n 筆測試資料"""
+    return [ScanRecord({"code": f"{i:04d}", "close": 100.0 + i}) for i in range(n)]
+
+
+@pytest.fixture
+def today() -> str:
+    """今日日期（套用 TTL）"""
+    return time.strftime("%Y-%m-%d")
+
+
+def test_larger_entry_covers_smaller_count() -> None:
+    cache = ScanCache()
+    cache.put("ChangePercentRank", PAST, 10, False, True, records(10))
+
+    hit = cache.get("ChangePercentRank", PAST, 5, False, True)
+    assert hit is not None
+    assert [r["code"] for r in hit] == ["0000", "0001", "0002", "0003", "0004"]
+    assert cache.get("ChangePercentRank", PAST, 20, False, True) is None
+    assert cache.get("ChangePercentRank", PAST, 5, True, True) is None
+
+
+def test_short_result_covers_any_count() -> None:
+    """回傳筆數少於請求數量代表已取得全部資料"""
+    cache = ScanCache()
+    cache.put("VolumeRank", PAST, 10, False, True, records(3))
+    hit = cache.get("VolumeRank", PAST, 50, False, True)
+    assert hit is not None and len(hit) == 3
+
+
+def test_smaller_put_keeps_larger_entry() -> None:
+    cache = ScanCache()
+    cache.put("VolumeRank", PAST, 10, False, True, records(10))
+    cache.put("VolumeRank", PAST, 5, False, True, records(5))
+    assert cache.get("VolumeRank", PAST, 10, False, True) is not None
+
+
+def test_today_entries_expire(today: str) -> None:
+    cache = ScanCache(today_ttl=0.05)
+    cache.put("VolumeRank", today, 10, False, True, records(10))
+    assert cache.get("VolumeRank", today, 10, False, True) is not None
+
+    time.sleep(0.06)
+    assert cache.get("VolumeRank", today, 10, False, True) is None
+    hit = cache.get_entry("VolumeRank", today, 10, False, True, max_stale=None)
+    assert hit is not None and hit.stale
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_historical_entries_do_not_expire() -> None:
+    cache = ScanCache(today_ttl=0.0)
+    cache.put("VolumeRank", PAST, 10, False, True, records(10))
+    hit = cache.get_entry("VolumeRank", PAST, 10, False, True)
+    assert hit is not None and not hit.stale
+
+
+def test_lru_eviction() -> None:
+    cache = ScanCache(max_entries=2)
+    cache.put("A", PAST, 1, False, True, records(1))
+    cache.put("B", PAST, 1, False, True, records(1))
+    cache.get("A", PAST, 1, False, True)
+    cache.put("C", PAST, 1, False, True, records(1))
+
+    assert cache.get("B", PAST, 1, False, True) is None
+    assert cache.get("A", PAST, 1, False, True) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_negative_cache_is_keyed_by_scan() -> None:
+    """某個掃描條件查無資料不影響同一天的其他掃描"""
+    cache = ScanCache()
+    cache.mark_empty("VolumeRank", PAST, False, True, final=True)
+
+    assert cache.is_empty("VolumeRank", PAST, False, True)
+    assert not cache.is_empty("VolumeRank", PAST, True, True)
+    assert not cache.is_empty("ChangePercentRank", PAST, False, True)
+    assert not cache.is_empty("VolumeRank", PAST, False, False)
+    assert cache.stats()["empty_hits"] == 1
+
+
+def test_non_final_empty_scan_expires() -> None:
+    """收盤前記錄的查無資料（例如開盤前）套用當日 TTL"""
+    cache = ScanCache(today_ttl=0.05)
+    cache.mark_empty("VolumeRank", PAST, False, True)
+    assert cache.is_empty("VolumeRank", PAST, False, True)
+
+    time.sleep(0.06)
+    assert not cache.is_empty("VolumeRank", PAST, False, True)
+    assert cache.stats()["empty_scans"] == 0
+
+
+def test_final_empty_scan_does_not_expire() -> None:
+    cache = ScanCache(today_ttl=0.0)
+    cache.mark_empty("VolumeRank", PAST, False, True, final=True)
+    assert cache.is_empty("VolumeRank", PAST, False, True)
+    cache.clear()
+    assert not cache.is_empty("VolumeRank", PAST, False, True)
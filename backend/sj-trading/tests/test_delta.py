@@ -0,0 +1,79 @@
+"""排名變化測試"""
+
+from sj_trading.delta import rank_delta
+
+BEFORE = [
+    {"code": "2330", "name": "台積電", "rank_value": 5.0},
+    {"code": "2317", "name": "鴻海", "rank_value": 4.0},
+    {"code": "2454", "name": "聯發科", "rank_value": 3.0},
+    {"code": "2412", "name": "中華電", "rank_value": 2.0},
+]
+AFTER = [
+    {"code": "2454", "name": "聯發科", "rank_value": 6.5},
+    {"code": "2317", "name": "鴻海", "rank_value": 4.0},
+    {"code": "2330", "name": "台積電", "rank_value": 3.0},
+    {"code": "3008", "name": "大立光", "rank_value": 1.0},
+]
+
+
+def test_entered_left_and_moved() -> None:
+    delta = rank_delta(BEFORE, AFTER)
+
+    assert delta["entered"] == [
+        {"code": "3008", "name": "大立光", "rank": 4, "value": 1.0}
+    ]
+    assert delta["left"] == [
+        {"code": "2412", "name": "中華電", "rank": 4, "value": 2.0}
+    ]
+    assert delta["unchanged"] == 1
+    assert [item["code"] for item in delta["moved"]] == ["2454", "2330"]
+    assert delta["moved"][0] == {
+        "code": "2454",
+        "name": "聯發科",
+        "rank_before": 3,
+        "rank_after": 1,
+        "rank_change": 2,
+        "value_before": 3.0,
+        "value_after": 6.5,
+        "value_change": 3.5,
+    }
+    assert delta["moved"][1]["rank_change"] == -2
+
+
+def test_value_change_requires_numbers() -> None:
+    before = [{"code": "2330", "close": "N/A"}, {"code": "2317", "close": 1.0}]
+    after = [{"code": "2317", "close": 2.0}, {"code": "2330", "close": 3.0}]
+
+    moved = rank_delta(before, after, value_field="close")["moved"]
+    assert {item["code"]: item["value_change"] for item in moved} == {
+        "2317": 1.0,
+        "2330": None,
+    }
+
+
+def test_rows_without_code_are_skipped() -> None:
+    before = [{"name": "沒有代號"}, {"code": "2330"}, {"code": None}]
+    after = [{"code": "2330"}, {"name": "沒有代號"}]
+
+    delta = rank_delta(before, after)
+
+    assert delta["entered"] == []
+    assert delta["left"] == []
+    assert delta["moved"][0]["rank_before"] == 2
+    assert delta["moved"][0]["rank_after"] == 1
+
+
+def test_duplicate_codes_use_first_rank() -> None:
+    before = [{"code": "2330"}, {"code": "2330"}, {"code": "2317"}]
+    after = [{"code": "2330"}, {"code": "2330"}]
+
+    delta = rank_delta(before, after)
+
+    assert delta["unchanged"] == 1
+    assert delta["moved"] == []
+    assert [item["code"] for item in delta["left"]] == ["2317"]
+
+
+def test_identical_results() -> None:
+    delta = rank_delta(BEFORE, BEFORE)
+    assert delta == {"entered": [], "left": [], "moved": [], "unchanged": 4}
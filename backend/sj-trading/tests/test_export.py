@@ -0,0 +1,93 @@
+"""匯出格式測試"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sj_trading.export import EXPORT_SCHEMA, iter_ndjson, save_export
+from sj_trading.record import RECORD_FIELDS, STOCK_FIELDS, ScanRecord
+from sj_trading.scanner import generate_csv
+
+ROWS: list[dict[str, Any]] = [
+    {
+        "code": "2330",
+        "name": "台積電",
+        "date": "2026-10-16",
+        "close": 1035.0,
+        "volume": 52_000,
+        "ts": 1_760_598_000_000_000_000,
+        "tick_type": 1,
+    },
+    {"code": "2317", "name": "鴻海", "close": 211.5, "volume": 48_000.0},
+]
+
+
+def test_schema_follows_stock_fields() -> None:
+    assert [name for name, _ in EXPORT_SCHEMA] == [name for name, _ in STOCK_FIELDS]
+    assert RECORD_FIELDS[: len(STOCK_FIELDS)] == tuple(n for n, _ in STOCK_FIELDS)
+    assert dict(EXPORT_SCHEMA)["volume"] == "int64"
+    assert dict(EXPORT_SCHEMA)["close"] == "float64"
+
+
+def test_csv_has_bom_header_and_rows() -> None:
+    content = generate_csv([ScanRecord(row) for row in ROWS[:1]])
+    lines = content.splitlines()
+    assert lines[0].startswith("\ufeffcode,name,date")
+    assert lines[1].startswith("2330,台積電,2026-10-16")
+
+
+def test_ndjson_one_object_per_line() -> None:
+    lines = list(iter_ndjson(ROWS))
+    assert len(lines) == 2
+    assert all(line.endswith("\n") for line in lines)
+    assert json.loads(lines[0]) == ROWS[0]
+    assert "台積電" in lines[0]
+
+
+def test_arrow_table_uses_fixed_schema_then_extras() -> None:
+    pytest.importorskip("pyarrow")
+    from sj_trading.export import to_arrow_table
+
+    table = to_arrow_table(ROWS)
+
+    names = [name for name, _ in EXPORT_SCHEMA]
+    assert table.column_names == [*names, "tick_type"]
+    assert str(table.schema.field("volume").type) == "int64"
+    assert table.column("volume").to_pylist() == [52_000, 48_000]
+    assert table.column("open").to_pylist() == [None, None]
+    assert table.column("tick_type").to_pylist() == [1, None]
+
+
+def test_arrow_refuses_to_truncate_floats() -> None:
+    pytest.importorskip("pyarrow")
+    from sj_trading.export import to_arrow_table
+
+    with pytest.raises(ValueError, match="volume"):
+        to_arrow_table([{"code": "2330", "volume": 1.5}])
+
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet"])
+def test_binary_formats_round_trip(tmp_path: Path, export_format: str) -> None:
+    pa = pytest.importorskip("pyarrow")
+    filename = tmp_path / f"scan.{export_format}"
+
+    save_export(ROWS, str(filename), export_format)
+
+    if export_format == "arrow":
+        with pa.memory_map(str(filename)) as source:
+            table = pa.ipc.open_file(source).read_all()
+    else:
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(filename)
+    rows = table.to_pylist()
+    assert [row["code"] for row in rows] == ["2330", "2317"]
+    assert rows[1]["volume"] == 48_000
+    assert rows[0]["ts"] == ROWS[0]["ts"]
+
+
+def test_save_export_rejects_unknown_format(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="xlsx"):
+        save_export(ROWS, str(tmp_path / "scan.xlsx"), "xlsx")
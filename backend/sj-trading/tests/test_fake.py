@@ -0,0 +1,79 @@
+"""模擬後端測試"""
+
+import threading
+from typing import Any
+
+import pytest
+
+from sj_trading.fake import FakeConfig, FakeShioaji, FakeUpstreamError
+from sj_trading.record import RECORD_FIELDS, ScanRecord
+
+DAY = "2026-10-16"
+
+
+def codes(items: list[Any]) -> list[str]:
+    return [item.code for item in items]
+
+
+def test_results_depend_only_on_parameters(fake_config: FakeConfig) -> None:
+    create = FakeShioaji.factory(fake_config)
+    first = create().scanners("VolumeRank", date=DAY, count=20)
+    again = create().scanners("VolumeRank", date=DAY, count=20)
+    other = create().scanners("AmountRank", date=DAY, count=20)
+
+    assert codes(first) == codes(again)
+    assert [item.close for item in first] == [item.close for item in again]
+    assert [item.close for item in first] != [item.close for item in other]
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+def test_results_sorted_by_rank_value(fake_config: FakeConfig, ascending: bool) -> None:
+    items = FakeShioaji(config=fake_config).scanners(
+        "ChangePercentRank", ascending=ascending, date=DAY, count=50
+    )
+    values = [item.rank_value for item in items]
+    assert values == sorted(values, reverse=not ascending)
+
+
+def test_items_have_shioaji_fields(fake_config: FakeConfig) -> None:
+    item = FakeShioaji(config=fake_config).scanners("VolumeRank", date=DAY, count=1)[0]
+    record = ScanRecord.from_scanner(item)
+    # Shioaji ScannerItem 沒有 StockData 宣告的 change_percent 欄位
+    assert set(record) == set(RECORD_FIELDS) - {"change_percent"}
+    assert record.extra == {}
+    assert record["date"] == DAY
+
+
+def test_meter_is_shared_and_reported_by_usage(fake_config: FakeConfig) -> None:
+    fake_config.max_rows = 30
+    create = FakeShioaji.factory(fake_config)
+    create().scanners("VolumeRank", date=DAY, count=100)
+    api = create(simulation=False)
+    api.scanners("VolumeRank", date=DAY, count=10)
+
+    status = api.usage()
+    assert status.bytes == (30 + 10) * fake_config.bytes_per_row
+    assert status.remaining_bytes == fake_config.limit_bytes - status.bytes
+    assert api.meter.scanner_calls == 2
+
+
+def test_failure_rate(fake_config: FakeConfig) -> None:
+    fake_config.failure_rate = 1.0
+    api = FakeShioaji(config=fake_config)
+    with pytest.raises(FakeUpstreamError):
+        api.scanners("VolumeRank", date=DAY)
+    assert api.meter.scanner_calls == 0
+
+
+def test_callback_mode_returns_none_and_calls_back(fake_config: FakeConfig) -> None:
+    received: list[Any] = []
+    done = threading.Event()
+
+    def callback(items: list[Any]) -> None:
+        received.extend(items)
+        done.set()
+
+    api = FakeShioaji(config=fake_config)
+    assert api.scanners("VolumeRank", date=DAY, count=5, cb=callback) is None
+    assert done.wait(1.0)
+    assert len(received) == 5
@@ -0,0 +1,85 @@
+"""排名合併測試"""
+
+import pytest
+
+from sj_trading.join import JOIN_DIFFERENCE, JOIN_UNION, join_rankings
+
+VOLUME = [
+    {"code": "2330", "name": "台積電", "rank_value": 90.0},
+    {"code": "2317", "name": "鴻海", "rank_value": 80.0},
+    {"code": "2454", "name": "聯發科", "rank_value": 70.0},
+]
+AMOUNT = [
+    {"code": "2454", "name": "聯發科", "rank_value": 9.0},
+    {"code": "3008", "name": "大立光", "rank_value": 8.0},
+    {"code": "2330", "name": "台積電", "rank_value": 7.0},
+]
+RANKINGS = {"VolumeRank": VOLUME, "AmountRank": AMOUNT}
+
+
+def test_intersect_keeps_first_ranking_order() -> None:
+    assert join_rankings(RANKINGS) == [
+        {
+            "code": "2330",
+            "name": "台積電",
+            "VolumeRank_rank": 1,
+            "VolumeRank_value": 90.0,
+            "AmountRank_rank": 3,
+            "AmountRank_value": 7.0,
+        },
+        {
+            "code": "2454",
+            "name": "聯發科",
+            "VolumeRank_rank": 3,
+            "VolumeRank_value": 70.0,
+            "AmountRank_rank": 1,
+            "AmountRank_value": 9.0,
+        },
+    ]
+
+
+def test_union_appends_codes_only_in_other_rankings() -> None:
+    merged = join_rankings(RANKINGS, JOIN_UNION)
+
+    assert [row["code"] for row in merged] == ["2330", "2317", "2454", "3008"]
+    assert merged[1]["AmountRank_rank"] is None
+    assert merged[3]["VolumeRank_rank"] is None
+    assert merged[3]["name"] == "大立光"
+
+
+def test_difference_keeps_codes_only_in_first_ranking() -> None:
+    merged = join_rankings(RANKINGS, JOIN_DIFFERENCE, value_field="name")
+    assert merged == [
+        {
+            "code": "2317",
+            "name": "鴻海",
+            "VolumeRank_rank": 2,
+            "VolumeRank_value": "鴻海",
+            "AmountRank_rank": None,
+            "AmountRank_value": None,
+        }
+    ]
+
+
+def test_rows_without_code_keep_rank_position() -> None:
+    rankings = {
+        "VolumeRank": [{"name": "沒有代號"}, {"code": "2330"}, {"code": "2330"}],
+        "AmountRank": [{"code": None}, {"code": "2330"}],
+    }
+    merged = join_rankings(rankings, JOIN_UNION)
+    assert merged == [
+        {
+            "code": "2330",
+            "name": None,
+            "VolumeRank_rank": 2,
+            "VolumeRank_value": None,
+            "AmountRank_rank": 2,
+            "AmountRank_value": None,
+        }
+    ]
+
+
+@pytest.mark.parametrize(("rankings", "how"), [(RANKINGS, "outer"), ({}, "intersect")])
+def test_invalid_arguments(rankings: dict, how: str) -> None:
+    with pytest.raises(ValueError):
+        join_rankings(rankings, how)
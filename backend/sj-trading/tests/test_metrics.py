@@ -0,0 +1,90 @@
+"""效能指標測試"""
+
+import pytest
+
+from sj_trading.metrics import (
+    ERRORS,
+    SCAN_STAGE_SECONDS,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    track_stage,
+)
+
+
+def test_counter_renders_sorted_labels() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("sj_test_total", "測試計數", ["endpoint"])
+    counter.inc(endpoint="usage")
+    counter.inc(2, endpoint="scanners")
+    counter.inc(0.5, endpoint="scanners")
+
+    assert registry.render() == (
+        "# HELP sj_test_total 測試計數\n"
+        "# TYPE sj_test_total counter\n"
+        'sj_test_total{endpoint="scanners"} 2.5\n'
+        'sj_test_total{endpoint="usage"} 1\n'
+    )
+
+
+def test_counter_rejects_negative_and_wrong_labels() -> None:
+    counter = Counter("sj_test_total", "測試計數", ["endpoint"])
+    with pytest.raises(ValueError):
+        counter.inc(-1, endpoint="usage")
+    with pytest.raises(ValueError):
+        counter.inc(stage="usage")
+
+
+def test_label_values_are_escaped() -> None:
+    gauge = Gauge("sj_test", "測試", ["path"])
+    gauge.set(1, path='a"b\\c\nd')
+    assert gauge.render()[-1] == 'sj_test{path="a\\"b\\\\c\\nd"} 1'
+
+
+def test_gauge_tracks_in_progress() -> None:
+    gauge = Gauge("sj_test_in_flight", "進行中")
+    with gauge.track_inprogress():
+        assert gauge.value() == 1
+    assert gauge.value() == 0
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    histogram = Histogram("sj_test_seconds", "耗時", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, stage="scan")
+
+    assert histogram.render()[2:] == [
+        'sj_test_seconds_bucket{stage="scan",le="0.1"} 2',
+        'sj_test_seconds_bucket{stage="scan",le="1"} 3',
+        'sj_test_seconds_bucket{stage="scan",le="+Inf"} 4',
+        'sj_test_seconds_sum{stage="scan"} 2.65',
+        'sj_test_seconds_count{stage="scan"} 4',
+    ]
+    assert histogram.count(stage="scan") == 4
+
+
+def test_registry_reuses_metrics_and_runs_collectors() -> None:
+    registry = MetricsRegistry()
+    gauge = registry.gauge("sj_test_size", "大小")
+    assert registry.gauge("sj_test_size", "大小") is gauge
+    with pytest.raises(ValueError):
+        registry.counter("sj_test_size", "大小")
+
+    def collect() -> None:
+        gauge.set(42)
+
+    registry.add_collector(collect)
+    assert "sj_test_size 42\n" in registry.render()
+    registry.remove_collector(collect)
+    gauge.set(0)
+    assert "sj_test_size 0\n" in registry.render()
+
+
+def test_track_stage_records_errors() -> None:
+    before = SCAN_STAGE_SECONDS.count(stage="test_stage")
+    with pytest.raises(KeyError), track_stage("test_stage"):
+        raise KeyError("code")
+
+    assert SCAN_STAGE_SECONDS.count(stage="test_stage") == before + 1
+    assert ERRORS.value(stage="test_stage", type="KeyError") >= 1
@@ -0,0 +1,78 @@
+"""流量配額追蹤與降級策略測試"""
+
+import pytest
+
+from sj_trading.quota import (
+    QUOTA_CONSERVE,
+    QUOTA_CRITICAL,
+    QUOTA_EXHAUSTED,
+    QUOTA_NORMAL,
+    DegradationPolicy,
+    QuotaTracker,
+    make_usage_data,
+)
+from sj_trading.session_pool import SessionPool
+
+DAY = "2026-10-16"
+
+
+def test_tracker_estimates_between_refreshes(pool: SessionPool) -> None:
+    """兩次查詢之間依每筆資料的估算值累計用量，不呼叫 usage()"""
+    tracker = QuotaTracker(pool, bytes_per_row=100.0)
+    assert tracker.usage(True) is None
+
+    tracker.refresh(True)
+    before = tracker.usage(True)
+    assert before is not None and before["estimated_bytes"] == 0
+
+    tracker.record_scan(True, 10)
+    after = tracker.usage(True)
+    assert after is not None
+    assert after["estimated_bytes"] == 1000
+    assert after["bytes_used"] == before["bytes_used"] + 1000
+
+
+def test_refresh_calibrates_bytes_per_row(pool: SessionPool) -> None:
+    """以實際增加的位元組校正每筆資料的估算值（假後端每筆 300 bytes）"""
+    tracker = QuotaTracker(pool, bytes_per_row=100.0)
+    tracker.refresh(True)
+    with pool.acquire() as client:
+        rows = client.scanners("VolumeRank", DAY, count=10)
+    tracker.record_scan(True, len(rows))
+
+    usage = tracker.refresh(True)
+    assert usage is not None and usage["estimated_bytes"] == 0
+    assert tracker.bytes_per_row == pytest.approx(0.7 * 100 + 0.3 * 300)
+
+
+def test_modes_are_tracked_separately(pool: SessionPool) -> None:
+    tracker = QuotaTracker(pool)
+    tracker.refresh(True)
+    assert tracker.usage(True) is not None
+    assert tracker.usage(False) is None
+
+
+@pytest.mark.parametrize(
+    ("bytes_used", "level"),
+    [
+        (0, QUOTA_NORMAL),
+        (750, QUOTA_CONSERVE),
+        (950, QUOTA_CRITICAL),
+        (1000, QUOTA_EXHAUSTED),
+    ],
+)
+def test_level_follows_remaining_quota(bytes_used: int, level: str) -> None:
+    policy = DegradationPolicy()
+    assert policy.level(make_usage_data(bytes_used, 1000)) == level
+
+
+def test_unknown_usage_is_normal() -> None:
+    assert DegradationPolicy().level(None) == QUOTA_NORMAL
+
+
+def test_max_stale_grows_with_level() -> None:
+    policy = DegradationPolicy(conserve_ttl_factor=5.0)
+    assert policy.max_stale(QUOTA_NORMAL, 60.0) == 0.0
+    assert policy.max_stale(QUOTA_CONSERVE, 60.0) == 240.0
+    assert policy.max_stale(QUOTA_CRITICAL, 60.0) is None
+    assert policy.max_stale(QUOTA_EXHAUSTED, 60.0) is None
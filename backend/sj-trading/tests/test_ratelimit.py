@@ -0,0 +1,147 @@
+"""速率限制與公平佇列測試"""
+
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from sj_trading.api_client import ShioajiClient
+from sj_trading.fake import FAKE_CONFIG, FakeConfig, FakeShioaji
+from sj_trading.ratelimit import (
+    PRIORITY_BACKFILL,
+    PRIORITY_INTERACTIVE,
+    RateLimitWaitTimeout,
+    TokenBucket,
+    UpstreamLimiter,
+    current_priority,
+    upstream_priority,
+)
+
+
+def run_queued(
+    limiter: UpstreamLimiter, requests: list[tuple[str, str, str]]
+) -> list[str]:
+    """
+    依序送出排隊請求，回傳取得額度的順序
+
+    Args:
+        limiter: 已用完額度的限制器
+        requests: (名稱, 優先順序, 呼叫者)
+    """
+    order: list[str] = []
+
+    def call(name: str, priority: str, caller: str) -> None:
+        with upstream_priority(priority, caller):
+            limiter.acquire("scanners", timeout=5.0)
+        order.append(name)
+
+    threads = []
+    for request in requests:
+        thread = threading.Thread(target=call, args=request)
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_bucket_allows_burst_then_waits() -> None:
+    bucket = TokenBucket(rate=20.0, capacity=2.0)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0 < bucket.wait_time() <= 0.05
+
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1.0)
+    assert time.monotonic() - start >= 0.03
+
+
+def test_bucket_acquire_times_out() -> None:
+    bucket = TokenBucket(rate=1.0, capacity=1.0)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.01)
+    with pytest.raises(ValueError):
+        bucket.acquire(tokens=2.0)
+
+
+def test_unknown_endpoint_is_not_limited() -> None:
+    limiter = UpstreamLimiter({"scanners": (1.0, 1.0)})
+    assert limiter.acquire("other") == 0.0
+
+
+def test_priority_is_scoped_to_context() -> None:
+    assert current_priority() == PRIORITY_INTERACTIVE
+    with upstream_priority(PRIORITY_BACKFILL):
+        assert current_priority() == PRIORITY_BACKFILL
+    assert current_priority() == PRIORITY_INTERACTIVE
+    with pytest.raises(ValueError), upstream_priority("urgent"):
+        pass
+
+
+def test_interactive_served_before_backfill() -> None:
+    limiter = UpstreamLimiter({"scanners": (20.0, 1.0)})
+    limiter.acquire("scanners")
+
+    order = run_queued(
+        limiter,
+        [
+            ("backfill-1", PRIORITY_BACKFILL, "job"),
+            ("backfill-2", PRIORITY_BACKFILL, "job"),
+            ("interactive", PRIORITY_INTERACTIVE, "user"),
+        ],
+    )
+    assert order.index("interactive") < order.index("backfill-2")
+
+
+def test_callers_take_turns() -> None:
+    """同一優先順序內，單一呼叫者的大量請求不會排在其他呼叫者前面"""
+    limiter = UpstreamLimiter({"scanners": (20.0, 1.0)})
+    limiter.acquire("scanners")
+
+    order = run_queued(
+        limiter,
+        [
+            ("a-1", PRIORITY_INTERACTIVE, "a"),
+            ("a-2", PRIORITY_INTERACTIVE, "a"),
+            ("a-3", PRIORITY_INTERACTIVE, "a"),
+            ("b-1", PRIORITY_INTERACTIVE, "b"),
+        ],
+    )
+    assert order.index("b-1") < order.index("a-3")
+    assert limiter.stats()["scanners"]["queued"] == 4
+
+
+def test_wait_timeout_leaves_queue() -> None:
+    limiter = UpstreamLimiter({"scanners": (1.0, 1.0)})
+    limiter.acquire("scanners")
+
+    with pytest.raises(RateLimitWaitTimeout):
+        limiter.acquire("scanners", timeout=0.05)
+    assert limiter.stats()["scanners"]["waiting"] == 0
+
+
+def test_client_passes_remaining_timeout(fake_config: FakeConfig) -> None:
+    """排隊等待的時間從傳給上游的逾時時間扣除"""
+    limiter = UpstreamLimiter({"scanners": (10.0, 1.0)})
+    client = ShioajiClient(
+        api_factory=FakeShioaji.factory(fake_config),
+        config=FAKE_CONFIG,
+        limiter=limiter,
+    )
+    client.login()
+    timeouts: list[int] = []
+    scanners = client.api.scanners
+
+    def record(**kwargs: Any) -> Any:
+        timeouts.append(kwargs["timeout"])
+        return scanners(**kwargs)
+
+    client.api.scanners = record
+    client.scanners("ChangePercentRank", "2026-10-16", timeout=5000)
+    client.scanners("ChangePercentRank", "2026-10-16", timeout=5000)
+
+    assert timeouts[0] == 5000
+    assert 1 <= timeouts[1] <= 5000 - 50
@@ -0,0 +1,64 @@
+"""掃描結果資料列測試"""
+
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from sj_trading.record import RECORD_FIELDS, ScanRecord
+
+VALUES = {"close": 1035.0, "code": "2330", "open": None, "custom": "x"}
+
+
+def test_mapping_interface() -> None:
+    record = ScanRecord(VALUES)
+
+    assert record["code"] == "2330"
+    assert record["open"] is None
+    assert record["custom"] == "x"
+    assert len(record) == 4
+    assert record == VALUES
+    assert record.get("high") is None
+    assert "open" in record
+    assert "high" not in record
+    assert "other" not in record
+
+
+def test_known_fields_first_in_record_order() -> None:
+    record = ScanRecord(VALUES)
+    assert list(record) == ["code", "open", "close", "custom"]
+    assert list(record)[:3] == [f for f in RECORD_FIELDS if f in record]
+
+
+@pytest.mark.parametrize("key", ["high", "other"])
+def test_missing_keys_raise_key_error(key: str) -> None:
+    with pytest.raises(KeyError):
+        ScanRecord({"code": "2330"})[key]
+
+
+def test_extra_fields() -> None:
+    assert ScanRecord(VALUES).extra == {"custom": "x"}
+    assert ScanRecord({"code": "2330"}).extra == {}
+
+
+def test_record_is_read_only() -> None:
+    record = ScanRecord(VALUES)
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.code = "2317"  # type: ignore[misc]
+    with pytest.raises(AttributeError):
+        record.anything = 1  # type: ignore[attr-defined]
+
+
+def test_pickle_round_trip() -> None:
+    record = ScanRecord(VALUES)
+    restored = pickle.loads(pickle.dumps(record))
+    assert isinstance(restored, ScanRecord)
+    assert restored.to_dict() == record.to_dict()
+
+
+def test_from_scanner_reads_attributes() -> None:
+    scanner = SimpleNamespace(code="2330", close=1035.0, tick_type=1)
+    record = ScanRecord.from_scanner(scanner)
+    assert record.to_dict() == {"code": "2330", "close": 1035.0, "tick_type": 1}
+    assert repr(record).startswith("ScanRecord({'code': '2330'")
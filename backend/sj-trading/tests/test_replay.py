@@ -0,0 +1,150 @@
+"""上游流量錄製與重播測試"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sj_trading.fake import FakeConfig, FakeShioaji, FakeUpstreamError
+from sj_trading.replay import (
+    OP_SCANNERS,
+    ReplayedError,
+    ReplayLog,
+    ReplayMissError,
+    ScanRecorder,
+    recording_factory,
+)
+from sj_trading.resilience import RetryPolicy
+
+DAY = "2026-10-16"
+
+
+def record_calls(
+    path: Path, fake_config: FakeConfig, errors: list[Exception] | None = None
+) -> list[Any]:
+    """錄製兩次掃描、一次 usage() 與指定的失敗呼叫，回傳第一次掃描結果"""
+    recorder = ScanRecorder(path)
+    api = recording_factory(recorder, FakeShioaji.factory(fake_config))()
+    first = api.scanners("VolumeRank", ascending=False, date=DAY, count=10)
+    api.scanners("VolumeRank", ascending=False, date=DAY, count=10)
+    api.usage()
+    for error in errors or []:
+        started = recorder.elapsed()
+        args = {"scanner_type": type(error).__name__, "date": DAY, "ascending": True}
+        recorder.record(OP_SCANNERS, True, args, started, error=error)
+    recorder.close()
+    return first
+
+
+def scan_args(scanner_type: str) -> dict[str, Any]:
+    return {"scanner_type": scanner_type, "date": DAY, "ascending": True}
+
+
+def test_round_trip(tmp_path: Path, fake_config: FakeConfig) -> None:
+    path = tmp_path / "calls.ndjson.gz"
+    recorded = record_calls(path, fake_config)
+
+    log = ReplayLog(path)
+    api = log.factory(speed=0)()
+    replayed = api.scanners("VolumeRank", ascending=False, date=DAY, count=10)
+
+    assert [item.__dict__ for item in replayed] == [item.__dict__ for item in recorded]
+    assert len(log.scans()) == 2
+    assert api.usage().bytes == 20 * fake_config.bytes_per_row
+    # 要求的筆數較少時截斷結果
+    assert len(api.scanners("VolumeRank", ascending=False, date=DAY, count=3)) == 3
+
+
+def test_matching_calls_repeat_last_entry(
+    tmp_path: Path, fake_config: FakeConfig
+) -> None:
+    path = tmp_path / "calls.ndjson.gz"
+    record_calls(path, fake_config)
+    log = ReplayLog(path)
+
+    entries = [
+        log.next(OP_SCANNERS, True, {"scanner_type": "VolumeRank", "date": DAY})
+        for _ in range(3)
+    ]
+    assert entries[0] is not entries[1]
+    assert entries[2] is entries[1]
+
+    log.reset()
+    assert (
+        log.next(OP_SCANNERS, True, {"scanner_type": "VolumeRank", "date": DAY})
+        is (entries[0])
+    )
+
+
+def test_miss_raises(tmp_path: Path, fake_config: FakeConfig) -> None:
+    path = tmp_path / "calls.ndjson.gz"
+    record_calls(path, fake_config)
+    api = ReplayLog(path).factory(speed=0)(simulation=False)
+
+    with pytest.raises(ReplayMissError):
+        api.scanners("VolumeRank", ascending=False, date=DAY)
+    with pytest.raises(ReplayMissError):
+        api.usage()
+
+
+@pytest.mark.parametrize(
+    ("error", "base", "retryable"),
+    [
+        (FakeUpstreamError("上游失敗"), RuntimeError, True),
+        (TimeoutError("上游逾時"), TimeoutError, False),
+        (ValueError("參數錯誤"), ValueError, False),
+    ],
+)
+def test_errors_keep_class_and_retryability(
+    tmp_path: Path,
+    fake_config: FakeConfig,
+    error: Exception,
+    base: type[Exception],
+    retryable: bool,
+) -> None:
+    path = tmp_path / "calls.ndjson.gz"
+    record_calls(path, fake_config, [error])
+    api = ReplayLog(path).factory(speed=0)()
+
+    with pytest.raises(ReplayedError) as excinfo:
+        api.scanners(type(error).__name__, ascending=True, date=DAY)
+
+    replayed = excinfo.value
+    assert type(replayed).__name__ == type(error).__name__
+    assert isinstance(replayed, base)
+    assert str(replayed) == str(error)
+    assert RetryPolicy.retryable(replayed) is retryable
+
+
+def test_old_entries_without_error_type(tmp_path: Path) -> None:
+    path = tmp_path / "old.ndjson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"version": 1, "started_at": 0}) + "\n")
+        entry = {
+            "op": OP_SCANNERS,
+            "sim": True,
+            "t": 0.0,
+            "dur": 0.0,
+            "args": scan_args("VolumeRank"),
+            "error": "FakeUpstreamError: 上游失敗",
+        }
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    api = ReplayLog(path).factory(speed=0)()
+    with pytest.raises(ReplayedError, match="FakeUpstreamError: 上游失敗") as excinfo:
+        api.scanners("VolumeRank", date=DAY)
+    assert type(excinfo.value) is ReplayedError
+
+
+def test_truncated_log_keeps_complete_entries(
+    tmp_path: Path, fake_config: FakeConfig
+) -> None:
+    path = tmp_path / "calls.ndjson.gz"
+    record_calls(path, fake_config)
+    content = gzip.decompress(path.read_bytes())
+    path.write_bytes(gzip.compress(content[:-20]))
+
+    log = ReplayLog(path)
+    assert len(log.entries) == 2
@@ -0,0 +1,236 @@
+"""斷路器、重試與對沖請求測試"""
+
+import threading
+import time
+
+import pytest
+
+from sj_trading.ratelimit import RateLimitWaitTimeout
+from sj_trading.resilience import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    UpstreamGuard,
+)
+from sj_trading.session_pool import PoolExhaustedError
+
+NO_DELAY = RetryPolicy(attempts=3, base_delay=0.0, max_delay=0.0)
+
+
+class UpstreamError(RuntimeError):
+    """模擬的上游錯誤"""
+
+
+def failing(error: Exception):
+    """每次都拋出 error 並記錄呼叫次數的 attempt"""
+    calls: list[bool] = []
+
+    def attempt(hedged: bool) -> None:
+        calls.append(hedged)
+        raise error
+
+    return attempt, calls
+
+
+def test_breaker_opens_after_threshold() -> None:
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.allow()
+    assert 0 < excinfo.value.retry_after <= 60
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_success_resets_failures() -> None:
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_half_open_allows_single_probe() -> None:
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == CIRCUIT_HALF_OPEN
+
+    breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_failed_probe_reopens() -> None:
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_released_probe_can_be_retried() -> None:
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.release()
+    breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+
+
+def test_backoff_is_bounded() -> None:
+    policy = RetryPolicy(attempts=5, base_delay=0.1, max_delay=0.3)
+    for retry in range(5):
+        assert 0.0 <= policy.backoff(retry) <= min(0.3, 0.1 * 2**retry)
+
+
+def test_guard_retries_upstream_errors() -> None:
+    guard = UpstreamGuard(retry=NO_DELAY, failure_threshold=10)
+    results = iter([UpstreamError("1"), UpstreamError("2"), "ok"])
+
+    def attempt(hedged: bool) -> str:
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert guard.call(True, attempt) == "ok"
+    assert guard.breakers[True].stats()["failures"] == 0
+
+
+def test_guard_gives_up_after_attempts() -> None:
+    guard = UpstreamGuard(retry=NO_DELAY, failure_threshold=10)
+    attempt, calls = failing(UpstreamError("down"))
+    with pytest.raises(UpstreamError):
+        guard.call(True, attempt)
+    assert len(calls) == 3
+    assert guard.breakers[True].stats()["failures"] == 3
+
+
+def test_guard_does_not_retry_invalid_arguments() -> None:
+    guard = UpstreamGuard(retry=NO_DELAY)
+    attempt, calls = failing(ValueError("bad"))
+    with pytest.raises(ValueError):
+        guard.call(True, attempt)
+    assert len(calls) == 1
+
+
+def test_upstream_timeout_counts_but_is_not_retried() -> None:
+    """上游逾時已耗盡逾時時間，不重試但計入斷路器失敗"""
+    guard = UpstreamGuard(retry=NO_DELAY, failure_threshold=2)
+    attempt, calls = failing(TimeoutError("upstream"))
+    with pytest.raises(TimeoutError):
+        guard.call(True, attempt)
+    assert len(calls) == 1
+    assert guard.breakers[True].stats()["failures"] == 1
+
+    with pytest.raises(TimeoutError):
+        guard.call(True, attempt)
+    assert guard.breakers[True].state == CIRCUIT_OPEN
+
+
+@pytest.mark.parametrize(
+    "error", [PoolExhaustedError("pool"), RateLimitWaitTimeout("budget")]
+)
+def test_local_timeouts_do_not_trip_breaker(error: Exception) -> None:
+    """等待連線或速率限制額度逾時不重試，也不計入斷路器失敗"""
+    guard = UpstreamGuard(retry=NO_DELAY, failure_threshold=1)
+    attempt, calls = failing(error)
+    for _ in range(3):
+        with pytest.raises(type(error)):
+            guard.call(True, attempt)
+
+    assert len(calls) == 3
+    assert guard.breakers[True].state == CIRCUIT_CLOSED
+    assert guard.breakers[True].stats()["failures"] == 0
+
+
+def test_local_timeout_releases_half_open_probe() -> None:
+    guard = UpstreamGuard(retry=NO_DELAY, failure_threshold=1, reset_timeout=0.05)
+    breaker = guard.breakers[True]
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    attempt, _ = failing(PoolExhaustedError("pool"))
+    with pytest.raises(PoolExhaustedError):
+        guard.call(True, attempt)
+
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert guard.call(True, lambda hedged: "ok") == "ok"
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_open_circuit_skips_upstream() -> None:
+    guard = UpstreamGuard(
+        retry=RetryPolicy(attempts=1), failure_threshold=1, reset_timeout=60
+    )
+    attempt, calls = failing(UpstreamError("down"))
+    with pytest.raises(UpstreamError):
+        guard.call(False, attempt)
+    with pytest.raises(CircuitOpenError):
+        guard.call(False, attempt)
+    assert len(calls) == 1
+    # 模擬與正式模式的斷路器互不影響
+    assert guard.breakers[True].state == CIRCUIT_CLOSED
+
+
+def test_hedge_wins_over_slow_primary() -> None:
+    guard = UpstreamGuard(retry=NO_DELAY, hedge_after=0.02)
+    release = threading.Event()
+
+    def attempt(hedged: bool) -> str:
+        if hedged:
+            return "hedge"
+        release.wait(1.0)
+        return "primary"
+
+    try:
+        assert guard.call(True, attempt, hedge=True) == "hedge"
+    finally:
+        release.set()
+        guard.close()
+
+
+def test_hedge_not_sent_for_fast_primary() -> None:
+    guard = UpstreamGuard(retry=NO_DELAY, hedge_after=0.5)
+    calls: list[bool] = []
+
+    def attempt(hedged: bool) -> str:
+        calls.append(hedged)
+        return "primary"
+
+    try:
+        assert guard.call(True, attempt, hedge=True) == "primary"
+    finally:
+        guard.close()
+    assert calls == [False]
+
+
+def test_hedge_skipped_without_idle_session() -> None:
+    """對沖請求拿不到閒置連線時略過，仍回傳原請求的結果"""
+    guard = UpstreamGuard(retry=NO_DELAY, hedge_after=0.02, failure_threshold=1)
+
+    def attempt(hedged: bool) -> str:
+        if hedged:
+            raise PoolExhaustedError("no idle session")
+        time.sleep(0.1)
+        return "primary"
+
+    try:
+        assert guard.call(True, attempt, hedge=True) == "primary"
+    finally:
+        guard.close()
+    assert guard.breakers[True].stats()["failures"] == 0
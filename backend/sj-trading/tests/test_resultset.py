@@ -0,0 +1,110 @@
+"""結果集篩選、排序、分頁與代碼測試"""
+
+import time
+from typing import Any
+
+import pytest
+
+from sj_trading.record import ScanRecord
+from sj_trading.resultset import (
+    Filter,
+    ResultHandles,
+    ResultSet,
+    decode_cursor,
+    encode_cursor,
+    parse_sort,
+)
+
+ROWS = [
+    ScanRecord({"code": "2330", "close": 1000.0, "volume": 30000, "change_price": 10}),
+    ScanRecord({"code": "2317", "close": 200.0, "volume": 50000, "change_price": -5}),
+    ScanRecord({"code": "0050", "close": 180.0, "volume": None, "change_price": 0}),
+]
+
+
+def codes(result_set: ResultSet, indices: list[int]) -> list[str]:
+    """依索引順序取出股票代號"""
+    return [row["code"] for row in result_set.page(indices, 0, len(indices))]
+
+
+def test_filter_parse() -> None:
+    assert Filter.parse("close >= 10") == Filter("close", ">=", 10.0, "10")
+    assert Filter.parse("code==2330").matches("2330")
+    assert not Filter.parse("volume>1").matches(None)
+    with pytest.raises(ValueError):
+        Filter.parse("close ~ 10")
+
+
+def test_select_filters_and_sorts() -> None:
+    result_set = ResultSet(ROWS)
+    indices = result_set.select([Filter.parse("close<500")], parse_sort("-close"))
+    assert codes(result_set, indices) == ["2317", "0050"]
+
+    # 缺值不論升降序都排在最後
+    assert codes(result_set, result_set.select(sort=parse_sort("volume"))) == [
+        "2330",
+        "2317",
+        "0050",
+    ]
+    assert codes(result_set, result_set.select(sort=parse_sort("-volume")))[-1] == (
+        "0050"
+    )
+
+
+def test_derived_change_percent() -> None:
+    result_set = ResultSet(ROWS)
+    indices = result_set.select([Filter.parse("change_percent>0")])
+    assert codes(result_set, indices) == ["2330"]
+
+
+def test_page_selects_fields() -> None:
+    result_set = ResultSet(ROWS)
+    page = result_set.page(result_set.select(), 1, 1, fields=["code", "close"])
+    assert page == [{"code": "2317", "close": 200.0}]
+
+
+def test_page_copies_only_requested_rows() -> None:
+    class CountingRow(ScanRecord):
+        copies = 0
+
+        def keys(self) -> Any:  # dict(row) 由 keys() 取出欄位
+            CountingRow.copies += 1
+            return super().keys()
+
+    rows = [CountingRow({"code": str(i), "close": float(i)}) for i in range(100)]
+    result_set = ResultSet(rows)
+
+    page = result_set.page(result_set.select(), 10, 2)
+
+    assert page == [{"code": "10", "close": 10.0}, {"code": "11", "close": 11.0}]
+    assert CountingRow.copies == 2
+    page[0]["close"] = 0.0
+    assert rows[10]["close"] == 10.0
+
+
+def test_cursor_round_trip() -> None:
+    cursor = encode_cursor(50, "close>10|-volume")
+    assert decode_cursor(cursor, "close>10|-volume") == 50
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "close>20|-volume")
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor", "")
+
+
+def test_handles_reuse_same_rows() -> None:
+    handles = ResultHandles()
+    first = handles.register("scan", ROWS)
+    assert handles.register("scan", ROWS) == first
+    assert handles.register("scan", list(ROWS)) == first
+
+    changed = handles.register("scan", [ScanRecord(dict(row)) for row in ROWS])
+    assert changed != first
+    assert handles.get(first) is None
+    assert handles.get(changed) is not None
+
+
+def test_handles_expire() -> None:
+    handles = ResultHandles(ttl=0.05)
+    handle = handles.register("scan", ROWS)
+    time.sleep(0.06)
+    assert handles.get(handle) is None
@@ -0,0 +1,198 @@
+"""execute_scan 的快取、歷史儲存與降級流程測試"""
+
+import time
+from collections.abc import Iterator
+from datetime import datetime
+
+import pytest
+
+from sj_trading.cache import ScanCache
+from sj_trading.fake import FAKE_CONFIG, FakeConfig, FakeShioaji, FakeUpstreamError
+from sj_trading.quota import (
+    QUOTA_CRITICAL,
+    DegradationPolicy,
+    QuotaExceededError,
+    QuotaTracker,
+)
+from sj_trading.record import ScanRecord
+from sj_trading.resilience import CircuitOpenError, RetryPolicy, UpstreamGuard
+from sj_trading.scanner import (
+    SOURCE_CACHE,
+    SOURCE_SKIPPED,
+    SOURCE_STORE,
+    SOURCE_UPSTREAM,
+    execute_scan,
+)
+from sj_trading.session_pool import SessionPool
+from sj_trading.store import ScanStore
+from sj_trading.trading_calendar import TAIPEI, TradingCalendar
+
+DAY = "2026-10-16"
+INTRADAY = datetime(2026, 10, 16, 10, 0, tzinfo=TAIPEI).timestamp()
+AFTER_CLOSE = datetime(2026, 10, 16, 15, 0, tzinfo=TAIPEI).timestamp()
+
+STORED = [{"code": "9999", "close": 1.0}]
+
+# 剩餘流量 100% 也視為 critical，用於測試降級流程
+ALWAYS_CRITICAL = DegradationPolicy(conserve_below=101.0, critical_below=101.0)
+
+
+@pytest.fixture
+def store() -> Iterator[ScanStore]:
+    """記憶體中的歷史儲存"""
+    store = ScanStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_upstream_result_is_cached(pool: SessionPool) -> None:
+    cache = ScanCache()
+    first = execute_scan("VolumeRank", DAY, 10, pool=pool, cache=cache)
+    second = execute_scan("VolumeRank", DAY, 5, pool=pool, cache=cache)
+
+    assert first.source == SOURCE_UPSTREAM and len(first.results) == 10
+    assert second.source == SOURCE_CACHE
+    assert list(second.results) == list(first.results[:5])
+
+
+def test_degraded_quota_serves_expired_cache(pool: SessionPool) -> None:
+    today = time.strftime("%Y-%m-%d")
+    cache = ScanCache(today_ttl=0.0)
+    cache.put("VolumeRank", today, 10, True, True, [ScanRecord(STORED[0])])
+    quota = QuotaTracker(pool)
+    quota.refresh(True)
+
+    result = execute_scan(
+        "VolumeRank",
+        today,
+        10,
+        pool=pool,
+        cache=cache,
+        quota=quota,
+        policy=ALWAYS_CRITICAL,
+    )
+    assert result.source == SOURCE_CACHE
+    assert result.stale
+    assert result.quota_level == QUOTA_CRITICAL
+    assert [r["code"] for r in result.results] == ["9999"]
+
+
+def test_exhausted_quota_refuses_uncached_scan() -> None:
+    exhausted = FakeConfig(latency=0.0, login_latency=0.0, limit_bytes=0)
+    exhausted_pool = SessionPool(
+        config=FAKE_CONFIG,
+        api_factory=FakeShioaji.factory(exhausted),
+        acquire_timeout=1.0,
+    )
+    quota = QuotaTracker(exhausted_pool)
+    quota.refresh(True)
+    try:
+        with pytest.raises(QuotaExceededError):
+            execute_scan("VolumeRank", DAY, 10, pool=exhausted_pool, quota=quota)
+    finally:
+        exhausted_pool.close()
+
+
+def test_intraday_snapshot_is_refetched(pool: SessionPool, store: ScanStore) -> None:
+    """歷史日期盤中取得的快照仍會變動，重新查詢而不是直接回傳"""
+    store.save("VolumeRank", DAY, 10, True, True, STORED, fetched_at=INTRADAY)
+
+    result = execute_scan("VolumeRank", DAY, 10, pool=pool, store=store)
+    assert result.source == SOURCE_UPSTREAM
+    assert result.results[0]["code"] != "9999"
+    assert store.flush(timeout=1.0)
+    assert store.stats()["snapshots"] == 2
+
+
+def test_final_snapshot_is_served_from_store(
+    pool: SessionPool, store: ScanStore
+) -> None:
+    store.save("VolumeRank", DAY, 10, True, True, STORED, fetched_at=AFTER_CLOSE)
+    cache = ScanCache()
+
+    result = execute_scan("VolumeRank", DAY, 10, pool=pool, cache=cache, store=store)
+    assert result.source == SOURCE_STORE
+    assert not result.stale
+    assert [r["code"] for r in result.results] == ["9999"]
+    assert cache.get("VolumeRank", DAY, 10, True, True) is not None
+
+
+def test_degraded_quota_serves_intraday_snapshot(
+    pool: SessionPool, store: ScanStore
+) -> None:
+    """流量不足時盤中快照也可當作過期資料回傳"""
+    store.save("VolumeRank", DAY, 10, True, True, STORED, fetched_at=INTRADAY)
+    quota = QuotaTracker(pool)
+    quota.refresh(True)
+
+    result = execute_scan(
+        "VolumeRank",
+        DAY,
+        10,
+        pool=pool,
+        store=store,
+        quota=quota,
+        policy=ALWAYS_CRITICAL,
+    )
+    assert result.source == SOURCE_STORE
+    assert result.stale
+    assert result.quota_level == QUOTA_CRITICAL
+
+
+def test_empty_result_skips_later_scans() -> None:
+    """查無資料只略過相同的掃描條件"""
+    empty = FakeConfig(latency=0.0, login_latency=0.0, max_rows=0)
+    empty_pool = SessionPool(
+        config=FAKE_CONFIG, api_factory=FakeShioaji.factory(empty), acquire_timeout=1.0
+    )
+    cache = ScanCache()
+    try:
+        first = execute_scan("VolumeRank", DAY, 10, pool=empty_pool, cache=cache)
+        second = execute_scan("VolumeRank", DAY, 10, pool=empty_pool, cache=cache)
+        other = execute_scan(
+            "VolumeRank", DAY, 10, ascending=False, pool=empty_pool, cache=cache
+        )
+    finally:
+        empty_pool.close()
+
+    assert first.source == SOURCE_UPSTREAM and first.results == []
+    assert second.source == SOURCE_SKIPPED
+    assert other.source == SOURCE_UPSTREAM
+
+
+def test_non_trading_day_skips_upstream(pool: SessionPool) -> None:
+    result = execute_scan(
+        "VolumeRank", "2026-10-17", 10, pool=pool, calendar=TradingCalendar()
+    )
+    assert result.source == SOURCE_SKIPPED
+    assert result.results == []
+
+
+def test_open_circuit_falls_back_to_stale_cache() -> None:
+    failing = FakeConfig(latency=0.0, login_latency=0.0, failure_rate=1.0)
+    failing_pool = SessionPool(
+        config=FAKE_CONFIG,
+        api_factory=FakeShioaji.factory(failing),
+        acquire_timeout=1.0,
+    )
+    guard = UpstreamGuard(
+        retry=RetryPolicy(attempts=1), failure_threshold=1, reset_timeout=60
+    )
+    today = time.strftime("%Y-%m-%d")
+    cache = ScanCache(today_ttl=0.0)
+    cache.put("VolumeRank", today, 10, True, True, [ScanRecord(STORED[0])])
+    try:
+        with pytest.raises(FakeUpstreamError):
+            execute_scan("AmountRank", today, 10, pool=failing_pool, guard=guard)
+        result = execute_scan(
+            "VolumeRank", today, 10, pool=failing_pool, cache=cache, guard=guard
+        )
+        with pytest.raises(CircuitOpenError):
+            execute_scan("AmountRank", today, 10, pool=failing_pool, guard=guard)
+    finally:
+        failing_pool.close()
+        guard.close()
+
+    assert result.source == SOURCE_CACHE
+    assert result.stale
+    assert [r["code"] for r in result.results] == ["9999"]
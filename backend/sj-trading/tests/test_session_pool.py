@@ -0,0 +1,158 @@
+"""SessionPool 測試"""
+
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from sj_trading.fake import FAKE_CONFIG, FakeConfig, FakeShioaji, FakeUpstreamError
+from sj_trading.resilience import RetryPolicy, UpstreamGuard
+from sj_trading.scanner import execute_scan
+from sj_trading.session_pool import PoolExhaustedError, SessionPool
+
+
+class FlakyLogin(FakeShioaji):
+    """前 failures 次登入失敗的假後端"""
+
+    failures = 0
+    lock = threading.Lock()
+
+    def login(self, api_key: str, secret_key: str, **kwargs: Any) -> list[str]:
+        time.sleep(0.1)
+        with FlakyLogin.lock:
+            if FlakyLogin.failures > 0:
+                FlakyLogin.failures -= 1
+                raise RuntimeError("登入失敗")
+        return super().login(api_key, secret_key, **kwargs)
+
+
+class ExpiringSession(FakeShioaji):
+    """登入狀態可被設為失效的假後端，失效時掃描失敗且 usage() 無回應"""
+
+    logins = 0
+
+    def login(self, api_key: str, secret_key: str, **kwargs: Any) -> list[str]:
+        ExpiringSession.logins += 1
+        return super().login(api_key, secret_key, **kwargs)
+
+    def usage(self, *args: Any, **kwargs: Any) -> Any:
+        return super().usage(*args, **kwargs) if self._logged_in else None
+
+    def scanners(self, *args: Any, **kwargs: Any) -> Any:
+        if not self._logged_in:
+            raise FakeUpstreamError("session expired")
+        return super().scanners(*args, **kwargs)
+
+
+def test_reuses_logged_in_session(pool: SessionPool) -> None:
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        pass
+
+    assert first is second
+    assert first.is_logged_in
+    assert pool.stats()["simulation"] == {"size": 1, "created": 1, "idle": 1}
+
+
+def test_modes_use_separate_sessions(pool: SessionPool) -> None:
+    with pool.acquire(True) as simulation, pool.acquire(False) as production:
+        assert simulation is not production
+        assert simulation.simulation and not production.simulation
+
+
+def test_exhausted_pool_raises_without_waiting(pool: SessionPool) -> None:
+    with pool.acquire():
+        start = time.monotonic()
+        with pytest.raises(PoolExhaustedError), pool.acquire(timeout=0):
+            pass
+        assert time.monotonic() - start < 0.5
+
+
+def test_waiter_gets_returned_session(pool: SessionPool) -> None:
+    acquired = threading.Event()
+    clients = []
+
+    def hold() -> None:
+        with pool.acquire() as client:
+            clients.append(client)
+            acquired.set()
+            time.sleep(0.1)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    acquired.wait()
+    with pool.acquire() as client:
+        clients.append(client)
+    thread.join()
+
+    assert clients[0] is clients[1]
+
+
+def test_waiter_replaces_discarded_session(fake_config: FakeConfig) -> None:
+    """等待中的請求在連線登入失敗被移除後建立替代連線，不必等到逾時"""
+    FlakyLogin.failures = 1
+    pool = SessionPool(
+        config=FAKE_CONFIG,
+        api_factory=lambda simulation=True: FlakyLogin(simulation, fake_config),
+        acquire_timeout=5.0,
+    )
+    errors: list[Exception] = []
+
+    def first() -> None:
+        try:
+            with pool.acquire():
+                pass
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    time.sleep(0.02)
+    start = time.monotonic()
+    with pool.acquire() as client:
+        assert client.is_logged_in
+    elapsed = time.monotonic() - start
+    thread.join()
+    pool.close()
+
+    assert len(errors) == 1
+    assert elapsed < 1.0
+    assert pool.stats()["simulation"]["created"] == 0
+
+
+def test_failed_session_is_checked_before_reuse(pool: SessionPool) -> None:
+    with pytest.raises(ValueError), pool.acquire():
+        raise ValueError("呼叫失敗")
+
+    session = pool._idle[True].get_nowait()
+    assert session.last_checked == 0.0
+    pool._idle[True].put(session)
+
+
+def test_closed_pool_refuses_acquire(pool: SessionPool) -> None:
+    pool.close()
+    with pytest.raises(RuntimeError), pool.acquire():
+        pass
+
+
+def test_retry_runs_on_relogged_in_session(fake_config: FakeConfig) -> None:
+    """呼叫失敗後由 UpstreamGuard 重試，重新借出時健康檢查失敗並重新登入"""
+    ExpiringSession.logins = 0
+    pool = SessionPool(
+        config=FAKE_CONFIG,
+        api_factory=lambda simulation=True: ExpiringSession(simulation, fake_config),
+    )
+    guard = UpstreamGuard(retry=RetryPolicy(attempts=2, base_delay=0.0))
+    try:
+        with pool.acquire() as client:
+            client.api._logged_in = False
+
+        result = execute_scan("VolumeRank", "2026-10-16", 5, pool=pool, guard=guard)
+    finally:
+        pool.close()
+
+    assert len(result.results) == 5
+    assert ExpiringSession.logins == 2
+    assert guard.breakers[True].stats()["failures"] == 0
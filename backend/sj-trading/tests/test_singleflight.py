@@ -0,0 +1,89 @@
+"""重複請求合併測試"""
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from sj_trading.singleflight import SingleFlight
+
+
+def coalesce(flight: SingleFlight, fn: Callable[[], Any], waiters: int) -> list[Any]:
+    """
+    讓 fn 在 waiters 個呼叫者合併後才完成
+
+    Returns:
+        領頭者與各等待者的結果或例外
+    """
+    release = threading.Event()
+    results: list[Any] = []
+    lock = threading.Lock()
+
+    def blocked() -> Any:
+        release.wait(1.0)
+        return fn()
+
+    def call() -> None:
+        try:
+            result = flight.do("key", blocked)
+        except Exception as e:
+            result = e
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=call) for _ in range(waiters + 1)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 1.0
+    while flight.stats()["coalesced"] < waiters and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    flight = SingleFlight()
+    calls = []
+
+    def fn() -> list[int]:
+        calls.append(1)
+        return [1, 2, 3]
+
+    results = coalesce(flight, fn, waiters=4)
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {
+        "executions": 1,
+        "coalesced": 4,
+        "max_waiters": 4,
+        "in_flight": 0,
+    }
+
+
+def test_error_is_shared_and_not_cached() -> None:
+    flight = SingleFlight()
+
+    def fail() -> None:
+        raise RuntimeError("upstream down")
+
+    results = coalesce(flight, fail, waiters=2)
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.stats()["executions"] == 2
+
+
+def test_different_keys_run_separately() -> None:
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["executions"] == 2
+
+    with pytest.raises(ValueError):
+        flight.do("a", lambda: int("x"))
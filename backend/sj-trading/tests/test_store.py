@@ -0,0 +1,126 @@
+"""歷史儲存的快照精簡與查無資料測試"""
+
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from sj_trading.store import ScanStore
+from sj_trading.trading_calendar import TAIPEI, is_final
+
+DAY = "2026-10-16"
+INTRADAY = datetime(2026, 10, 16, 10, 0, tzinfo=TAIPEI).timestamp()
+AFTER_CLOSE = datetime(2026, 10, 16, 15, 0, tzinfo=TAIPEI).timestamp()
+
+
+def rows(n: int) -> list[dict[str, object]]:
+    """建立 n 筆測試資料"""
+    return [{"code": f"{i:04d}", "close": 100.0 + i} for i in range(n)]
+
+
+@pytest.fixture
+def store() -> Iterator[ScanStore]:
+    """記憶體中的歷史儲存"""
+    store = ScanStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_is_final_uses_taipei_close() -> None:
+    assert not is_final(DAY, INTRADAY)
+    assert is_final(DAY, AFTER_CLOSE)
+    assert is_final(DAY, AFTER_CLOSE, close_time="15:00")
+    assert not is_final(DAY, AFTER_CLOSE, close_time="15:30")
+
+
+def test_latest_covers_count(store: ScanStore) -> None:
+    store.save("VolumeRank", DAY, 10, False, True, rows(10), fetched_at=INTRADAY)
+    store.save("VolumeRank", DAY, 5, False, True, rows(5), fetched_at=AFTER_CLOSE)
+
+    latest = store.latest("VolumeRank", DAY, 5, False, True)
+    assert latest is not None and latest.fetched_at == AFTER_CLOSE
+    larger = store.latest("VolumeRank", DAY, 10, False, True)
+    assert larger is not None and larger.fetched_at == INTRADAY
+    assert [r["code"] for r in store.load(larger.id, 3)] == ["0000", "0001", "0002"]
+
+
+def test_compact_keeps_final_snapshots(store: ScanStore) -> None:
+    """保留收盤後最新與數量最大的快照，刪除盤中快照"""
+    store.save("VolumeRank", DAY, 10, False, True, rows(10), fetched_at=INTRADAY)
+    widest = store.save(
+        "VolumeRank", DAY, 50, False, True, rows(50), fetched_at=AFTER_CLOSE
+    )
+    newest = store.save(
+        "VolumeRank", DAY, 10, False, True, rows(10), fetched_at=AFTER_CLOSE + 60
+    )
+
+    assert store.compact("2026-10-17") == 1
+    kept = {s.id for s in store.snapshots(DAY, DAY, "VolumeRank")}
+    assert kept == {widest, newest}
+    assert store.stats()["rows"] == 60
+
+
+def test_compact_without_final_keeps_newest(store: ScanStore) -> None:
+    store.save("VolumeRank", DAY, 10, False, True, rows(10), fetched_at=INTRADAY)
+    newest = store.save(
+        "VolumeRank", DAY, 10, False, True, rows(10), fetched_at=INTRADAY + 60
+    )
+
+    assert store.compact("2026-10-17") == 1
+    assert [s.id for s in store.snapshots(DAY, DAY, "VolumeRank")] == [newest]
+
+
+def test_compact_skips_recent_dates(store: ScanStore) -> None:
+    store.save("VolumeRank", DAY, 10, False, True, rows(10), fetched_at=INTRADAY)
+    store.save("VolumeRank", DAY, 10, False, True, rows(10), fetched_at=INTRADAY + 1)
+    assert store.compact(DAY) == 0
+
+
+def test_empty_scans_require_final_snapshot(store: ScanStore) -> None:
+    """開盤前取得的空結果不代表當日沒有資料"""
+    store.save("VolumeRank", DAY, 10, False, True, [], fetched_at=INTRADAY)
+    store.save("ChangePercentRank", DAY, 10, True, True, [], fetched_at=AFTER_CLOSE)
+    store.save("AmountRank", DAY, 10, True, True, [], fetched_at=INTRADAY)
+    store.save("AmountRank", DAY, 10, True, True, rows(3), fetched_at=AFTER_CLOSE)
+
+    assert store.empty_scans() == [("ChangePercentRank", DAY, True, True)]
+
+
+def test_save_later_writes_in_background(store: ScanStore) -> None:
+    futures = [
+        store.save_later("VolumeRank", DAY, n, False, True, rows(n)) for n in (5, 10)
+    ]
+
+    assert store.flush(timeout=1.0)
+    assert [future.result() for future in futures] == [1, 2]
+    assert store.stats()["pending_writes"] == 0
+    latest = store.latest("VolumeRank", DAY, 10, False, True)
+    assert latest is not None
+    assert latest.id == 2
+
+
+def test_close_waits_for_background_writes(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.sqlite3")
+    store = ScanStore(path)
+    store.save_later("VolumeRank", DAY, 10, False, True, rows(10))
+    store.close()
+
+    with pytest.raises(RuntimeError):
+        store.save_later("VolumeRank", DAY, 10, False, True, rows(10))
+    reopened = ScanStore(path)
+    try:
+        assert reopened.stats()["rows"] == 10
+    finally:
+        reopened.close()
+
+
+def test_failed_background_write_is_logged(
+    store: ScanStore, caplog: pytest.LogCaptureFixture
+) -> None:
+    future = store.save_later("VolumeRank", DAY, 1, False, True, [{"code": object()}])
+
+    assert store.flush(timeout=1.0)
+    assert future.exception() is not None
+    assert store.stats()["pending_writes"] == 0
+    assert "寫入歷史儲存失敗" in caplog.text
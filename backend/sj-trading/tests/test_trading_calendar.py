@@ -0,0 +1,68 @@
+"""交易日曆測試"""
+
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from sj_trading.trading_calendar import (
+    NON_TRADING_FUTURE,
+    NON_TRADING_HOLIDAY,
+    NON_TRADING_INVALID,
+    NON_TRADING_WEEKEND,
+    TradingCalendar,
+    check_date,
+    taipei_today,
+)
+
+
+def test_weekends_are_not_trading_days() -> None:
+    calendar = TradingCalendar()
+    assert calendar.non_trading_reason("2026-10-16") is None
+    assert calendar.non_trading_reason("2026-10-17") == NON_TRADING_WEEKEND
+    assert calendar.non_trading_reason("2026-13-01") == NON_TRADING_INVALID
+    assert calendar.non_trading_reason("2999-01-01") == NON_TRADING_FUTURE
+
+
+def test_calendar_file(tmp_path: Path) -> None:
+    path = tmp_path / "calendar.txt"
+    path.write_text(
+        "2026-10-09  # 國慶日補假\n+2026-10-17  # 補班交易日\n", encoding="utf-8"
+    )
+    calendar = TradingCalendar(str(path))
+
+    assert calendar.non_trading_reason("2026-10-09") == NON_TRADING_HOLIDAY
+    assert calendar.is_trading_day("2026-10-17")
+    assert list(calendar.trading_days("2026-10-08", "2026-10-12")) == [
+        "2026-10-08",
+        "2026-10-12",
+    ]
+
+
+def test_invalid_calendar_file(tmp_path: Path) -> None:
+    path = tmp_path / "calendar.txt"
+    path.write_text("2026-02-30\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        TradingCalendar(str(path))
+
+
+def test_added_days_override() -> None:
+    calendar = TradingCalendar()
+    calendar.add_holiday("2026-10-16")
+    assert not calendar.is_trading_day("2026-10-16")
+    calendar.add_trading_day("2026-10-16")
+    assert calendar.is_trading_day("2026-10-16")
+
+
+def test_today_uses_taipei_time() -> None:
+    """UTC 16:00 之後台北已是隔天"""
+    late_utc = datetime(2026, 10, 16, 16, 30, tzinfo=UTC).timestamp()
+    assert taipei_today(late_utc) == date(2026, 10, 17)
+    early_utc = datetime(2026, 10, 16, 15, 30, tzinfo=UTC).timestamp()
+    assert taipei_today(early_utc) == date(2026, 10, 16)
+
+
+def test_future_is_relative_to_taipei_today() -> None:
+    today = taipei_today()
+    assert check_date(today.isoformat()) is None
+    assert check_date((today + timedelta(days=1)).isoformat()) == NON_TRADING_FUTURE
@@ -0,0 +1,26 @@
+"""API 測試共用設定：使用模擬後端，不需 Shioaji 帳號"""
+
+import os
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+# 設定於匯入 app 時讀取，需先於匯入前覆寫
+os.environ.update(
+    {
+        "SCANNER_FAKE_UPSTREAM": "true",
+        "SCANNER_FAKE_LATENCY": "0",
+        "SCANNER_STORE_PATH": "",
+        "SCANNER_SESSION_POOL_WARMUP": "[]",
+    }
+)
+
+from app.main import app
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    """每個測試重新啟動應用程式（獨立的快取與結果代碼）"""
+    with TestClient(app) as client:
+        yield client
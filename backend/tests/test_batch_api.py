@@ -0,0 +1,55 @@
+"""批次掃描 API 測試"""
+
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sj_trading.fake import FakeUpstreamError
+
+from app.api.routes import scanner as scanner_routes
+from app.models import ScanRequest
+
+# 已收盤的歷史交易日（週五）
+PAST_DATE = "2026-10-16"
+SCAN = {"scanner_type": "VolumeRank", "date": PAST_DATE, "count": 20}
+
+
+def test_batch_reports_invalid_items(client: TestClient) -> None:
+    response = client.post(
+        "/api/scan/batch",
+        json={"scans": [SCAN, SCAN, {**SCAN, "count": 0}, {"date": PAST_DATE}]},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "partial"
+    assert body["success_count"] == 1
+    assert body["error_count"] == 2
+    assert {key for key in body["results"] if key.startswith("invalid:")} == {
+        "invalid:2",
+        "invalid:3",
+    }
+    assert body["results"]["invalid:2"]["request"]["count"] == 0
+
+
+def test_batch_reports_failed_items(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    run_scan = scanner_routes.run_scan
+
+    async def flaky_scan(request: ScanRequest, *args: Any, **kwargs: Any) -> Any:
+        if request.scanner_type == "AmountRank":
+            raise FakeUpstreamError("模擬的掃描失敗")
+        return await run_scan(request, *args, **kwargs)
+
+    monkeypatch.setattr(scanner_routes, "run_scan", flaky_scan)
+    response = client.post(
+        "/api/scan/batch",
+        json={"scans": [SCAN, {**SCAN, "scanner_type": "AmountRank"}]},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success_count"] == 1
+    assert body["error_count"] == 1
+    failed = [item for item in body["results"].values() if item["status"] == "error"]
+    assert failed[0]["error"] == "FakeUpstreamError: 模擬的掃描失敗"
@@ -0,0 +1,102 @@
+"""回應壓縮中介層測試"""
+
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.compression import CompressionMiddleware, choose_encoding
+
+LARGE = b'{"data": "' + b"x" * 4096 + b'"}'
+
+
+async def large(request):
+    return Response(LARGE, media_type="application/json")
+
+
+async def small(request):
+    return Response(b'{"ok": true}', media_type="application/json")
+
+
+async def stream(request):
+    return StreamingResponse(
+        (b"code,close\n" * 200 for _ in range(3)), media_type="text/csv"
+    )
+
+
+async def events(request):
+    return StreamingResponse(
+        (b"data: ping\n\n" * 200 for _ in range(3)), media_type="text/event-stream"
+    )
+
+
+async def image(request):
+    return Response(b"\x89PNG" * 1024, media_type="image/png")
+
+
+async def encoded(request):
+    return PlainTextResponse("x" * 4096, headers={"Content-Encoding": "identity"})
+
+
+@pytest.fixture
+def client() -> TestClient:
+    """只有壓縮中介層的測試應用程式"""
+    app = Starlette(
+        routes=[
+            Route("/large", large),
+            Route("/small", small),
+            Route("/stream", stream),
+            Route("/events", events),
+            Route("/image", image),
+            Route("/encoded", encoded),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_choose_encoding() -> None:
+    assert choose_encoding("gzip", allow_brotli=False) == "gzip"
+    assert choose_encoding("br;q=0, gzip", allow_brotli=True) == "gzip"
+    assert choose_encoding("identity", allow_brotli=False) is None
+    assert choose_encoding("*", allow_brotli=False) == "gzip"
+    assert choose_encoding("gzip;q=0", allow_brotli=False) is None
+    assert choose_encoding("", allow_brotli=False) is None
+
+
+def test_large_response_is_gzipped(client: TestClient) -> None:
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(LARGE)
+    assert response.content == LARGE
+
+
+def test_small_response_is_not_compressed(client: TestClient) -> None:
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_no_accept_encoding(client: TestClient) -> None:
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.content == LARGE
+
+
+def test_streaming_response_is_compressed(client: TestClient) -> None:
+    with client.stream(
+        "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw) == b"code,close\n" * 600
+
+
+@pytest.mark.parametrize("path", ["/events", "/image", "/encoded"])
+def test_other_responses_pass_through(client: TestClient, path: str) -> None:
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get("Content-Encoding", "identity") == "identity"
@@ -0,0 +1,68 @@
+"""JSON 序列化測試"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sj_trading import ScanRecord
+from sj_trading.trading_calendar import TAIPEI
+
+from app import encoding
+from app.encoding import encode_json, encode_scan_response, normalize_rows
+from app.models import StockData
+
+CONTENT: dict[str, Any] = {
+    "name": "台積電",
+    "close": 1035.5,
+    "change_percent": float("nan"),
+    "rank_value": float("inf"),
+    "ts": datetime(2026, 10, 16, 13, 30, tzinfo=TAIPEI),
+    "date": date(2026, 10, 16),
+    "amount": Decimal("1.25"),
+    "rows": [{"volume": 1, "low": float("-inf")}, (1, 2)],
+}
+
+
+def fallback_json(content: Any, monkeypatch: pytest.MonkeyPatch) -> bytes:
+    """未安裝 orjson 時的輸出"""
+    with monkeypatch.context() as patch:
+        patch.setattr(encoding, "orjson", None)
+        return encode_json(content)
+
+
+def test_fallback_matches_orjson(monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("orjson")
+    assert fallback_json(CONTENT, monkeypatch) == encode_json(CONTENT)
+
+
+def test_fallback_output_is_valid_json(monkeypatch: pytest.MonkeyPatch) -> None:
+    decoded = json.loads(fallback_json(CONTENT, monkeypatch))
+    assert decoded["change_percent"] is None
+    assert decoded["rank_value"] is None
+    assert decoded["rows"] == [{"volume": 1, "low": None}, [1, 2]]
+    assert decoded["ts"] == "2026-10-16T13:30:00+08:00"
+    assert decoded["date"] == "2026-10-16"
+    assert decoded["amount"] == "1.25"
+    assert decoded["name"] == "台積電"
+
+
+def test_normalize_rows_matches_stock_data() -> None:
+    rows = [ScanRecord({"close": 10.0, "code": "2330", "tick_type": 1})]
+    normalized = normalize_rows(rows)
+    assert normalized == [StockData(**rows[0]).model_dump()]
+    assert list(normalized[0])[: len(StockData.model_fields)] == list(
+        StockData.model_fields
+    )
+    assert list(normalized[0])[-1] == "tick_type"
+
+
+def test_encode_scan_response_shape() -> None:
+    body = json.loads(encode_scan_response([{"code": "2330"}], 0.5, warning="流量偏高"))
+    assert body["status"] == "success"
+    assert body["total_count"] == 1
+    assert body["data"][0]["code"] == "2330"
+    assert body["data"][0]["close"] is None
+    assert body["execution_time"] == 0.5
+    assert body["warning"] == "流量偏高"
@@ -0,0 +1,201 @@
+"""即時掃描訂閱測試"""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing
+from typing import Any
+
+import pytest
+from sj_trading import ScanResult
+from sj_trading.record import ScanRecord
+
+from app.feed import (
+    EVENT_DELTA,
+    EVENT_ERROR,
+    EVENT_PING,
+    EVENT_SNAPSHOT,
+    Event,
+    LiveFeed,
+    Subscriber,
+    diff_rows,
+)
+from app.models import ScanRequest
+
+REQUEST = ScanRequest(scanner_type="VolumeRank", date="2026-10-16")
+OTHER = ScanRequest(scanner_type="AmountRank", date="2026-10-16")
+
+
+def rows(*closes: tuple[str, float]) -> list[dict[str, Any]]:
+    return [{"code": code, "close": close} for code, close in closes]
+
+
+def result(*closes: tuple[str, float]) -> ScanResult:
+    return ScanResult([ScanRecord(row) for row in rows(*closes)], 0.0, None)
+
+
+class ScriptedScan:
+    """依序回傳預先排定的結果，用完後重複最後一個"""
+
+    def __init__(self, *outcomes: ScanResult | Exception):
+        self.outcomes = list(outcomes)
+        self.calls: list[str] = []
+
+    async def __call__(self, request: ScanRequest) -> ScanResult:
+        self.calls.append(request.key())
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+async def take(events: AsyncIterator[Event], count: int) -> list[Event]:
+    return [await anext(events) for _ in range(count)]
+
+
+def run(
+    body: Callable[[LiveFeed], Any],
+    scan: ScriptedScan,
+    interval: float = 0.01,
+    **kwargs: Any,
+) -> Any:
+    """以快速輪詢的 LiveFeed 執行測試協程，結束時停止所有輪詢"""
+
+    async def main() -> Any:
+        feed = LiveFeed(scan, interval=interval, **kwargs)
+        try:
+            return await body(feed)
+        finally:
+            await feed.close()
+
+    return asyncio.run(main())
+
+
+def test_diff_rows() -> None:
+    before = rows(("2330", 1000.0), ("2317", 200.0), ("0050", 180.0))
+
+    assert diff_rows(before, list(before)) is None
+    assert diff_rows(
+        before, rows(("2330", 1000.0), ("2317", 201.0), ("0050", 180.0))
+    ) == {
+        "upsert": [{"code": "2317", "close": 201.0}],
+        "remove": [],
+        "order": None,
+    }
+    assert diff_rows(
+        before, rows(("2317", 200.0), ("2330", 1000.0), ("2454", 900.0))
+    ) == {
+        "upsert": [{"code": "2454", "close": 900.0}],
+        "remove": ["0050"],
+        "order": ["2317", "2330", "2454"],
+    }
+
+
+def test_full_queue_resyncs_to_snapshot() -> None:
+    async def body() -> None:
+        subscriber = Subscriber(max_queue=2)
+        snapshot: Event = (EVENT_SNAPSHOT, {"version": 3})
+        for version in (1, 2, 3):
+            subscriber.push((EVENT_DELTA, {"version": version}), lambda: snapshot)
+
+        assert subscriber.resyncs == 1
+        assert subscriber.queue.qsize() == 1
+        assert subscriber.queue.get_nowait() == snapshot
+
+    asyncio.run(body())
+
+
+def test_snapshot_then_delta() -> None:
+    scan = ScriptedScan(
+        result(("2330", 1000.0), ("2317", 200.0)),
+        result(("2330", 1010.0), ("2317", 200.0)),
+    )
+
+    async def body(feed: LiveFeed) -> list[Event]:
+        async with aclosing(feed.subscribe(REQUEST)) as events:
+            return await take(events, 2)
+
+    (first, first_data), (second, second_data) = run(body, scan)
+
+    assert first == EVENT_SNAPSHOT
+    assert first_data["version"] == 1
+    assert [row["code"] for row in first_data["data"]] == ["2330", "2317"]
+    assert first_data["total_count"] == 2
+    assert second == EVENT_DELTA
+    assert second_data["version"] == 2
+    assert [row["close"] for row in second_data["upsert"]] == [1010.0]
+    assert second_data["remove"] == []
+    assert second_data["order"] is None
+
+
+def test_error_event_keeps_polling() -> None:
+    scan = ScriptedScan(RuntimeError("上游錯誤"), result(("2330", 1000.0)))
+
+    async def body(feed: LiveFeed) -> list[Event]:
+        async with aclosing(feed.subscribe(REQUEST)) as events:
+            return await take(events, 2)
+
+    (first, first_data), (second, _) = run(body, scan)
+
+    assert first == EVENT_ERROR
+    assert first_data["detail"] == "RuntimeError: 上游錯誤"
+    assert second == EVENT_SNAPSHOT
+
+
+def test_unexpected_error_stops_poller() -> None:
+    scan = ScriptedScan(AssertionError("程式錯誤"))
+
+    async def body(feed: LiveFeed) -> asyncio.Task[None] | None:
+        async with aclosing(feed.subscribe(REQUEST)) as events:
+            assert (await anext(events))[0] == EVENT_PING
+            return feed._pollers[REQUEST.key()].task
+
+    task = run(body, scan, heartbeat=0.05)
+
+    assert task is not None and task.done()
+    assert isinstance(task.exception(), AssertionError)
+
+
+def test_subscribers_share_one_poller_per_key() -> None:
+    scan = ScriptedScan(result(("2330", 1000.0)))
+
+    async def body(feed: LiveFeed) -> dict[str, Any]:
+        async with (
+            aclosing(feed.subscribe(REQUEST)) as first,
+            aclosing(feed.subscribe(REQUEST)) as second,
+            aclosing(feed.subscribe(OTHER)) as other,
+        ):
+            await take(first, 1)
+            await take(second, 1)
+            await take(other, 1)
+            return feed.stats()
+
+    stats = run(body, scan, interval=60.0)
+
+    assert stats["specs"] == 2
+    assert stats["subscribers"] == 3
+    # 第二個訂閱者直接取得既有快照，不會另外觸發掃描
+    assert scan.calls == [REQUEST.key(), OTHER.key()]
+
+
+def test_last_subscriber_leaving_cancels_poller() -> None:
+    scan = ScriptedScan(result(("2330", 1000.0)))
+
+    async def body(feed: LiveFeed) -> None:
+        first = feed.subscribe(REQUEST)
+        second = feed.subscribe(REQUEST)
+        await take(first, 1)
+        await take(second, 1)
+        task = feed._pollers[REQUEST.key()].task
+        assert task is not None
+
+        await first.aclose()
+        assert feed.stats()["specs"] == 1
+        assert not task.done()
+
+        await second.aclose()
+        assert feed.stats()["specs"] == 0
+        assert feed.stats()["subscribers"] == 0
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(body, scan)
@@ -0,0 +1,44 @@
+"""ETag 與 Cache-Control 計算測試"""
+
+from datetime import date, timedelta
+
+from sj_trading.record import ScanRecord
+
+from app.http_cache import IMMUTABLE, NO_CACHE, EtagCache, cache_control, etag_matches
+
+ROWS = [ScanRecord({"code": "2330", "close": 1000.0})]
+
+
+def test_etag_is_weak_and_stable() -> None:
+    etag = EtagCache().etag("scan", ROWS)
+    assert etag.startswith('W/"')
+    assert EtagCache().etag("scan", [ScanRecord(dict(row)) for row in ROWS]) == etag
+
+
+def test_etag_depends_on_key_and_rows() -> None:
+    etags = EtagCache()
+    etag = etags.etag("scan", ROWS)
+    assert etags.etag("other", ROWS) != etag
+    assert etags.etag("scan", [ScanRecord({"code": "2330", "close": 999.0})]) != etag
+
+
+def test_etag_matches() -> None:
+    etag = 'W/"abc"'
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"x"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_cache_control() -> None:
+    today = date.today().isoformat()
+    past = (date.today() - timedelta(days=3)).isoformat()
+
+    assert cache_control(past, False, 0.0, 60.0) == IMMUTABLE
+    assert cache_control(past, False, 0.0, 60.0, max_age=600) == "public, max-age=600"
+    assert cache_control(today, False, 20.0, 60.0) == "public, max-age=40"
+    assert cache_control(today, False, 20.0, 60.0, max_age=10) == "public, max-age=10"
+    assert cache_control(today, False, 90.0, 60.0) == "public, max-age=0"
+    assert cache_control(past, True, 0.0, 60.0) == NO_CACHE
@@ -0,0 +1,28 @@
+"""合併掃描 API 測試"""
+
+from fastapi.testclient import TestClient
+
+JOIN = {
+    "scanner_types": ["VolumeRank", "AmountRank"],
+    "date": "2026-10-16",
+    "count": 50,
+}
+
+
+def test_join_union_covers_both_rankings(client: TestClient) -> None:
+    response = client.post("/api/scan/join", json={**JOIN, "how": "union"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["counts"] == {"VolumeRank": 50, "AmountRank": 50}
+    assert body["total_count"] == len(body["data"])
+    assert set(body["data"][0]) >= {"code", "VolumeRank_rank", "AmountRank_rank"}
+    for row in body["data"]:
+        assert row["VolumeRank_rank"] is not None or row["AmountRank_rank"] is not None
+
+
+def test_join_rejects_duplicate_scanner_types(client: TestClient) -> None:
+    response = client.post(
+        "/api/scan/join", json={**JOIN, "scanner_types": ["VolumeRank"] * 2}
+    )
+    assert response.status_code == 422
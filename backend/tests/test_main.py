@@ -0,0 +1,20 @@
+"""應用程式啟動設定測試"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_fake_backend_not_imported_unless_configured() -> None:
+    env = {**os.environ, "SCANNER_FAKE_UPSTREAM": "false"}
+    code = "import sys, app.main; print('sj_trading.fake' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,22 @@
+"""Prometheus 指標端點測試"""
+
+from fastapi.testclient import TestClient
+
+SCAN = {"scanner_type": "VolumeRank", "date": "2026-10-16", "count": 20}
+
+
+def test_metrics_include_scan_and_component_stats(client: TestClient) -> None:
+    assert client.post("/api/scan", json=SCAN).status_code == 200
+    assert client.post("/api/scan", json=SCAN).status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE sj_scan_seconds histogram" in lines
+    assert any(line.startswith('sj_cache_events_total{event="hit"}') for line in lines)
+    assert any(
+        line.startswith('sj_session_pool_sessions{mode="simulation",state="created"}')
+        for line in lines
+    )
@@ -0,0 +1,13 @@
+"""API 資料模型測試"""
+
+from sj_trading import STOCK_FIELDS
+
+from app.models import StockData
+
+
+def test_stock_data_matches_stock_fields() -> None:
+    """StockData 的欄位與型別必須與匯出使用的 STOCK_FIELDS 一致"""
+    declared = {
+        name: field.annotation for name, field in StockData.model_fields.items()
+    }
+    assert declared == {name: py_type | None for name, py_type in STOCK_FIELDS}
@@ -0,0 +1,37 @@
+"""結果代碼的篩選、排序與分頁 API 測試"""
+
+from fastapi.testclient import TestClient
+
+# 已收盤的歷史交易日（週五）
+PAST_DATE = "2026-10-16"
+SCAN = {"scanner_type": "VolumeRank", "date": PAST_DATE, "count": 20}
+
+
+def test_results_cursor_pagination(client: TestClient) -> None:
+    handle = client.post("/api/scan", json=SCAN).json()["handle"]
+
+    codes: list[str] = []
+    params: dict[str, object] = {"sort": "-close", "limit": 8, "fields": "code,close"}
+    while True:
+        page = client.get(f"/api/results/{handle}", params=params).json()
+        assert page["total_count"] == 20
+        codes.extend(row["code"] for row in page["data"])
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+    assert len(codes) == 20 == len(set(codes))
+
+    mismatched = client.get(
+        f"/api/results/{handle}", params={"sort": "close", "cursor": params["cursor"]}
+    )
+    assert mismatched.status_code == 400
+    assert client.get("/api/results/unknown").status_code == 404
+
+
+def test_results_filter(client: TestClient) -> None:
+    handle = client.post("/api/scan", json=SCAN).json()["handle"]
+    page = client.get(
+        f"/api/results/{handle}", params={"filter": "close>0", "limit": 200}
+    ).json()
+    assert page["total_count"] == 20
+    assert all(row["close"] > 0 for row in page["data"])
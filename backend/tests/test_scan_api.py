@@ -0,0 +1,66 @@
+"""掃描 API 的日期驗證與 HTTP 快取測試"""
+
+from fastapi.testclient import TestClient
+
+from app.http_cache import IMMUTABLE
+from app.settings import settings
+
+# 已收盤的歷史交易日（週五）
+PAST_DATE = "2026-10-16"
+SCAN = {"scanner_type": "VolumeRank", "date": PAST_DATE, "count": 20}
+
+
+def test_future_date_is_rejected(client: TestClient) -> None:
+    response = client.post("/api/scan", json={**SCAN, "date": "2999-01-01"})
+    assert response.status_code == 422
+
+
+def test_scan_returns_etag_and_handle_max_age(client: TestClient) -> None:
+    response = client.post("/api/scan", json=SCAN)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_count"] == 20
+    assert body["handle"]
+    assert response.headers["ETag"].startswith('W/"')
+    # 回應包含會過期的結果代碼，快取時間不超過代碼的存活時間
+    assert response.headers["Cache-Control"] == (
+        f"public, max-age={int(settings.result_handle_ttl)}"
+    )
+
+
+def test_if_none_match_returns_304(client: TestClient) -> None:
+    first = client.post("/api/scan", json=SCAN)
+    etag = first.headers["ETag"]
+
+    response = client.post("/api/scan", json=SCAN, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    other = client.post(
+        "/api/scan", json={**SCAN, "count": 10}, headers={"If-None-Match": etag}
+    )
+    assert other.status_code == 200
+
+
+def test_get_scan_matches_post(client: TestClient) -> None:
+    post = client.post("/api/scan", json=SCAN)
+    get = client.get("/api/scan", params=SCAN)
+    assert get.status_code == 200
+    assert get.headers["ETag"] == post.headers["ETag"]
+    assert get.json()["data"] == post.json()["data"]
+
+
+def test_export_is_immutable_for_past_dates(client: TestClient) -> None:
+    response = client.post("/api/export", json=SCAN)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == IMMUTABLE
+    assert response.headers["content-type"].startswith("text/csv")
+
+    cached = client.post(
+        "/api/export", json=SCAN, headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert cached.status_code == 304
+
+    ndjson = client.post("/api/export", params={"format": "ndjson"}, json=SCAN)
+    assert ndjson.headers["ETag"] != response.headers["ETag"]
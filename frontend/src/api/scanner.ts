@@ -2,10 +2,10 @@ import api from './index'
 import type { ScanRequest, ScanResponse } from './types'
 
 /**
- * 執行股票掃描
+ * 執行股票掃描（GET 讓瀏覽器依 ETag 與 Cache-Control 快取並重新驗證）
  */
 export const scanStocks = async (request: ScanRequest): Promise<ScanResponse> => {
-  const response = await api.post<ScanResponse>('/scan', request)
+  const response = await api.get<ScanResponse>('/scan', { params: request })
   return response.data
 }
 
@@ -27,4 +27,7 @@ export interface ScanResponse {
   data: StockData[]
   total_count: number
   execution_time: number
+  data_age?: number
+  stale?: boolean
+  warning?: string
 }